@@ -0,0 +1,77 @@
+"""
+Container for the ROS handles that are needed by the action clients. A client
+that runs as a standalone node creates its own context, while the action executor
+creates a single context that is shared between all of the hosted clients.
+"""
+
+import rospy
+import actionlib
+import threading
+from move_base_msgs.msg import MoveBaseAction
+from fms_rob.msg import RobActionStatus
+from std_msgs.msg import String
+from interlocks import InterlockCache
+from startup_profiler import profile
+from structured_log import log
+from metrics import metrics
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+'''
+#######################################################################################
+'''
+
+class ActionContext:
+    def __init__(self, move_base=True, reconf=True):
+        self.move_base_client = None
+        self.move_base_ready = False
+        self.move_base_owner = None # client that sent the goal currently tracked by the move base client
+        self.interlocks = None
+        self.interlocks_error = None
+        if (reconf):
+            reconf_thread = threading.Thread(target=self.connect_interlocks) # waits for the state server while waiting for move base
+            reconf_thread.start()
+        if (move_base):
+            self.move_base_client = actionlib.SimpleActionClient('/'+ROBOT_ID+'/move_base', MoveBaseAction)
+            rospy.loginfo('[ {} ]: Waiting for move_base server'.format(rospy.get_name()))
+            with profile.blocked('move_base'):
+                self.move_base_ready = self.move_base_client.wait_for_server(timeout=rospy.Duration.from_sec(5)) # wait for server start up
+            if not self.move_base_ready:
+                rospy.logerr('[ {} ]: Timedout waiting for Move Base Server!'.format(rospy.get_name()))
+        self.action_status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=10) # publishes status msgs upstream
+        self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
+        log.advertise_dump() # one log buffer per process
+        metrics.start_publishing() # one registry per process
+        if (reconf):
+            reconf_thread.join()
+            if (self.interlocks_error != None):
+                raise self.interlocks_error
+
+    def connect_interlocks(self):
+        try:
+            self.interlocks = InterlockCache() # local cache of the interlocks held by the state server
+        except Exception as e:
+            self.interlocks_error = e
+
+    def send_move_base_goal(self, owner, goal):
+        """
+        Sends a goal to move base on behalf of a client and records the client as the goal owner.
+        Status messages are forwarded upstream by the owner's goal callbacks on state transitions only.
+        The command is recorded as the current mission phase until the goal is terminated.
+        As the move base client can only track a single goal, the goal of a previous owner that is still
+        running is reported as preempted, as move base preempts it in favour of the new goal.
+        """
+        previous_owner = self.move_base_owner
+        if (previous_owner != None) and (previous_owner is not owner) and previous_owner.status_flag:
+            previous_owner.goal_done(2, None)
+        self.move_base_owner = owner
+        done_cb = owner.goal_done
+        if (self.interlocks != None):
+            done_cb = self.interlocks.tracked(owner.action, owner.command_id, owner.goal_done)
+        self.move_base_client.send_goal(goal, done_cb=done_cb, active_cb=owner.goal_active, feedback_cb=owner.goal_feedback) # non-blocking
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+A node that hosts the drive, pick, place, home, return and dock-undock clients as
+plugins in a single process. All hosted clients share one move base action client
+and one state proxy instead of creating their own in separate nodes.
+Each client processes the commands it receives in its own worker thread, so that a
+blocking client (ex: return) does not hold back the cancellation requests of the
+others, as is the case when every client runs as a separate node.
+"""
+
+import rospy
+import sys
+import threading
+try:
+    import Queue as queue # python 2
+except ImportError:
+    import queue
+from fms_rob.msg import RobActionSelect
+from action_context import ActionContext
+from startup_profiler import profile, wait_until
+from drive_client import DriveAction
+from pick_client import PickAction
+from place_client import PlaceAction
+from home_client import HomeAction
+from return_client import ReturnAction
+from dock_undock_client import DUActionClient
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+'''
+#######################################################################################
+'''
+
+class ActionExecutor:
+    def __init__(self):
+        rospy.init_node('action_executor')
+        self.context = ActionContext() # move base client and state proxy shared by all hosted clients
+        self.drive_client = DriveAction(self.context)
+        self.pick_client = PickAction(self.context)
+        self.place_client = PlaceAction(self.context)
+        self.home_client = HomeAction(self.context)
+        self.return_client = ReturnAction(self.context)
+        self.du_client = DUActionClient(self.context)
+        handlers = [self.drive_client.drive, self.pick_client.pick, self.place_client.place, self.home_client.home,
+                    self.return_client.returns, self.du_client.dock]
+        self.command_queues = [self.start_worker(handler) for handler in handlers]
+        self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.dispatch)
+        rospy.on_shutdown(self.shutdown_hook)
+        wait_until(lambda: self.action_sub.get_num_connections() > 0, 1.0) # command router connected
+        profile.ready()
+        if self.context.move_base_ready:
+            rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+        else:
+            rospy.logerr('[ {} ]: Not Ready!'.format(rospy.get_name()))
+
+    def start_worker(self, handler):
+        """ Starts a thread that passes queued commands to a hosted client in order of arrival. """
+        commands = queue.Queue()
+        def run():
+            while not rospy.is_shutdown():
+                try:
+                    data = commands.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    handler(data)
+                except Exception as e:
+                    rospy.logerr('[ {} ]: Command Handling Failed! - {}'.format(rospy.get_name(), e))
+        worker = threading.Thread(target=run)
+        worker.daemon = True
+        worker.start()
+        return commands
+
+    def dispatch(self, data):
+        """ Passes every command to all hosted clients, as each client filters its own actions. """
+        for commands in self.command_queues:
+            commands.put(data)
+
+    def shutdown_hook(self):
+        rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
+
+if __name__ == '__main__':
+    profile.imports_done()
+    try:
+        ae = ActionExecutor()
+    except KeyboardInterrupt:
+        sys.exit()
+        #rospy.logerr('Interrupted!')
+    rospy.spin()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+A node that records the pose history of the carts from their Vicon poses (see
+pose_history.py) and answers where a cart was at a given time (~get_cart_pose) and when
+and where it was moved in an interval (~get_cart_moves), ex: to return a cart to the pose
+it was picked from several missions ago, or to audit its moves. The Vicon messages are
+only decoded at the sampling rate (see pose_subscriber.py) and the decimated poses are
+kept in memory-mapped files, so the history survives restarts of the node.
+"""
+
+import rospy
+import sys, os
+import rospkg
+from geometry_msgs.msg import TransformStamped, PoseStamped
+from fms_rob.srv import cartPose, cartPoseResponse, cartMoves, cartMovesResponse
+from pose_geometry import yaw_to_quaternion
+from pose_subscriber import PoseSubscriber
+from pose_history import CartHistory
+from topic_cache import topics
+from startup_profiler import profile
+from structured_log import log
+
+
+'''
+#######################################################################################
+'''
+
+class CartHistoryServer:
+    def __init__(self):
+        rospy.init_node('cart_history')
+        directory = rospy.get_param('~path', os.path.join(rospkg.get_ros_home(), 'fms_rob', 'cart_history')) # one file of poses and one of moves per cart
+        self.history = CartHistory(directory,
+                                   capacity=rospy.get_param('~capacity', 100000), # poses per cart, 3.2 MB
+                                   event_capacity=rospy.get_param('~event_capacity', 10000), # moves per cart
+                                   period=rospy.get_param('~period', 5.0), # seconds between the poses recorded while a cart rests
+                                   distance=rospy.get_param('~min_distance', 0.01), # meters moved to record a pose
+                                   angle=rospy.get_param('~min_angle', 0.02), # radians turned to record a pose
+                                   motion=rospy.get_param('~motion_distance', 0.05)) # meters moved to record a move
+        self.subs = {} # cart --> pose subscriber
+        self.recorded = {} # cart --> sequence number of the last sampled message
+        self.carts = rospy.get_param('~carts', []) # all Vicon bodies except the robots if empty
+        self.robots = set(rospy.get_param('~robots', []) or rospy.get_param('/robot_home', {})) # Vicon bodies that are not carts
+        self.discover(None)
+        if not self.carts:
+            self.discovery_timer = rospy.Timer(rospy.Duration(rospy.get_param('~discovery_period', 10.0)), self.discover)
+        self.pose_srv = rospy.Service('~get_cart_pose', cartPose, self.handle_cart_pose)
+        self.moves_srv = rospy.Service('~get_cart_moves', cartMoves, self.handle_cart_moves)
+        self.sample_timer = rospy.Timer(rospy.Duration(1.0 / rospy.get_param('~rate', 10.0)), self.sample)
+        self.flush_timer = rospy.Timer(rospy.Duration(rospy.get_param('~flush_period', 10.0)), lambda event: self.history.flush())
+        rospy.on_shutdown(self.shutdown_hook)
+        profile.ready()
+        rospy.loginfo('[ {} ]: Ready - recording {} carts in {}'.format(rospy.get_name(), len(self.subs), directory))
+
+    def discover(self, event):
+        """ Subscribes to the Vicon topics of new carts. """
+        if self.carts:
+            carts = self.carts
+        else:
+            carts = [topic.split('/')[2] for topic, msg_type in topics.published_topics('/vicon')
+                     if msg_type == 'geometry_msgs/TransformStamped' and topic.count('/') == 3 and topic.split('/')[2] == topic.split('/')[3]
+                     and topic.split('/')[2] not in self.robots]
+        for cart in carts:
+            if (cart not in self.subs):
+                self.subs[cart] = PoseSubscriber('/vicon/'+cart+'/'+cart, TransformStamped)
+                log.info('cart_history_cart', cart_id=cart)
+
+    def sample(self, event):
+        """ Records the latest pose of the carts that received a message since the last sample. """
+        for cart, sub in list(self.subs.items()):
+            seq = sub.seq()
+            if (seq == self.recorded.get(cart, 0)):
+                continue
+            self.recorded[cart] = seq
+            x, y, theta = sub.pose()
+            self.history.add(cart, sub.msg().header.stamp.to_sec(), x, y, theta)
+
+    def pose_msg(self, record):
+        t, x, y, theta = record
+        msg = PoseStamped()
+        msg.header.stamp = rospy.Time.from_sec(t)
+        msg.header.frame_id = 'vicon_world'
+        msg.pose.position.x, msg.pose.position.y = x, y
+        msg.pose.orientation.x, msg.pose.orientation.y, msg.pose.orientation.z, msg.pose.orientation.w = yaw_to_quaternion(theta)
+        return msg
+
+    def handle_cart_pose(self, req):
+        stamp = req.stamp.to_sec() if not req.stamp.is_zero() else float('inf')
+        record = self.history.pose_at(req.cart_id, stamp)
+        if (record == None):
+            rospy.logwarn('[ {} ]: No pose of cart {} recorded at {}'.format(rospy.get_name(), req.cart_id, req.stamp.to_sec()))
+            return cartPoseResponse(False, PoseStamped())
+        return cartPoseResponse(True, self.pose_msg(record))
+
+    def handle_cart_moves(self, req):
+        end = req.end.to_sec() if not req.end.is_zero() else float('inf')
+        return cartMovesResponse([self.pose_msg(record) for record in self.history.moves(req.cart_id, req.start.to_sec(), end)])
+
+    def shutdown_hook(self):
+        self.history.flush()
+        rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
+
+
+if __name__ == '__main__':
+    profile.imports_done()
+    try:
+        chs = CartHistoryServer()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
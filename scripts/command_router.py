@@ -1,22 +1,38 @@
 #!/usr/bin/env python
 
-""" A node that distributes MQTT messages sent by the user to respective clients. """
+"""
+A node that distributes MQTT messages sent by the user to respective clients. By default
+the router serves the robot it is launched for. With a list of robots (~robots, fleet
+mode), one router process serves all of them over a single MQTT connection: every
+command is parsed once and passed to the router of its robot by a dict lookup.
+"""
 
 import rospy
 from geometry_msgs.msg import Pose
 from std_msgs.msg import String
 import paho.mqtt.client as mqttClient
-import time, sys, json
+import os, time, sys, json
+import rospkg
+import threading
 #from robotnik_msgs.msg import MQTT_ack
-from fms_rob.msg import RobActionSelect, RobActionStatus, MqttAck
-import yaml
+from fms_rob.msg import RobActionSelect, RobActionStatus, MqttAck, RobReadiness
+from startup_profiler import profile, wait_until
+from structured_log import log
+from metrics import metrics, render
+from tracing import trace, TraceCollector, now
+from robot_namespace import get_robot_id
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler # python 2
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id('') # namespace of the node, set to the robot id in the package's launch file, not set in fleet mode
+GATED_ACTIONS = ['drive', 'dock', 'undock', 'pick', 'place', 'home', 'return'] # actions held back until their dependencies are ready
 
 '''
 #######################################################################################
@@ -25,84 +41,143 @@ ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the
 """
 MQTT Settings
 """
-broker_address= "gopher.phynetlab.com"
-port = 8883
+broker_address= rospy.get_param('/MQTT_BROKER', "gopher.phynetlab.com") # set in the package's launch file
+port = rospy.get_param('/MQTT_PORT', 8883)
 Connected = False  
 
+client = None # MQTT client shared by the routers of all robots
+
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
         rospy.loginfo('[ {} ]: Connected to Broker'.format(rospy.get_name()))
         global Connected                
         Connected = True                
+        client.subscribe("/robotnik/#", 0) # Topics with wild card and a robotnik namespace - renewed on every reconnection
     else:
         rospy.logerr('[ {} ]: Connection to Broker Failed!'.format(rospy.get_name()))
 
 def on_message(client, userdata, message):
-    	#print 'on_message'
-	return
+    #print 'on_message'
+    return
 
 def exit_handler():
     client.disconnect()
     sys.exit()
 
-client = mqttClient.Client()
-client.on_connect= on_connect                          # attach function to callback
-client.on_message= on_message                          # attach function to callback
-client.connect(broker_address, port=port)              # connect to broker
-client.loop_start()                                    # start the loop
-client.subscribe("/robotnik/#", 0) # Topics with wild card and a robotnik namespace
+def connect_broker():
+    """ Connects to the broker in the network loop, without blocking the start up. """
+    global client
+    client = mqttClient.Client()
+    client.on_connect= on_connect                          # attach function to callback
+    client.on_message= on_message                          # attach function to callback
+    client.connect_async(broker_address, port=port)        # connect to broker in the network loop
+    client.loop_start()                                    # start the loop
+
+def demultiplex(routers, payload):
+    """ Parses a command and returns it with the router of the robot it is addressed to (None for other robots). """
+    mqtt_msg = json.loads(payload)
+    return routers.get(mqtt_msg.get('robot_id')), mqtt_msg
 
 '''
 #######################################################################################
 '''
 
-class CommandRouter:
-    def __init__(self):
-        rospy.init_node('command_router')
-        client.message_callback_add("/robotnik/mqtt_ros_command", self.parse_data) # commands received from user ex: pick, place, etc
-        self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
-        self.action_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action', RobActionSelect, queue_size=10) # topic to which the parsed action form the user is published
-        rospy.Subscriber('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, self.status_mapping_update) # subscribes to downstream status messages
-        rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
-        rospy.sleep(1)
-        rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+class RobotRouter:
+    """ Routes the commands of one robot to its clients and its status messages back to the user. """
+    def __init__(self, robot_id, not_ready_policy, traces):
+        self.robot_id = robot_id
+        self.traces = traces # trace records of the commands
+        self.control_flag = False
+        self.klt_num_pub = rospy.Publisher('/'+robot_id+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
+        self.action_pub = rospy.Publisher('/'+robot_id+'/rob_action', RobActionSelect, queue_size=10) # topic to which the parsed action form the user is published
+        rospy.Subscriber('/'+robot_id+'/rob_action_status', RobActionStatus, self.status_mapping_update) # subscribes to downstream status messages
+        self.not_ready_policy = not_ready_policy # queue --> hold commands until ready // reject --> reject with status 5
+        self.actions_ready = None # actions that can be executed, None until the readiness monitor reported
+        self.pending = [] # (command, receipt time) held back until their actions are ready, in order of arrival
+        self.readiness_lock = threading.Lock() # commands arrive in the MQTT thread, readiness updates in the ROS thread
+        rospy.Subscriber('/'+robot_id+'/rob_readiness', RobReadiness, self.readiness_update)
 
-    def parse_data(self, client, userdata, message):
-        """ Parses data sent by user via MQTT. """
-        try:
-            mqtt_msg = json.loads(message.payload)
-        except:
-            rospy.logerr('[ {} ]: Json Message not correecly Formatted!'.format(rospy.get_name()))
-            return
+    def handle(self, mqtt_msg, received, ingested):
+        """ Handles a command addressed to the robot. """
         goal = Pose()
-        if (mqtt_msg['robot_id'] == ROBOT_ID):
-            #print ("Message received: "  + message.payload)
-            action = mqtt_msg['action']
-            cart_id = mqtt_msg['cart_id'] # cart to be picked
-            command_id = str(mqtt_msg['command_id']) # string for syncing commands 
-            station_id = mqtt_msg['station_id'] # station to place the cart at
-            bound_mode = mqtt_msg['bound_mode'] # position relative to station
-            direction = mqtt_msg['direction'] # docking direction
-            cancellation_stamp = mqtt_msg['cancellation_stamp']
-            # pose position
-            goal.position.x = mqtt_msg['pose']['position']['x']
-            goal.position.y = mqtt_msg['pose']['position']['y']
-            goal.position.z = mqtt_msg['pose']['position']['z']
-            # pose orientation
-            goal.orientation.x = mqtt_msg['pose']['orientation']['x']
-            goal.orientation.y = mqtt_msg['pose']['orientation']['y']
-            goal.orientation.z = mqtt_msg['pose']['orientation']['z']
-            goal.orientation.w = mqtt_msg['pose']['orientation']['w']
-            rospy.loginfo('[ {} ]: MQTT Message Received >>> \n\t Action: {}, \n\t Cart ID: {}, \n\t Station ID: {}, \n\t Bound Mode: {}, \n\t Direction: {}, \n\t Command ID: {}, \
-                \n\t Cancellation timestamp: {}'.format(rospy.get_name(), action, cart_id, station_id, bound_mode, direction, command_id, cancellation_stamp)) # Goal Pose Not printed for convenience!
-            self.control_flag = False
-            self.select_action(action, goal, command_id, cart_id, station_id, bound_mode, direction, cancellation_stamp)
-        else:
-            pass
-        return
+        #print ("Message received: "  + message.payload)
+        action = mqtt_msg['action']
+        cart_id = mqtt_msg['cart_id'] # cart to be picked
+        command_id = str(mqtt_msg['command_id']) # string for syncing commands 
+        station_id = mqtt_msg['station_id'] # station to place the cart at
+        bound_mode = mqtt_msg['bound_mode'] # position relative to station
+        direction = mqtt_msg['direction'] # docking direction
+        cancellation_stamp = mqtt_msg['cancellation_stamp']
+        # pose position
+        goal.position.x = mqtt_msg['pose']['position']['x']
+        goal.position.y = mqtt_msg['pose']['position']['y']
+        goal.position.z = mqtt_msg['pose']['position']['z']
+        # pose orientation
+        goal.orientation.x = mqtt_msg['pose']['orientation']['x']
+        goal.orientation.y = mqtt_msg['pose']['orientation']['y']
+        goal.orientation.z = mqtt_msg['pose']['orientation']['z']
+        goal.orientation.w = mqtt_msg['pose']['orientation']['w']
+        log.info('command_received', robot_id=self.robot_id, action=action, cart_id=cart_id, station_id=station_id, bound_mode=bound_mode,
+                 direction=direction, command_id=command_id, cancellation_stamp=cancellation_stamp) # Goal Pose Not printed for convenience!
+        trace.mark(command_id, 'ingest', t=ingested, action=action, robot_id=self.robot_id)
+        command = (action, goal, command_id, cart_id, station_id, bound_mode, direction, cancellation_stamp)
+        if self.admit(command, received):
+            self.dispatch(command, received)
+
+    def dispatch(self, command, received):
+        """ Passes a command to its client and records the dispatch latency since its receipt. """
+        self.control_flag = False
+        trace.mark(command[2], 'dispatch', action=command[0])
+        self.select_action(*command)
+        metrics.histogram('fms_rob_command_dispatch_seconds', 'Time from MQTT receipt until the command is sent to its client',
+                          action=command[0], robot=self.robot_id).observe(time.time() - received)
+
+    def admit(self, command, received):
+        """
+        Checks whether a command can be passed to its client. Commands of actions that are not ready
+        are queued or rejected according to the not ready policy. Queued commands keep their order, so
+        later commands are queued as well until the queue is flushed.
+        """
+        action = command[0]
+        with self.readiness_lock:
+            if (action not in GATED_ACTIONS):
+                if (action in ['cancelAll', 'cancelAtAndBefore']) and self.pending:
+                    recalled = self.pending
+                    self.pending = []
+                    rospy.logwarn('[ {} ]: {} queued commands recalled'.format(rospy.get_name(), len(recalled)))
+                    for queued, _ in recalled:
+                        self.report(queued, 8) # recalled before being sent
+                return True
+            if (self.actions_ready != None) and (action in self.actions_ready) and not self.pending: # not ready until the readiness monitor reported
+                return True
+            if (self.not_ready_policy == 'queue'):
+                self.pending.append((command, received))
+                rospy.logwarn('[ {} ]: {} Action Queued - waiting for its dependencies'.format(rospy.get_name(), action))
+                return False
+        rospy.logerr('[ {} ]: Action Rejected! - {} Action Not Ready'.format(rospy.get_name(), action))
+        self.report(command, 5) # rejected
+        return False
+
+    def readiness_update(self, data):
+        """ Updates the ready actions and passes on the queued commands that became ready. """
+        with self.readiness_lock:
+            self.actions_ready = set(data.actions_ready)
+            ready_commands = []
+            while self.pending and (self.pending[0][0][0] in self.actions_ready):
+                ready_commands.append(self.pending.pop(0))
+        for command, received in ready_commands:
+            self.dispatch(command, received)
+
+    def report(self, command, status):
+        """ Reports the status of a command that was not passed to its client back to the user. """
+        msg = RobActionStatus()
+        msg.action, msg.command_id, msg.cart_id, msg.station_id, msg.bound_mode = command[0], command[2], command[3], command[4], command[5]
+        msg.status = status
+        self.status_mapping_update(msg)
 
     def msg2json(self, msg):
         """ Converts ROS messages into json format. """
+        import yaml # deferred until the first status message
         y = yaml.load(str(msg))
         return json.dumps(y,indent=4)
 
@@ -199,7 +274,7 @@ class CommandRouter:
     def status_mapping_update(self, data):
         """ Publishes status messages back to user via MQTT. """
         msg = MqttAck() # custom msg type that acts as container for ros messages pre-sending back to user
-        msg.robot_id = ROBOT_ID
+        msg.robot_id = self.robot_id
         msg.cart_id = data.cart_id
         msg.station_id = data.station_id
         msg.bound_mode = data.bound_mode
@@ -215,19 +290,101 @@ class CommandRouter:
         '''
         msg_json = self.msg2json(msg)
         #rospy.loginfo_throttle(1, '{}: Sending status data via mqtt'.format(rospy.get_name()))
-     	client.publish('/robotnik/mqtt_ros_info',msg_json)
+        client.publish('/robotnik/mqtt_ros_info',msg_json)
+        metrics.counter('fms_rob_mqtt_published_total', 'MQTT messages published', topic='/robotnik/mqtt_ros_info').inc()
+        trace.mark(data.command_id, 'mqtt_egress', action=data.action, status=data.status)
+        self.traces.complete(data.command_id, data.status) # written once the final status was sent
+
+    def shutdown(self):
+        self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
+
+class CommandRouter:
+    def __init__(self):
+        rospy.init_node('command_router')
+        robots = rospy.get_param('~robots', [ROBOT_ID]) # robots served by the router, several in fleet mode
+        default_trace_path = os.path.join(rospkg.get_ros_home(), 'fms_rob', (robots[0] if len(robots) == 1 else 'fleet')+'_traces.jsonl')
+        self.traces = TraceCollector(rospy.get_param('~trace_path', default_trace_path)) # one trace record per command
+        trace.sink = self.traces.add # events of the router are collected directly
+        not_ready_policy = rospy.get_param('~not_ready_policy', 'queue')
+        self.node_metrics = {} # node --> last metrics snapshot published by the node
+        self.routers = {} # robot id --> router of the robot
+        for robot_id in robots:
+            self.routers[robot_id] = RobotRouter(robot_id, not_ready_policy, self.traces)
+            rospy.Subscriber('/'+robot_id+'/metrics', String, self.metrics_update)
+            rospy.Subscriber('/'+robot_id+'/trace', String, self.trace_update) # events of the other nodes
+        client.message_callback_add("/robotnik/mqtt_ros_command", self.parse_data) # commands received from user ex: pick, place, etc
+        self.start_metrics_server(rospy.get_param('~metrics_host', '127.0.0.1'), rospy.get_param('~metrics_port', 9100))
+        rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
+        log.advertise_dump()
+        with profile.blocked('mqtt_broker'):
+            wait_until(lambda: Connected, 5.0) # connection acknowledged by the broker
+        profile.ready()
+        if Connected:
+            rospy.loginfo('[ {} ]: Ready - serving {}'.format(rospy.get_name(), ', '.join(robots)))
+        else:
+            rospy.logerr('[ {} ]: Not Ready!'.format(rospy.get_name()))
+
+    def parse_data(self, client, userdata, message):
+        """ Parses data sent by user via MQTT. """
+        received = time.time()
+        ingested = now()
+        metrics.counter('fms_rob_mqtt_received_total', 'MQTT messages received', topic=message.topic).inc()
+        try:
+            router, mqtt_msg = demultiplex(self.routers, message.payload)
+        except:
+            rospy.logerr('[ {} ]: Json Message not correecly Formatted!'.format(rospy.get_name()))
+            return
+        if (router != None):
+            router.handle(mqtt_msg, received, ingested)
+        return
+
+    def trace_update(self, data):
+        self.traces.add(json.loads(data.data))
+
+    def metrics_update(self, data):
+        snapshot = json.loads(data.data)
+        self.node_metrics[snapshot['node']] = snapshot['families']
+
+    def start_metrics_server(self, host, port):
+        """ Serves the metrics of all nodes of the robots in the Prometheus text format on /metrics. """
+        router = self
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if (self.path.split('?')[0] != '/metrics'):
+                    self.send_error(404)
+                    return
+                snapshots = list(router.node_metrics.values()) + [metrics.snapshot(node=rospy.get_name())]
+                body = render(snapshots).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            def log_message(self, format, *args): # scrapes are not logged
+                pass
+        try:
+            self.metrics_server = HTTPServer((host, port), MetricsHandler)
+        except Exception as e:
+            rospy.logerr('[ {} ]: Metrics server could not be started on port {} - {}'.format(rospy.get_name(), port, e))
+            return
+        server_thread = threading.Thread(target=self.metrics_server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        rospy.loginfo('[ {} ]: Metrics served on http://{}:{}/metrics'.format(rospy.get_name(), host, port))
 
     def shutdown_hook(self):
         """ Shutdown callback function. """
-        self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
+        for router in self.routers.values():
+            router.shutdown()
         rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 
 if __name__ == '__main__':
+    profile.imports_done()
+    connect_broker()
     try:
         cr = CommandRouter()
     except KeyboardInterrupt:
         sys.exit()
         #print('Interrupted!')
     rospy.spin()
-
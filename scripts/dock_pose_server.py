@@ -8,16 +8,18 @@ the pose published from vicon.
 import rospy
 from geometry_msgs.msg import TransformStamped, Pose
 from std_msgs.msg import Bool
-from math import cos, sin, pi
-import tf_conversions
+from pose_geometry import yaw, flip_yaw, offset_along_heading
 from fms_rob.srv import dockPose
+from startup_profiler import profile
+from topic_cache import topics
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
@@ -35,8 +37,7 @@ def get_docking_pose(req):
     distance = req.distance
     direction = req.direction
     rospy.on_shutdown(shutdown_hook)
-    topic = ['/vicon/'+cart_id+'/'+cart_id, 'geometry_msgs/TransformStamped']
-    if(topic not in rospy.get_published_topics('/vicon/')):
+    if(not topics.published('/vicon/'+cart_id+'/'+cart_id, 'geometry_msgs/TransformStamped')):
         rospy.logerr('[ {} ]: Cart Topic Not Found!'.format(rospy.get_name()))
         return
     #print('Cart id pose being calculated for: {}'.format(cart_id)) ###
@@ -50,21 +51,21 @@ def get_docking_pose(req):
         rospy.sleep(1) # wait for cart topic subscribtion
         rospy.loginfo('[ {} ]: Cart id Goal is {}'.format(rospy.get_name(), cart_id))
         goal_rot = [goal.transform.rotation.x, goal.transform.rotation.y, goal.transform.rotation.z, goal.transform.rotation.w]
-        goal_euler = tf_conversions.transformations.euler_from_quaternion(goal_rot)
-        goal_rot_opp = tf_conversions.transformations.quaternion_from_euler(goal_euler[0], goal_euler[1], goal_euler[2]+pi)
+        goal_yaw = yaw(goal_rot)
+        goal_rot_opp = flip_yaw(goal_rot)
 
         if direction == 'north':
             # offset from goal to gurantee proper docking
-            goal_result.position.x = goal.transform.translation.x + (distance * cos(goal_euler[2])) # distance offset from cart
-            goal_result.position.y = goal.transform.translation.y + (distance * sin(goal_euler[2]))
+            goal_result.position.x, goal_result.position.y = offset_along_heading(goal.transform.translation.x, goal.transform.translation.y,
+                                                                                  goal_yaw, distance) # distance offset from cart
             # get cart orientation
             goal_result.orientation.x = goal_rot_opp[0] # same orientation as cart
             goal_result.orientation.y = goal_rot_opp[1]
             goal_result.orientation.z = goal_rot_opp[2]
             goal_result.orientation.w = goal_rot_opp[3]
         else: # defult to south
-            goal_result.position.x = goal.transform.translation.x - (distance * cos(goal_euler[2])) # distance offset from cart
-            goal_result.position.y = goal.transform.translation.y - (distance * sin(goal_euler[2]))
+            goal_result.position.x, goal_result.position.y = offset_along_heading(goal.transform.translation.x, goal.transform.translation.y,
+                                                                                  goal_yaw, -distance) # distance offset from cart
             # get cart orientation
             goal_result.orientation.x = goal_rot[0] # same orientation as cart
             goal_result.orientation.y = goal_rot[1]
@@ -85,12 +86,14 @@ def get_vicon_pose(data):
 
 def dock_pose_server():
     s = rospy.Service('/'+ROBOT_ID+'/get_docking_pose', dockPose, get_docking_pose)
+    profile.ready()
     rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
 
 def shutdown_hook():
     rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 if __name__ == "__main__":
+    profile.imports_done()
     rospy.init_node('dock_pose_server')
     rospy.on_shutdown(shutdown_hook)
     dock_pose_server()
@@ -11,18 +11,21 @@ import sys
 from fms_rob.msg import dockUndockAction, dockUndockGoal
 from geometry_msgs.msg import PoseStamped
 from fms_rob.msg import RobActionSelect, RobActionStatus
-from actionlib_msgs.msg import GoalStatusArray
 from std_srvs.srv import Empty
 from math import pi
 from std_msgs.msg import String, Bool
-import dynamic_reconfigure.client
+from action_context import ActionContext
+from startup_profiler import profile, wait_until
+from structured_log import log
+from tracing import trace
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
@@ -30,29 +33,37 @@ ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the
 
 class DUActionClient:
     
-    def __init__(self):
-        rospy.init_node('dock_undock_client')
-        self.status_flag = False # used to throttle further message sending after action execution
+    def __init__(self, context=None):
+        self.hosted = (context != None) # True when running as a plugin of the action executor
+        if not self.hosted:
+            rospy.init_node('dock_undock_client')
+            context = ActionContext(move_base=False)
+        self.context = context
+        self.status_flag = False # True while a sent goal has not been terminated yet
+        self.last_status = None # last status forwarded upstream
         self.act_client = actionlib.SimpleActionClient('do_dock_undock', dockUndockAction) 
         err_flag = False
-        if (self.act_client.wait_for_server(timeout=rospy.Duration.from_sec(5))): # wait for server start up
-            #rospy.loginfo('[ {} ]: Move Base Server Running'.format(rospy.get_name()))
-            pass
-        else:
-            rospy.logerr('[ {} ]: Timedout waiting for Dock Undock Server!'.format(rospy.get_name()))
-            err_flag = True        
-        self.act_client.wait_for_server() # wait for server start up
-        self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.dock)
-        self.status_update_sub = rospy.Subscriber('/'+ROBOT_ID+'/do_dock_undock/status', GoalStatusArray, self.status_update) # status from dock_undock action server 
-        self.action_status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=10) # publishes status msgs upstream
-        self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
+        with profile.blocked('do_dock_undock'):
+            if (self.act_client.wait_for_server(timeout=rospy.Duration.from_sec(5))): # wait for server start up
+                #rospy.loginfo('[ {} ]: Move Base Server Running'.format(rospy.get_name()))
+                pass
+            else:
+                rospy.logerr('[ {} ]: Timedout waiting for Dock Undock Server!'.format(rospy.get_name()))
+                err_flag = True # goals are still accepted once the server is up, see the readiness monitor
+        if not self.hosted:
+            self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.dock)
+        self.action_status_pub = context.action_status_pub # publishes status msgs upstream
+        self.klt_num_pub = context.klt_num_pub # used for interfacing with the ros_mocap package
         rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
-        self.reconf_client = dynamic_reconfigure.client.Client("dynamic_reconf_server", timeout=30) # client of fms_rob dynmaic reconfigure server
+        self.interlocks = context.interlocks # local cache of the interlocks held by the state server
         #self.pick_flag = Bool()
         #self.return_flag = Bool()
         #self.pick_flag = True
         #self.return_flag = True
-        rospy.sleep(1)
+        if self.hosted:
+            return
+        wait_until(lambda: self.action_sub.get_num_connections() > 0, 1.0) # command router connected
+        profile.ready()
         if not err_flag:
             rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
         else:
@@ -65,23 +76,25 @@ class DUActionClient:
             self.action = data.action
             self.direction = data.direction
             goal = dockUndockGoal()
-            pick_flag = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/pick')
-            if (pick_flag == True):
+            permitted, reason = self.interlocks.check('dock')
+            if (permitted):
                 status = self.act_client.get_state()
                 if (status != 1):
                     goal.distance = rospy.get_param('/'+ROBOT_ID+'/fms_rob/dock_distance', '1.0') # get specified dock distance specified during picking. Default: 1.0
                     goal.angle = pi
                     goal.mode = True # True --> Dock // False --> Undock
                     goal.direction = self.direction
+                    goal.command_id = self.command_id
                     rospy.loginfo('[ {} ]: Sending Dock goal to action server'.format(rospy.get_name())) 
                     #self.act_client.send_goal_and_wait(goal) # blocking
-                    self.act_client.send_goal(goal) # non-blocking
                     self.status_flag = True
+                    self.last_status = None
+                    self.act_client.send_goal(goal, done_cb=self.interlocks.tracked(self.action, self.command_id, self.goal_done), active_cb=self.goal_active, feedback_cb=self.goal_feedback) # non-blocking
                 else:
                     rospy.logerr('[ {} ]: Dock Action Rejected! - Already processing a docking operation'.format(rospy.get_name()))
                 return
             else:
-                rospy.logerr('[ {} ]: Action Rejected! - Invalid Dock Action'.format(rospy.get_name()))
+                rospy.logerr('[ {} ]: Action Rejected! - Invalid Dock Action ({})'.format(rospy.get_name(), reason))
                 return
         elif (data.action == 'undock'):
             self.command_id = data.command_id
@@ -96,10 +109,12 @@ class DUActionClient:
                 goal.angle = pi
                 goal.mode = False # True --> Dock // False --> Undock
                 goal.direction = self.direction
+                goal.command_id = self.command_id
                 rospy.loginfo('[ {} ]: Sending Undock goal to action server'.format(rospy.get_name())) 
                 #self.act_client.send_goal_and_wait(goal) # blocking - Cancellations Not possible
-                self.act_client.send_goal(goal) # non-blocking
                 self.status_flag = True
+                self.last_status = None
+                self.act_client.send_goal(goal, done_cb=self.interlocks.tracked(self.action, self.command_id, self.goal_done), active_cb=self.goal_active, feedback_cb=self.goal_feedback) # non-blocking
             else:
                 rospy.logerr('[ {} ]: Undock Action Rejected! - Already processing an undocking operation'.format(rospy.get_name()))
             return
@@ -110,19 +125,16 @@ class DUActionClient:
             if (data.action == 'cancelCurrent'):
                 self.act_client.cancel_goal()
                 rospy.logwarn('Cancelling Current Goal')
-                self.reconf_client.update_configuration({"pick": False})
-                self.reconf_client.update_configuration({"return": False})
+                self.interlocks.cancelled('dock') # dock and undock cancellations release the same interlocks
             if (data.action == 'cancelAll'):
                 self.act_client.cancel_all_goals()
                 rospy.logwarn('cancelling All Goals')
-                self.reconf_client.update_configuration({"pick": False})
-                self.reconf_client.update_configuration({"return": False})
+                self.interlocks.cancelled('dock') # dock and undock cancellations release the same interlocks
             if (data.action == 'cancelAtAndBefore'):
                 self.act_client.cancel_goals_at_and_before_time(data.cancellation_stamp)
                 s = 'Cancelling all Goals at and before {}'.format(data.cancellation_stamp)
                 rospy.logwarn(s)
-                self.reconf_client.update_configuration({"pick": False})
-                self.reconf_client.update_configuration({"return": False})
+                self.interlocks.cancelled('dock') # dock and undock cancellations release the same interlocks
             #self.act_client.stop_tracking_goal()
             #self.status_flag = False
             return
@@ -135,53 +147,59 @@ class DUActionClient:
         rospy.loginfo('Parameters updated by dock client') ###
     '''
         
-    def status_update(self, data):
-        """ Forwarding status messages upstream. """
-        if (self.status_flag == True):
-            #print(data.status_list[1].status) # All status list info are at indices 0 and 1
-            status = self.act_client.get_state()
-            #print(status)
-            rospy.loginfo('[ {} ] >>> Status: {} '.format(rospy.get_name(), status))
-            msg = RobActionStatus()
+    def goal_active(self):
+        """ Forwarding the activation of the goal upstream. """
+        trace.mark(self.command_id, 'goal_active', action=self.action)
+        self.publish_status(self.act_client.get_state())
+
+    def goal_feedback(self, feedback):
+        """ Forwarding status changes reported while the goal is being executed. """
+        self.publish_status(self.act_client.get_state())
+
+    def publish_status(self, status):
+        """ Publishes the goal status upstream on status transitions only. """
+        if (status == self.last_status):
+            return
+        self.last_status = status
+        log.info('status', command_id=self.command_id, action=self.action, status=status)
+        msg = RobActionStatus()
+        msg.status = status
+        msg.command_id = self.command_id
+        msg.action = self.action # to be removed after msg modification
+        self.action_status_pub.publish(msg)
+
+    def goal_done(self, status, result):
+        """ Forwarding the final status upstream once the goal is terminated. """
+        self.publish_status(status)
+        self.status_flag = False # no further status messages are expected for this goal
+        if (status == 3): # if action execution is successful
+            if(self.action == 'dock'):
+                rospy.loginfo('[ {} ]: Dock Action Successful'.format(rospy.get_name()))
+                print('--------------------------------')
+                self.interlocks.succeeded('dock')
+            else:
+                rospy.loginfo('[ {} ]: Undock Action Successful'.format(rospy.get_name()))
+                print('--------------------------------')
+                self.interlocks.succeeded('undock')
+            self.act_client.stop_tracking_goal()
+            return
+        if (status == 4): # if action execution is aborted
+            self.interlocks.cancelled(self.action)
             #self.act_client.stop_tracking_goal()
-            msg.status = status
-            msg.command_id = self.command_id
-            msg.action = self.action # to be removed after msg modification
-            self.action_status_pub.publish(msg)
-            if (status == 3): # if action execution is successful
-                if(msg.action == 'dock'):
-                    rospy.loginfo('[ {} ]: Dock Action Successful'.format(rospy.get_name()))
-                    print('--------------------------------')
-                    self.reconf_client.update_configuration({"dock": True})
-                    self.reconf_client.update_configuration({"pick": False})
-                    self.reconf_client.update_configuration({"undock": False})
-                    self.reconf_client.update_configuration({"home": False})
-                else:
-                    rospy.loginfo('[ {} ]: Undock Action Successful'.format(rospy.get_name()))
-                    print('--------------------------------')
-                    self.reconf_client.update_configuration({"undock": True})
-                    self.reconf_client.update_configuration({"return": False})
-                self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                return
-            if (status == 4): # if action execution is aborted
-                self.reconf_client.update_configuration({"pick": False})
-                self.reconf_client.update_configuration({"return": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logerr('[ {} ]: Execution Aborted by Dock-Undock Server!'.format(rospy.get_name()))
-            if (status == 2): # if action execution is preempted
-                #self.reconf_client.update_configuration({"dock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
-    
+            rospy.logerr('[ {} ]: Execution Aborted by Dock-Undock Server!'.format(rospy.get_name()))
+            log.dump('(goal aborted)') # keep the records that led to the abortion
+        if (status == 2): # if action execution is preempted
+            #self.reconf_client.update_configuration({"dock": False})
+            #self.act_client.stop_tracking_goal()
+            rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
+
     def shutdown_hook(self):
         self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
         self.act_client.cancel_all_goals()
         rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 if __name__ == '__main__':
+    profile.imports_done()
     try:
         dc = DUActionClient()    
     except KeyboardInterrupt:
@@ -11,6 +11,7 @@ positioned in the picking location.
 import rospy
 import actionlib
 import sys, time
+import threading
 from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
 from geometry_msgs.msg import PoseStamped, TransformStamped, Twist, PointStamped
 from fms_rob.msg import dockUndockAction, dockUndockGoal, dockUndockFeedback, dockUndockResult
@@ -20,19 +21,52 @@ from robotnik_msgs.srv import set_odometry, set_digital_output
 from rb1_base_msgs.srv import SetElevator
 #from actionlib_msgs.msg import GoalStatusArray
 from std_msgs.msg import String, Bool, Float32
-from math import pow, atan2, sqrt, cos, sin, pi
-import tf_conversions
+from math import pow, atan2, sqrt
+from pose_geometry import yaw, yaw_to_quaternion, wrap_angle
+from pose_subscriber import PoseSubscriber, odom_of
+from state_bus import StateProxy
 #from std_srvs.srv import Empty
 import dynamic_reconfigure.client
 #import elevator_test
 from fms_rob.srv import dockPose
+from startup_profiler import profile, wait_until
+from structured_log import log
+from metrics import metrics, service_timer
+from tracing import trace, now
+from functools import wraps
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+'''
+#######################################################################################
+'''
+
+def dock_phase(phase):
+    """ Decorator recording the duration of a dock-undock phase in the metrics and the trace of the current command, and publishing the current phase. """
+    histogram = metrics.histogram('fms_rob_dock_phase_seconds', 'Duration of the dock-undock phases', phase=phase)
+    def decorator(function):
+        @wraps(function)
+        def wrapper(self, *args, **kwargs):
+            start = now()
+            outer = self.phase
+            self.phase = phase
+            self.phase_pub.publish(phase)
+            try:
+                return function(self, *args, **kwargs)
+            finally:
+                duration = now() - start
+                histogram.observe(duration)
+                trace.mark(self.command_id, 'dock_phase', t=start, phase=phase, duration=duration)
+                self.phase = outer
+                self.phase_pub.publish(outer)
+        return wrapper
+    return decorator
 
 '''
 #######################################################################################
@@ -47,29 +81,22 @@ class DUActionServer:
         except:
             rospy.logerr('[ {} ]: Error Creating Action Server!'.format(rospy.get_name()))
         self.du_server.start()
-        self.odom_sub = rospy.Subscriber('/'+ROBOT_ID+'/dummy_odom', Odometry, self.get_odom) # dummy odom is the remapped odom topic - please check ros_mocap package
+        self.command_id = '' # command of the current goal, used for tracing
+        self.phase = '' # current dock-undock phase, empty outside of the phases
+        self.phase_pub = rospy.Publisher('/'+ROBOT_ID+'/dock_phase', String, queue_size=10, latch=True) # used to correlate sensor statistics with the phases
+        self.odom = PoseSubscriber('/'+ROBOT_ID+'/dummy_odom', Odometry, odom_of) # dummy odom is the remapped odom topic - please check ros_mocap package
         self.vel_pub = rospy.Publisher('/'+ROBOT_ID+'/move_base/cmd_vel', Twist, queue_size=10)
         self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
-        self.pose_sub = rospy.Subscriber('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, TransformStamped, self.update_pose) ####
+        self.robot_pose = PoseSubscriber('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, TransformStamped) # decoded when read by the control loops
         self.joystick_sub = rospy.Subscriber('/'+ROBOT_ID+'/joy', Joy, self.joy_update)
-        try:
-            self.reconf_client = dynamic_reconfigure.client.Client('dynamic_reconf_server', timeout=30) # client of fms_rob dynmaic reconfigure server
-        except:
-            rospy.logerr('Dynamic Reconf Server is Not running!')
-        try:
-            self.teb_reconf_client = dynamic_reconfigure.client.Client('/'+ROBOT_ID+'/move_base/TebLocalPlannerROS', timeout=30)
-        except:
-            rospy.logerr('TEB Planner is Not running!')
+        reconf_threads = [threading.Thread(target=self.connect_state_proxy), threading.Thread(target=self.connect_teb_reconf_client)] # both servers are waited for concurrently
+        for reconf_thread in reconf_threads:
+            reconf_thread.start()
+        for reconf_thread in reconf_threads:
+            reconf_thread.join()
         '''collision detector settings'''
-        self.col_detector_sub = rospy.Subscriber('/'+ROBOT_ID+'/robotnik_safety_controller/warning_collision_point', PointStamped, self.collision_update)
-        #self.collision_point = PointStamped()
-        #self.collision_tolerance = PointStamped()
-        self.collision_point_x = float('inf')
-        self.collision_point_y = float('inf')
-        self.collision_tolerance_x = 0.7 # 0.75
-        self.collision_tolerance_y = 0.02 # 0.4
-        self.curr_col_seq = 0
-        self.last_col_seq = 0
+        self.collision = {'cart_slot': True, 'exit_corridor': True} # region states published by the dynamic collision detector, occupied until its first message
+        self.col_detector_subs = [rospy.Subscriber('/'+ROBOT_ID+'/collision/'+region, Bool, self.collision_update, callback_args=region) for region in self.collision]
         ''' P-Controller settings for primary motion '''
         #self.move_speed = 0.09 #0.14
         self.move_kp = 0.99 #0.99
@@ -100,11 +127,32 @@ class DUActionServer:
         self.start_msg = Bool()
         #self.theta_msg = Float32()
         #self.cart_id = String()
-        rospy.sleep(1)
+        with profile.blocked('odom_and_vicon'):
+            wait_until(lambda: self.odom.received() and self.robot_pose.received(), 1.0) # first odom and vicon readings received
         rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
+        log.advertise_dump()
+        metrics.start_publishing()
+        self.restore_cart_state() # a cart can be carried after the mission ended (ex: aborted undock)
+        profile.ready()
         rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
 
+    def connect_state_proxy(self):
+        try:
+            with profile.blocked('state_server'):
+                self.state = StateProxy() # local copy of the state held by the state server
+        except:
+            rospy.logerr('State Server is Not running!')
+
+    def connect_teb_reconf_client(self):
+        try:
+            with profile.blocked('teb_local_planner'):
+                self.teb_reconf_client = dynamic_reconfigure.client.Client('/'+ROBOT_ID+'/move_base/TebLocalPlannerROS', timeout=30)
+        except:
+            rospy.logerr('TEB Planner is Not running!')
+
     def execute(self, goal):
+        self.command_id = goal.command_id
+        trace.mark(self.command_id, 'dock_goal_received', action='dock' if goal.mode else 'undock')
         self.control_flag = False
         self.cart_id_sub = rospy.Subscriber('/'+ROBOT_ID+'/pick_cart_id', String, self.update_cart_id) # obtaining cart id from picking node
         rospy.sleep(1.5)
@@ -128,13 +176,15 @@ class DUActionServer:
         self.result.res = False
         if (elev_mode == True): # True --> Dock // False --> Undock
             col_dock_flag = False
-            while (self.collision_detected()):
+            col_wait_start = time.time()
+            while (self.collision_detected('cart_slot')):
                 if (col_dock_flag == False):
                     rospy.logwarn('[ {} ]: Cart Slot Occupied!'.format(rospy.get_name()))
                     col_dock_flag = True
                 rospy.sleep(1) # note: >0.2
             else:
                 rospy.loginfo('[ {} ]: Cart Slot Free'.format(rospy.get_name()))
+            metrics.histogram('fms_rob_collision_wait_seconds', 'Time waited for a free cart slot or robot exit', phase='dock').observe(time.time() - col_wait_start)
             success_se_move = self.do_du_se_move(direction, dock_distance) # pre-motion before cart
             rospy.sleep(0.2) # wait for complete halt of robot
             if direction == 'north':
@@ -181,6 +231,7 @@ class DUActionServer:
             else: 
                 self.result.res = False
                 self.du_server.set_aborted(self.result)
+                log.dump('(dock-undock aborted)') # keep the records that led to the abortion
         else:
             success_elev = self.do_du_elev(elev_mode)
             rospy.sleep(0.2)
@@ -195,13 +246,15 @@ class DUActionServer:
             success_rotate = self.do_du_rotate(dock_angle)
             if (success_rotate):
                 col_undock_flag = False
-                while (self.collision_detected()):
+                col_wait_start = time.time()
+                while (self.collision_detected('exit_corridor')):
                     if (col_undock_flag == False):
                         rospy.logwarn('[ {} ]: Robot Exit Occupied!'.format(rospy.get_name()))
                         col_undock_flag = True
                     rospy.sleep(1) # note: >0.2
                 else:
                     rospy.loginfo('[ {} ]: Robot Exit Free'.format(rospy.get_name()))
+                metrics.histogram('fms_rob_collision_wait_seconds', 'Time waited for a free cart slot or robot exit', phase='undock').observe(time.time() - col_wait_start)
                 success_move = self.do_du_move(direction, dock_distance)
             if (success_move and success_elev and success_rotate and success_odom_reset):
                 self.klt_num_pub.publish('') # reset robot vicon location for ros_mocap package
@@ -215,7 +268,9 @@ class DUActionServer:
             else: 
                 self.result.res = False
                 self.du_server.set_aborted(self.result)
+                log.dump('(dock-undock aborted)') # keep the records that led to the abortion
 
+    @dock_phase('reset_odom')
     def reset_odom(self):
         """ Service call to reset odom for motion under cart. """
         success = True
@@ -223,7 +278,8 @@ class DUActionServer:
             rospy.loginfo('[ {} ]: Resetting Odom'.format(rospy.get_name()))
             rospy.wait_for_service('/'+ROBOT_ID+'/set_odometry')
             reset_odom1 = rospy.ServiceProxy('/'+ROBOT_ID+'/set_odometry', set_odometry)
-            reset_odom1(0.0,0.0,0.0,0.0)
+            with service_timer('set_odometry'):
+                reset_odom1(0.0,0.0,0.0,0.0)
             rospy.sleep(0.2)
             rospy.loginfo('[ {} ]: Odom Reset Successful'.format(rospy.get_name()))
             return success
@@ -232,6 +288,7 @@ class DUActionServer:
             success = False
             return success
 
+    @dock_phase('secondary_move')
     def do_du_se_move(self, direction, distance):
         """
         Secondary motion before moving under cart using euclidean distance and a PD controller.
@@ -269,8 +326,8 @@ class DUActionServer:
         vel_msg.angular.z = 0
         self.vel_pub.publish(vel_msg)
         rospy.loginfo('[ {} ]: Secondary Docking Goal Position Reached'.format(rospy.get_name()))
-        orientation_error = self.calc_cart_theta() - self.curr_theta
-        orientation_error_mod = atan2(sin(orientation_error),cos(orientation_error))
+        orientation_error = self.calc_cart_theta() - self.robot_pose.pose()[2]
+        orientation_error_mod = wrap_angle(orientation_error)
         if direction == 'north':
             self.orientation_tolerance = 0.005
             self.kp_orient = 1.0
@@ -280,11 +337,12 @@ class DUActionServer:
         while(abs(orientation_error_mod) >= self.orientation_tolerance):
             vel_msg.angular.z = orientation_error * self.kp_orient
             self.vel_pub.publish(vel_msg)
-            orientation_error = self.calc_cart_theta() - self.curr_theta
-            orientation_error_mod = atan2(sin(orientation_error),cos(orientation_error))
+            orientation_error = self.calc_cart_theta() - self.robot_pose.pose()[2]
+            orientation_error_mod = wrap_angle(orientation_error)
         rospy.loginfo('[ {} ]: Secondary Docking Goal Orientation Reached'.format(rospy.get_name()))
         return success
 
+    @dock_phase('move')
     def do_du_move(self, direction, distance):
         """ 
         Final (primary) motion under cart.
@@ -299,30 +357,31 @@ class DUActionServer:
         '''odom-based motion docking'''
         # #while(abs(self.odom_coor.position.x) < distance):
         if direction == 'north':
-            while (abs(abs(self.odom_coor.position.x) - distance) > self.move_tolerance):
+            while (abs(abs(self.odom.translation().x) - distance) > self.move_tolerance):
                 if (self.du_server.is_preempt_requested()):
                     self.du_server.set_preempted()
                     rospy.logwarn('[ {} ]: Goal preempted'.format(rospy.get_name()))
                     success = False
                     return success
-                print((abs(self.odom_coor.position.x) - distance))
-                vel_msg.linear.x = (abs(self.odom_coor.position.x) - distance)*self.move_kp #self.move_speed
+                log.debug('du_move', period=0.5, remaining=abs(self.odom.translation().x) - distance, direction=direction)
+                vel_msg.linear.x = (abs(self.odom.translation().x) - distance)*self.move_kp #self.move_speed
                 vel_msg.angular.z = 0
                 self.vel_pub.publish(vel_msg)
-                self.feedback.odom_data = self.odom_data
+                self.feedback.odom_data = self.odom.msg()
                 self.du_server.publish_feedback(self.feedback)
                 r.sleep()
         else:
-            while((distance - abs(self.odom_coor.position.x)) > self.move_tolerance):
+            while((distance - abs(self.odom.translation().x)) > self.move_tolerance):
                 if (self.du_server.is_preempt_requested()):
                     self.du_server.set_preempted()
                     rospy.logwarn('[ {} ]: Goal preempted'.format(rospy.get_name()))
                     success = False
                     return success
-                vel_msg.linear.x = (distance - abs(self.odom_coor.position.x))*self.move_kp #self.move_speed
+                log.debug('du_move', period=0.5, remaining=distance - abs(self.odom.translation().x), direction=direction)
+                vel_msg.linear.x = (distance - abs(self.odom.translation().x))*self.move_kp #self.move_speed
                 vel_msg.angular.z = 0
                 self.vel_pub.publish(vel_msg)
-                self.feedback.odom_data = self.odom_data
+                self.feedback.odom_data = self.odom.msg()
                 self.du_server.publish_feedback(self.feedback)
                 r.sleep()
         '''time-based motion docking'''
@@ -344,6 +403,7 @@ class DUActionServer:
         rospy.loginfo('[ {} ]: Motion under Cart Successful'.format(rospy.get_name()))
         return success
 
+    @dock_phase('elevator')
     def do_du_elev(self, mode):
         """
         Raising or lowering of the elevator. The vicon reference to the robot (i.e: robot id)
@@ -376,7 +436,8 @@ class DUActionServer:
                         #break 
                     rospy.wait_for_service('/'+ROBOT_ID+'/robotnik_base_hw/set_digital_output')
                     move_elevator = rospy.ServiceProxy('/'+ROBOT_ID+'/robotnik_base_hw/set_digital_output', set_digital_output)
-                    move_elevator(elev_act,True) # 3 --> raise elevator // 2 --> lower elevator
+                    with service_timer('set_digital_output'):
+                        move_elevator(elev_act,True) # 3 --> raise elevator // 2 --> lower elevator
                 rospy.loginfo('[ {} ]: Elevator Service call Successful'.format(rospy.get_name()))
                 break
             except rospy.ServiceException: 
@@ -387,25 +448,28 @@ class DUActionServer:
                 success = False
                 #self.result.res = False
                 #self.du_server.set_aborted(self.result)
+        if (success):
+            self.save_cart_state(mode)
         return success
     
+    @dock_phase('rotate')
     def do_du_rotate(self, angle):
         """ Execution of robot rotation around its axis. """
         success = True
-        angle_quat = tf_conversions.transformations.quaternion_from_euler(0, 0, angle)
+        angle_quat = yaw_to_quaternion(angle)
         vel_msg = Twist()
         rospy.loginfo('[ {} ]: Rotating Cart'.format(rospy.get_name()))
         r = rospy.Rate(10)
-        while (abs(self.odom_coor.orientation.z) < angle_quat[2] - self.ang_tolerance):
+        while (abs(self.odom.rotation().z) < angle_quat[2] - self.ang_tolerance):
         #while ((angle_quat[2] - abs(self.odom_coor.orientation.z)) > self.ang_tolerance):
             if (self.du_server.is_preempt_requested()):
                 self.du_server.set_preempted()
                 rospy.logwarn('[ {} ]: Goal preempted'.format(rospy.get_name()))
                 success = False
                 return success  
-            vel_msg.angular.z = self.rot_speed #(angle_quat[2] - abs(self.odom_coor.orientation.z))*self.rot_kp
+            vel_msg.angular.z = self.rot_speed #(angle_quat[2] - abs(self.odom.rotation().z))*self.rot_kp
             self.vel_pub.publish(vel_msg)
-            self.feedback.odom_data = self.odom_data
+            self.feedback.odom_data = self.odom.msg()
             self.du_server.publish_feedback(self.feedback)
             r.sleep()
         vel_msg.angular.z = 0
@@ -415,29 +479,40 @@ class DUActionServer:
       
     def save_cart_pose(self):
         """ Saves cart pose to enable returning it later during the return action. """
-        self.reconf_client.update_configuration({"return_pose_trans_x": self.cart_pose_trans[0]})
-        self.reconf_client.update_configuration({"return_pose_trans_y": self.cart_pose_trans[1]})  
-        self.reconf_client.update_configuration({"return_pose_rot_x": self.cart_pose_rot[0]})  
-        self.reconf_client.update_configuration({"return_pose_rot_y": self.cart_pose_rot[1]})  
-        self.reconf_client.update_configuration({"return_pose_rot_z": self.cart_pose_rot[2]})  
-        self.reconf_client.update_configuration({"return_pose_rot_w": self.cart_pose_rot[3]})  
+        self.state.set({"return_pose_trans_x": self.cart_pose_trans[0],
+                        "return_pose_trans_y": self.cart_pose_trans[1],
+                        "return_pose_rot_x": self.cart_pose_rot[0],
+                        "return_pose_rot_y": self.cart_pose_rot[1],
+                        "return_pose_rot_z": self.cart_pose_rot[2],
+                        "return_pose_rot_w": self.cart_pose_rot[3]}) # single request for the whole pose
 
-    def collision_update(self, data):
-        #print(data)
-        self.collision_point_x = data.point.x
-        self.collision_point_y = data.point.y
-        self.curr_col_seq = data.header.seq
+    def save_cart_state(self, loaded):
+        """ Records whether a cart is on the elevator, to restore the cart interfaces after a restart. """
+        try:
+            self.state.set({"cart_loaded": loaded, "cart_id": self.cart_id if loaded else ''})
+        except:
+            rospy.logerr('[ {} ]: Cart state update Failed!'.format(rospy.get_name()))
 
-    def collision_detected(self):
-        #self.last_col_seq = data.header.seq
-        if (self.curr_col_seq > self.last_col_seq):
-            self.last_col_seq = self.curr_col_seq
-            if ((self.collision_point_x <= self.collision_tolerance_x) and (self.collision_point_y <= self.collision_tolerance_y)\
-            and (self.collision_point_y > -1*self.collision_tolerance_y)):                
-                rospy.logerr('[ {} ]: Collision Detected'.format(rospy.get_name()))
-                return True
-            else:
-                return False
+    def restore_cart_state(self):
+        """ Restores the ros_mocap reference and inflation distance of a cart that was carried before the restart. """
+        if not self.state.get('cart_loaded'):
+            return
+        self.cart_id = self.state.get('cart_id')
+        self.klt_num_pub.publish('/vicon/'+self.cart_id+'/'+self.cart_id) # robot is under cart
+        try:
+            self.teb_reconf_client.update_configuration({"min_obstacle_dist": 0.3}) # increased inflation distance while carrying cart
+        except:
+            rospy.logerr('[ {} ]: Inflation distance update Failed!'.format(rospy.get_name()))
+        rospy.loginfo('[ {} ]: Warm start - carrying cart {}'.format(rospy.get_name(), self.cart_id))
+
+    def collision_update(self, data, region):
+        if (data.data != self.collision[region]): # logged once per change of the region state
+            rospy.loginfo('[ {} ]: Region {} {}'.format(rospy.get_name(), region, 'Occupied' if data.data else 'Free'))
+        self.collision[region] = data.data
+
+    def collision_detected(self, region):
+        """ True while the scan shows an obstacle in the region (cart_slot or exit_corridor), or before the detector reported it. """
+        return self.collision[region]
 
     # def mapping(self, value, leftMin=-pi, leftMax=pi, rightMin=0, rightMax=2*pi):
     #     # Figure out how 'wide' each range is
@@ -448,11 +523,6 @@ class DUActionServer:
     #     # Convert the 0-1 range into a value in the right range.
     #     return rightMin + (valueScaled * rightSpan) 
     
-    def get_odom(self, data):
-        """ Obtains current odom readings. """
-        self.odom_data = data   
-        self.odom_coor = data.pose.pose
-
     def calc_se_dock_position(self, direction, distance):
         """
         Calcuation of secondary docking position using the distance between the point calculated 
@@ -465,7 +535,8 @@ class DUActionServer:
         rospy.wait_for_service('/'+ROBOT_ID+'/get_docking_pose')
         try:
             get_goal_offset = rospy.ServiceProxy('/'+ROBOT_ID+'/get_docking_pose', dockPose)
-            resp = get_goal_offset(self.cart_id, distance, direction)
+            with service_timer('get_docking_pose'):
+                resp = get_goal_offset(self.cart_id, distance, direction)
             goal = resp.dock_pose
             
             rospy.loginfo('[ {} ]: Calculating Secondary Docking Pose Service call Successful'.format(rospy.get_name()))
@@ -473,14 +544,6 @@ class DUActionServer:
         except rospy.ServiceException:
             rospy.logerr('[ {} ]: Calculating Secondary Docking Pose Service call Failed!'.format(rospy.get_name()))
 
-    def update_pose(self, data):
-        """ Robot vicon pose update. """
-        self.curr_pose_trans_x = data.transform.translation.x
-        self.curr_pose_trans_y = data.transform.translation.y
-        rot=[data.transform.rotation.x, data.transform.rotation.y, data.transform.rotation.z, data.transform.rotation.w]
-        rot_euler = tf_conversions.transformations.euler_from_quaternion(rot)
-        self.curr_theta = rot_euler[2]
-    
     def update_cart_id(self, data):
         self.cart_id = data.data
         #self.control_flag = True
@@ -494,8 +557,7 @@ class DUActionServer:
         #self.cart_pose_x = data.transform.translation.x
         #self.cart_pose_y = data.transform.translation.y
         self.cart_pose_rot=[data.transform.rotation.x, data.transform.rotation.y, data.transform.rotation.z, data.transform.rotation.w]
-        rot_euler = tf_conversions.transformations.euler_from_quaternion(self.cart_pose_rot)
-        self.cart_theta = rot_euler[2]
+        self.cart_theta = yaw(self.cart_pose_rot)
     '''
 
     def get_cart_pose(self, data):
@@ -505,9 +567,7 @@ class DUActionServer:
         self.cart_pose_sub.unregister()
     
     def calc_cart_theta(self):
-        rot_euler = tf_conversions.transformations.euler_from_quaternion(self.cart_pose_rot)
-        cart_theta = rot_euler[2]
-        return cart_theta
+        return yaw(self.cart_pose_rot)
 
     def joy_update(self, data):
         """ Getting joystick data for usage in case of interruption during elevator motion. """
@@ -523,17 +583,19 @@ class DUActionServer:
 
     def euclidean_distance(self, goal_x, goal_y):
         """ Euclidean distance between current pose and the next way point."""
-        return sqrt(pow((goal_x - self.curr_pose_trans_x), 2) + pow((goal_y - self.curr_pose_trans_y), 2))
+        x, y, _ = self.robot_pose.pose()
+        return sqrt(pow((goal_x - x), 2) + pow((goal_y - y), 2))
 
     def goal_angle(self, goal_x, goal_y):
         """ Angle between current orientation and the heading of the next way point. """
-        return atan2(goal_y - self.curr_pose_trans_y, goal_x - self.curr_pose_trans_x)
+        x, y, _ = self.robot_pose.pose()
+        return atan2(goal_y - y, goal_x - x)
 
     def angular_vel(self, goal_x, goal_y):
         """ PD controller output calculation. """
         current_time = None
-        self.error_theta = self.goal_angle(goal_x, goal_y) - self.curr_theta
-        self.error_theta = atan2(sin(self.error_theta), cos(self.error_theta)) # angle sign regulation
+        self.error_theta = self.goal_angle(goal_x, goal_y) - self.robot_pose.pose()[2]
+        self.error_theta = wrap_angle(self.error_theta) # angle sign regulation
         #print('Goal angle: {}'.format(self.goal_angle(goal_x, goal_y)))
         #print('Current angle: {}'.format(self.curr_theta))
         #print('Error angle: {}'.format(self.error_theta))
@@ -561,6 +623,7 @@ class DUActionServer:
         rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 if __name__ == '__main__':
+    profile.imports_done()
     try:
         du = DUActionServer()
     except KeyboardInterrupt:
@@ -10,38 +10,45 @@ import sys
 from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
 from geometry_msgs.msg import PoseStamped
 from fms_rob.msg import RobActionSelect, RobActionStatus
-from actionlib_msgs.msg import GoalStatusArray
 from std_srvs.srv import Empty
 from std_msgs.msg import String
+from action_context import ActionContext
+from startup_profiler import profile
+from structured_log import log
+from tracing import trace
+from metrics import service_timer
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
 '''
 
 class DriveAction:
-    def __init__(self):
-        rospy.init_node('drive_action_client')
-        self.status_flag = False # used to throttle further message sending after action execution
-        self.act_client = actionlib.SimpleActionClient('/'+ROBOT_ID+'/move_base', MoveBaseAction) 
-        err_flag = False
-        if (self.act_client.wait_for_server(timeout=rospy.Duration.from_sec(5))): # wait for server start up
-            #rospy.loginfo('[ {} ]: Move Base Server Running'.format(rospy.get_name()))
-            pass
-        else:
-            rospy.logerr('[ {} ]: Timedout waiting for Move Base Server!'.format(rospy.get_name()))     
-            err_flag = True    
-        self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.drive)
-        self.status_update_sub = rospy.Subscriber('/'+ROBOT_ID+'/move_base/status', GoalStatusArray, self.status_update) # status from move base action server  
-        self.action_status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=10) # publishes status msgs upstream
-        self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
+    def __init__(self, context=None):
+        self.hosted = (context != None) # True when running as a plugin of the action executor
+        if not self.hosted:
+            rospy.init_node('drive_action_client')
+            context = ActionContext()
+        self.context = context
+        self.status_flag = False # True while a sent goal has not been terminated yet
+        self.last_status = None # last status forwarded upstream
+        self.act_client = context.move_base_client
+        err_flag = not context.move_base_ready
+        if not self.hosted:
+            self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.drive)
+        self.action_status_pub = context.action_status_pub # publishes status msgs upstream
+        self.klt_num_pub = context.klt_num_pub # used for interfacing with the ros_mocap package
         rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
+        if self.hosted:
+            return
+        profile.ready()
         if not err_flag:
             rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
         else:
@@ -66,14 +73,16 @@ class DriveAction:
             try:
                 rospy.wait_for_service('/'+ROBOT_ID+'/move_base/clear_costmaps') # clear cost maps before sending goal to remove false positive obstacles
                 reset_costmaps = rospy.ServiceProxy('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty)
-                reset_costmaps()
+                with service_timer('clear_costmaps'):
+                    reset_costmaps()
                 rospy.loginfo('[ {} ]: Costmaps Cleared Successfully'.format(rospy.get_name())) 
             except:
                 rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
             rospy.sleep(0.5)
             #self.client.send_goal_and_wait(goal) # blocking
-            self.act_client.send_goal(goal) # non-blocking
             self.status_flag = True
+            self.last_status = None
+            self.context.send_move_base_goal(self, goal) # non-blocking
         else:
             if (data.action == 'cancelCurrent'):
                 self.act_client.cancel_goal()
@@ -89,40 +98,51 @@ class DriveAction:
             #self.goal_flstatus_flagag = False
             return
 
-    def status_update(self, data):
-        """ Forwarding status messages upstream. """
-        if (self.status_flag == True):
-            #print(data.status_list[1].status) # All status list info are at indices 0 and 1
-            status = self.act_client.get_state()
-            #print(status)
-            rospy.loginfo('[ {} ] >>> Status: {} '.format(rospy.get_name(), status))
-            msg = RobActionStatus()
+    def goal_active(self):
+        """ Forwarding the activation of the goal upstream. """
+        trace.mark(self.command_id, 'goal_active', action=self.action)
+        self.publish_status(self.act_client.get_state())
+
+    def goal_feedback(self, feedback):
+        """ Forwarding status changes reported while the goal is being executed. """
+        self.publish_status(self.act_client.get_state())
+
+    def publish_status(self, status):
+        """ Publishes the goal status upstream on status transitions only. """
+        if (status == self.last_status):
+            return
+        self.last_status = status
+        log.info('status', command_id=self.command_id, action=self.action, status=status)
+        msg = RobActionStatus()
+        msg.status = status
+        msg.command_id = self.command_id
+        msg.action = self.action # to be removed after msg modification
+        self.action_status_pub.publish(msg)
+
+    def goal_done(self, status, result):
+        """ Forwarding the final status upstream once the goal is terminated. """
+        self.publish_status(status)
+        self.status_flag = False # no further status messages are expected for this goal
+        if (status == 3): # if action execution is successful
+            rospy.loginfo('[ {} ]: Drive Action Successful'.format(rospy.get_name()))
+            print('--------------------------------')
+            self.act_client.stop_tracking_goal()
+            return
+        if (status == 4): # if action execution is aborted
             #self.act_client.stop_tracking_goal()
-            msg.status = status
-            msg.command_id = self.command_id
-            msg.action = self.action # to be removed after msg modification
-            self.action_status_pub.publish(msg)
-            if (status == 3): # if action execution is successful
-                rospy.loginfo('[ {} ]: Drive Action Successful'.format(rospy.get_name()))
-                print('--------------------------------')
-                self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                return
-            if (status == 4): # if action execution is aborted
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logerr('[ {} ]: Execution Aborted by Dock-Undock Server!'.format(rospy.get_name()))
-            if (status == 2): # if action execution is preempted
-                #self.reconf_client.update_configuration({"dock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
-    
+            rospy.logerr('[ {} ]: Execution Aborted by Dock-Undock Server!'.format(rospy.get_name()))
+            log.dump('(goal aborted)') # keep the records that led to the abortion
+        if (status == 2): # if action execution is preempted
+            #self.reconf_client.update_configuration({"dock": False})
+            #self.act_client.stop_tracking_goal()
+            rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
+
     def shutdown_hook(self):
         self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
         rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 if __name__ == '__main__':
+    profile.imports_done()
     try:
         da = DriveAction()
     except KeyboardInterrupt:
@@ -1,52 +1,65 @@
 #!/usr/bin/env python
 """
-A client that requests the navigation of the robot to its home position
-infront of the cart in preparation for the docking action. It acts as a client 
-to ROS's built in move base node,which is an implementation of an action server.
-Please note that the status message architecture follows the Goal Status Array
-type specified in ROS actions by default.
+A node that checks the robot's laser scan for obstacles in the regions that have to be
+free during the docking operations (the cart slot before moving under the cart, the exit
+corridor before moving out from under it). Every scan is checked against all regions at
+the scan rate (see scan_regions.py), and the state of each region (True: occupied) is
+published on a latched topic whenever it changes.
 """
 
 import rospy
-import actionlib
 import sys
-from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
-from geometry_msgs.msg import Pose, TransformStamped
-from fms_rob.msg import RobActionSelect, RobActionStatus
-from actionlib_msgs.msg import GoalStatusArray
-from std_msgs.msg import String, Bool
-from std_srvs.srv import Empty
-import time
-import dynamic_reconfigure.client
+from rospy.numpy_msg import numpy_msg
+from sensor_msgs.msg import LaserScan
+from std_msgs.msg import Bool
+from scan_regions import ScanRegions
+from startup_profiler import profile
+from structured_log import log
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+REGIONS = { # polygons [[x, y], ...] in the robot frame, the robot faces +x
+    'cart_slot': [[0.0, -0.3], [0.7, -0.3], [0.7, 0.3], [0.0, 0.3]],
+    'exit_corridor': [[0.0, -0.4], [0.65, -0.4], [0.65, 0.4], [0.0, 0.4]],
+}
 
 '''
 #######################################################################################
 '''
 
-class dyn_col_det:
+class DynamicCollisionDetector:
     def __init__(self):
         rospy.init_node('dynamic_collision_detector')
-        self.dyn_col_detector_sub = rospy.Subscriber('/'+ROBOT_ID+'/robotnik_safety_controller/warning_collision_point', PointStamped, self.collision_update)
-        #self.collision_point = PointStamped()
-        #self.collision_tolerance = PointStamped()
-        self.dyn_collision_point_x = float('inf')
-        self.dyn_collision_point_y = float('inf')
-        self.dyn_collision_tolerance_x = 0.65 # <0.7
-        self.dyn_collision_tolerance_y = 0.4 # 0.4
-        self.curr_dyn_col_seq = 0
-        self.last_dyn_col_seq = 0
-    
+        self.regions = ScanRegions(rospy.get_param('~regions', REGIONS),
+                                   laser_pose=rospy.get_param('~laser_pose', [0.0, 0.0, 0.0]), # (x, y, yaw) of the laser in the robot frame
+                                   min_points=rospy.get_param('~min_points', 3),
+                                   enter_scans=rospy.get_param('~enter_scans', 2),
+                                   exit_scans=rospy.get_param('~exit_scans', 5))
+        self.region_pubs = dict((name, rospy.Publisher('/'+ROBOT_ID+'/collision/'+name, Bool, queue_size=1, latch=True)) for name in self.regions.names)
+        self.published = False # the states are published as a whole after the first scan
+        self.scan_sub = rospy.Subscriber('/'+ROBOT_ID+'/scan', numpy_msg(LaserScan), self.scan_update, queue_size=1) # ranges received as an array
+        profile.ready()
+        rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+
+    def scan_update(self, data):
+        changes = self.regions.update(data.ranges, data.angle_min, data.angle_increment, data.range_min, data.range_max)
+        if not self.published:
+            changes = [(name, self.regions.occupied[name]) for name in self.regions.names]
+            self.published = True
+        for name, occupied in changes:
+            log.info('region', name=name, occupied=occupied)
+            self.region_pubs[name].publish(occupied)
+
+
 if __name__ == '__main__':
+    profile.imports_done()
     try:
-        hac = dyn_col_det()
+        dcd = DynamicCollisionDetector()
     except KeyboardInterrupt:
         sys.exit()
-        #rospy.logerr('Interrupted!')
     rospy.spin()
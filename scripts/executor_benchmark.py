@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+Compares the memory footprint and start up time of the multi-process client layout
+with the single-process action executor. Each layout is brought up through the
+package's launch file against an already running roscore and move_base, the time
+until all nodes logged their Ready message is recorded, and the resident set size
+of all processes started by roslaunch is summed.
+
+Usage: executor_benchmark.py [robot_id] [timeout]
+"""
+
+import os, sys, time, signal
+import subprocess
+import threading
+import xml.etree.ElementTree as ET
+
+
+'''
+#######################################################################################
+'''
+
+LAYOUTS = [('multi-process', 'false'), ('executor', 'true')] # name, use_executor
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LAUNCH_FILE = os.path.join(SCRIPTS_DIR, '..', 'launch', 'fms_rob.launch')
+
+'''
+#######################################################################################
+'''
+
+def launched_nodes(element, args):
+    """ Types of the nodes started by the launch file element, with the if and unless conditions evaluated for the args. """
+    condition = element.get('if', element.get('unless'))
+    if (condition != None):
+        for name, value in args.items():
+            condition = condition.replace('$(arg '+name+')', value)
+        if ((condition == 'true') != ('if' in element.attrib)):
+            return []
+    if (element.tag == 'node'):
+        return [element.get('type')]
+    return [node for child in element for node in launched_nodes(child, args)]
+
+def expected_ready(use_executor):
+    """ Number of nodes of the layout that print a Ready message. """
+    args = {'use_executor': use_executor, 'use_fleet_router': 'false'}
+    count = 0
+    for node_type in launched_nodes(ET.parse(LAUNCH_FILE).getroot(), args):
+        with open(os.path.join(SCRIPTS_DIR, node_type)) as f:
+            if (']: Ready' in f.read()):
+                count += 1
+    return count
+
+def read_ready_lines(proc, ready_times):
+    """ Records the arrival time of every Ready (or Not Ready) message printed by the nodes. """
+    for line in iter(proc.stdout.readline, b''):
+        if (b']: Ready' in line) or (b']: Not Ready!' in line):
+            ready_times.append(time.time())
+
+def child_pids(root_pid):
+    """ Returns the pids of all descendants of a process. """
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/'+entry+'/stat') as f:
+                stat = f.read()
+        except IOError:
+            continue
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        parents.setdefault(ppid, []).append(int(entry))
+    pids = []
+    pending = [root_pid]
+    while pending:
+        pid = pending.pop()
+        for child in parents.get(pid, []):
+            pids.append(child)
+            pending.append(child)
+    return pids
+
+def rss_kb(pid):
+    """ Resident set size of a process in kB. """
+    try:
+        with open('/proc/'+str(pid)+'/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return 0
+
+def run_layout(robot_id, use_executor, expected_ready, timeout):
+    env = dict(os.environ, PYTHONUNBUFFERED='1') # ready messages have to reach the pipe immediately
+    start = time.time()
+    proc = subprocess.Popen(['roslaunch', 'fms_rob', 'fms_rob.launch', 'id_robot:='+robot_id, 'use_executor:='+use_executor],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, env=env)
+    ready_times = []
+    reader = threading.Thread(target=read_ready_lines, args=(proc, ready_times))
+    reader.daemon = True
+    reader.start()
+    while (len(ready_times) < expected_ready) and (time.time() - start < timeout):
+        time.sleep(0.1)
+    ready_time = (ready_times[-1] - start) if len(ready_times) >= expected_ready else None
+    time.sleep(2) # let the nodes settle before sampling memory
+    pids = child_pids(proc.pid)
+    total_rss = sum(rss_kb(pid) for pid in pids)
+    proc.send_signal(signal.SIGINT)
+    proc.wait()
+    return len(pids), total_rss, ready_time
+
+if __name__ == '__main__':
+    robot_id = sys.argv[1] if len(sys.argv) > 1 else 'rb1_base_b'
+    timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 60.0
+    print('{:<15} {:>10} {:>15} {:>15}'.format('layout', 'processes', 'total RSS [MB]', 'ready time [s]'))
+    for name, use_executor in LAYOUTS:
+        processes, total_rss, ready_time = run_layout(robot_id, use_executor, expected_ready(use_executor), timeout)
+        ready = '{:.2f}'.format(ready_time) if ready_time != None else 'timeout'
+        print('{:<15} {:>10} {:>15.1f} {:>15}'.format(name, processes, total_rss / 1024.0, ready))
@@ -1,74 +1,192 @@
 #!/usr/bin/env python
+"""
+Publishes every robot of the fleet as a dynamic obstacle to the TEB planners of all other
+robots. The Vicon pose of every robot is subscribed to once and read at the publishing
+rate. The obstacle messages are allocated once: there is one obstacle per robot, shared
+by the obstacle arrays of all other robots, and its pose and velocity are updated in place
+on every tick. The velocities of the whole fleet are estimated in one step from the last
+Vicon poses of every robot (see velocity_estimator.py) and are also published on the
+robots' velocity topics for other consumers. Every robot only receives the robots within
+its obstacle range, extended by the distance both robots can travel within the time
+horizon: the pairs of nearby robots are found on a uniform grid of the robot positions
+rebuilt on every tick (see spatial_grid.py), so the obstacles per robot stay bounded as the
+fleet grows. An obstacle is the oriented footprint of its robot, switched to the footprint
+of the cart while the robot carries one (its klt_num topic names the cart), optionally
+swept over a short constant velocity prediction (see footprint_sweep.py).
+"""
 
-import rospy, math, tf
+import rospy
 import sys
+import numpy as np
 from costmap_converter.msg import ObstacleArrayMsg, ObstacleMsg
-from geometry_msgs.msg import Point32, QuaternionStamped, Quaternion, TwistWithCovariance, TransformStamped
-from tf.transformations import quaternion_from_euler
+from geometry_msgs.msg import Point32, TransformStamped, TwistStamped
+from std_msgs.msg import String
+from pose_geometry import yaw_to_quaternion
+from pose_subscriber import PoseSubscriber
+from velocity_estimator import VelocityEstimator
+from spatial_grid import UniformGrid
+from footprint_sweep import predict, place, convex_hull
+from startup_profiler import profile
+
+
+'''
+#######################################################################################
+'''
+
+CART_FOOTPRINT = [[-0.4, -0.35], [0.4, -0.35], [0.4, 0.35], [-0.4, 0.35]] # cart centred on the docked robot, in the robot frame [m]
+
+'''
+#######################################################################################
+'''
+
+class FleetObstacles:
+    """ Preallocated obstacle arrays of a fleet, one per robot, containing all other robots. """
+    def __init__(self, robot_ids, radius, frame_id='vicon_world', window=5, obstacle_range=4.0, time_horizon=2.0,
+                 footprint=None, cart_footprint=None, sweep_horizon=0.0, sweep_steps=5):
+        self.robot_ids = robot_ids
+        footprint = footprint if footprint != None else [[0.0, 0.0]] # a point with the radius by default (round robot)
+        cart_footprint = cart_footprint if cart_footprint != None else footprint
+        self.footprints = (np.asarray(footprint, dtype=float).reshape(-1, 2), np.asarray(cart_footprint, dtype=float).reshape(-1, 2)) # without, with a cart
+        self.sweep_horizon = sweep_horizon # [s], no sweep if not positive
+        self.sweep_steps = sweep_steps if sweep_horizon > 0.0 else 1 # predicted poses in the sweep, including the current one
+        self.obstacles = []
+        self.points = [] # preallocated polygon points of every obstacle
+        for i, robot_id in enumerate(robot_ids):
+            obstacle = ObstacleMsg()
+            obstacle.header.frame_id = frame_id
+            obstacle.id = i
+            obstacle.radius = radius
+            self.points.append([Point32() for _ in range(self.sweep_steps * max(len(self.footprints[0]), len(self.footprints[1])))])
+            obstacle.polygon.points = self.points[i][:len(self.footprints[0])]
+            self.obstacles.append(obstacle)
+        self.arrays = []
+        for robot_id in robot_ids:
+            array = ObstacleArrayMsg()
+            array.header.frame_id = frame_id
+            self.arrays.append(array)
+        self.active = () # robots of which a pose was received
+        self.estimator = VelocityEstimator(len(robot_ids), window) # last poses of every robot
+        self.velocities = np.zeros((len(robot_ids), 3)) # (vx, vy, yaw rate) of every robot at the last tick
+        self.obstacle_range = obstacle_range # [m], all robots are obstacles to each other if not positive
+        self.time_horizon = time_horizon # [s], the range grows by the distance both robots travel within it
+        self.grid = UniformGrid(obstacle_range if obstacle_range > 0.0 else 1.0)
+
+    def link(self, neighbours):
+        """ Lists the obstacles of the neighbours of every robot (index --> indices) in its array. """
+        for i, array in enumerate(self.arrays):
+            array.obstacles = [self.obstacles[j] for j in neighbours.get(i, ())]
+
+    def neighbours(self, active, poses):
+        """ Active robots within the obstacle range of every active robot. """
+        if not active:
+            return {}
+        indices = np.asarray(active)
+        speeds = np.hypot(self.velocities[indices, 0], self.velocities[indices, 1])
+        self.grid.build([poses[i][:2] for i in active])
+        i, j = self.grid.pairs(self.obstacle_range, self.time_horizon * speeds)
+        order = np.lexsort((j, i))
+        i, j = i[order], indices[j[order]]
+        lo, hi = np.searchsorted(i, np.arange(len(active)), side='left'), np.searchsorted(i, np.arange(len(active)), side='right')
+        return dict((robot, j[lo[k]:hi[k]].tolist()) for k, robot in enumerate(active))
+
+    def outlines(self, active, poses, loaded):
+        """ Footprint or swept polygon in the world frame (list of (x, y)) of every active robot. """
+        indices = np.asarray(active)
+        predicted = predict([poses[i] for i in active], self.velocities[indices], self.sweep_horizon, self.sweep_steps)
+        cart = np.array([bool(loaded[i]) for i in active]) if loaded != None else np.zeros(len(active), dtype=bool)
+        outlines = [None] * len(active)
+        for carrying in (False, True):
+            rows = np.flatnonzero(cart == carrying)
+            if (len(rows) == 0):
+                continue
+            vertices = place(predicted[rows], self.footprints[int(carrying)]) # rows x steps x k x 2
+            for row, placed in zip(rows, vertices):
+                if (self.sweep_steps > 1):
+                    outlines[row] = convex_hull(placed.reshape(-1, 2))
+                else:
+                    outlines[row] = placed[0].tolist()
+        return outlines
+
+    def update(self, poses, stamps, stamp, loaded=None):
+        """ Updates the obstacles with the poses (x, y, yaw) of the robots and their stamps in seconds, None for robots without a pose,
+        and whether the robots carry a cart. """
+        active = tuple(i for i, pose in enumerate(poses) if pose != None)
+        if active:
+            samples = np.zeros((len(poses), 3))
+            samples[list(active)] = [poses[i] for i in active]
+            self.estimator.add([stamp_i if stamp_i != None else np.nan for stamp_i in stamps], samples)
+            self.velocities = self.estimator.estimate()
+        if (self.obstacle_range > 0.0):
+            self.link(self.neighbours(active, poses)) # with the velocities of this tick
+        elif (active != self.active):
+            self.link(dict((i, [j for j in active if j != i]) for i in active))
+        self.active = active
+        if not active:
+            return
+        for i, outline in zip(active, self.outlines(active, poses, loaded)):
+            obstacle = self.obstacles[i]
+            obstacle.header.stamp = stamp
+            if (len(obstacle.polygon.points) != len(outline)):
+                obstacle.polygon.points = self.points[i][:len(outline)]
+            for point, (x, y) in zip(obstacle.polygon.points, outline):
+                point.x, point.y = x, y
+            orientation = obstacle.orientation
+            orientation.x, orientation.y, orientation.z, orientation.w = yaw_to_quaternion(poses[i][2])
+            twist = obstacle.velocities.twist
+            twist.linear.x, twist.linear.y, twist.angular.z = self.velocities[i]
+        for array in self.arrays:
+            array.header.stamp = stamp
+
+'''
+#######################################################################################
+'''
 
 class FleetPub:
     def __init__(self):
         rospy.init_node('fleet_publisher')
-        self.rob_2_pub = rospy.Publisher('/rb1_base_b/move_base/TebLocalPlannerROS/obstacles', ObstacleArrayMsg, queue_size=10)
-        topic = ['/vicon/rb1_base_c/rb1_base_c', 'geometry_msgs/TransformStamped']
-        if(topic not in rospy.get_published_topics('/vicon/')):
-            rospy.logerr('Robot Topic Not Found!')
-            return
-        rospy.Subscriber('/vicon/rb1_base_c/rb1_base_c', TransformStamped, self.rob_1_vicon_update)
-        self.vel_x = 1.0
-        self.vel_y = 1.0
-        rospy.sleep(1)
-        self.publish_obstacle_msg()
-
-    def publish_obstacle_msg(self):
-        print("Testing_obstacle_msg")
-
-        #obstacle_list = [ObstacleMsg()]
-        obstacle_arr_msg = ObstacleArrayMsg() 
-        obstacle_arr_msg.header.stamp = rospy.Time.now()
-        obstacle_arr_msg.header.frame_id = "vicon_world" # CHANGE HERE: odom/map
-
-        # Add point obstacle
-        obstacle_msg = ObstacleMsg()
-        obstacle_msg.header.stamp = rospy.Time.now()
-        obstacle_msg.header.frame_id = "vicon_world" # CHANGE HERE: odom/map
-
-        obstacle_msg.radius = 0.5
-        obstacle_msg.id = 2
-        obstacle_msg.polygon.points = [Point32()]
-        obstacle_msg.polygon.points[0].x = self.rob_1_pose_trans[0]
-        obstacle_msg.polygon.points[0].y = self.rob_1_pose_trans[1]
-        obstacle_msg.polygon.points[0].z = 0
-
-        obstacle_msg.orientation.x = self.rob_1_pose_rot[0]
-        obstacle_msg.orientation.y = self.rob_1_pose_rot[1]
-        obstacle_msg.orientation.z = self.rob_1_pose_rot[2]
-        obstacle_msg.orientation.w = self.rob_1_pose_rot[3]
-
-
-        obstacle_msg.velocities.twist.linear.x = self.vel_x
-        obstacle_msg.velocities.twist.linear.y = self.vel_y
-        obstacle_msg.velocities.twist.linear.z = 0
-        obstacle_msg.velocities.twist.angular.x = 0
-        obstacle_msg.velocities.twist.angular.y = 0
-        obstacle_msg.velocities.twist.angular.z = 0
-
-        obstacle_arr_msg.obstacles.append(obstacle_msg)
-        #print(obstacle_arr_msg)
-
-        r = rospy.Rate(10) # 10hz
-        while not rospy.is_shutdown():
-            self.rob_2_pub.publish(obstacle_arr_msg)
-            r.sleep()
-
-    def rob_1_vicon_update(self, data):
-        self.rob_1_pose_trans = [data.transform.translation.x, data.transform.translation.y]
-        self.rob_1_pose_rot = [data.transform.rotation.x, data.transform.rotation.y, data.transform.rotation.z, data.transform.rotation.w]
-
-if __name__ == '__main__': 
+        robot_ids = rospy.get_param('~robots', sorted(rospy.get_param('/robot_home', {}))) # by default all robots with a home pose
+        self.fleet = FleetObstacles(robot_ids, rospy.get_param('~radius', 0.5), window=rospy.get_param('~velocity_window', 5),
+                                    obstacle_range=rospy.get_param('~obstacle_range', 4.0), time_horizon=rospy.get_param('~time_horizon', 2.0),
+                                    footprint=rospy.get_param('~footprint', None), cart_footprint=rospy.get_param('~cart_footprint', CART_FOOTPRINT),
+                                    sweep_horizon=rospy.get_param('~sweep_horizon', 0.0), sweep_steps=rospy.get_param('~sweep_steps', 5))
+        self.loaded = [False] * len(robot_ids) # robots carrying a cart
+        self.klt_num_subs = [rospy.Subscriber('/'+robot_id+'/klt_num', String, self.klt_num_update, callback_args=i) for i, robot_id in enumerate(robot_ids)]
+        self.robot_poses = [PoseSubscriber('/vicon/'+robot_id+'/'+robot_id, TransformStamped) for robot_id in robot_ids] # decoded at the publishing rate
+        self.obstacle_pubs = [rospy.Publisher('/'+robot_id+'/move_base/TebLocalPlannerROS/obstacles', ObstacleArrayMsg, queue_size=1) for robot_id in robot_ids]
+        self.velocity_pubs = [rospy.Publisher('/'+robot_id+'/velocity', TwistStamped, queue_size=1) for robot_id in robot_ids]
+        self.velocity_msgs = [TwistStamped() for robot_id in robot_ids]
+        for velocity_msg in self.velocity_msgs:
+            velocity_msg.header.frame_id = 'vicon_world'
+        self.timer = rospy.Timer(rospy.Duration(1.0 / rospy.get_param('~rate', 10.0)), self.publish_obstacles)
+        profile.ready()
+        rospy.loginfo('[ {} ]: Ready - publishing {} robots'.format(rospy.get_name(), len(robot_ids)))
+
+    def klt_num_update(self, data, i):
+        self.loaded[i] = bool(data.data) # vicon topic of the carried cart, empty when no cart is carried
+
+    def publish_obstacles(self, event):
+        now = rospy.Time.now()
+        poses, stamps = [], []
+        for robot_pose in self.robot_poses:
+            if (robot_pose.received()):
+                poses.append(robot_pose.pose())
+                stamps.append(robot_pose.msg().header.stamp.to_sec() or now.to_sec()) # unstamped poses are taken as current
+            else:
+                poses.append(None)
+                stamps.append(None)
+        self.fleet.update(poses, stamps, now, self.loaded)
+        for i in self.fleet.active:
+            self.obstacle_pubs[i].publish(self.fleet.arrays[i]) # also when empty, to clear the robots that left the range
+            velocity_msg = self.velocity_msgs[i]
+            velocity_msg.header.stamp = now
+            velocity_msg.twist.linear.x, velocity_msg.twist.linear.y, velocity_msg.twist.angular.z = self.fleet.velocities[i]
+            self.velocity_pubs[i].publish(velocity_msg)
+
+
+if __name__ == '__main__':
+    profile.imports_done()
     try:
         fbu = FleetPub()
     except KeyboardInterrupt:
         sys.exit()
-        rospy.logerr('Interrupted!')
-    rospy.spin()
\ No newline at end of file
+    rospy.spin()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""
+Measures the cost of one publishing tick of the fleet obstacle publisher for fleets of
+5, 20 and 50 robots: the obstacle arrays of all robots are updated and serialized (as done
+by rospy on publish). The preallocated messages of fleet_publisher.py, updated in place
+(velocities estimated over the last poses of the fleet), are compared with messages rebuilt
+on every tick (one new obstacle per robot and array, velocities from the last two poses).
+Runs without a roscore.
+
+Usage: fleet_publisher_benchmark.py [ticks] [rate] [fleet sizes...]
+"""
+
+import sys, timeit
+from io import BytesIO
+import numpy as np
+import rospy
+from costmap_converter.msg import ObstacleArrayMsg, ObstacleMsg
+from geometry_msgs.msg import Point32
+from pose_geometry import yaw_to_quaternion
+from fleet_publisher import FleetObstacles
+
+
+'''
+#######################################################################################
+'''
+
+FLEET_SIZES = [5, 20, 50]
+
+'''
+#######################################################################################
+'''
+
+def rebuilt_arrays(poses, last_poses, dt, stamp):
+    """ Obstacle arrays built from scratch, with a new obstacle of every other robot. """
+    arrays = []
+    for i in range(len(poses)):
+        array = ObstacleArrayMsg()
+        array.header.stamp = stamp
+        array.header.frame_id = 'vicon_world'
+        for j, (x, y, theta) in enumerate(poses):
+            if (j == i):
+                continue
+            obstacle = ObstacleMsg()
+            obstacle.header.stamp = stamp
+            obstacle.header.frame_id = 'vicon_world'
+            obstacle.id = j
+            obstacle.radius = 0.5
+            obstacle.polygon.points = [Point32(x=x, y=y)]
+            obstacle.orientation.x, obstacle.orientation.y, obstacle.orientation.z, obstacle.orientation.w = yaw_to_quaternion(theta)
+            obstacle.velocities.twist.linear.x = (x - last_poses[j][0]) / dt
+            obstacle.velocities.twist.linear.y = (y - last_poses[j][1]) / dt
+            array.obstacles.append(obstacle)
+        arrays.append(array)
+    return arrays
+
+def serialize(arrays):
+    buff = BytesIO()
+    for array in arrays:
+        buff.seek(0)
+        array.serialize(buff)
+
+def run_rebuilt(ticks, rate):
+    for t in range(1, len(ticks)):
+        serialize(rebuilt_arrays(ticks[t], ticks[t - 1], 1.0 / rate, rospy.Time.from_sec(t / rate)))
+
+def run_preallocated(fleet, ticks, rate):
+    for t in range(len(ticks)):
+        fleet.update(ticks[t], [t / rate] * len(ticks[t]), rospy.Time.from_sec(t / rate))
+        serialize(fleet.arrays)
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0 # Hz
+    fleet_sizes = [int(size) for size in sys.argv[3:]] or FLEET_SIZES
+    rng = np.random.RandomState(0)
+    print('{:>7} {:>10} {:>18} {:>22} {:>9}'.format('robots', 'obstacles', 'rebuilt [ms/tick]', 'preallocated [ms/tick]', 'speedup'))
+    for size in fleet_sizes:
+        poses = np.cumsum(rng.normal(scale=0.05, size=(ticks, size, 3)), axis=0) # random walks
+        poses = [[tuple(float(value) for value in pose) for pose in tick] for tick in poses]
+        robot_ids = ['sim_robot_{}'.format(i) for i in range(size)]
+        rebuilt = min(timeit.repeat(lambda: run_rebuilt(poses, rate), number=1, repeat=3)) / (ticks - 1)
+        preallocated = min(timeit.repeat(lambda: run_preallocated(FleetObstacles(robot_ids, 0.5, obstacle_range=0.0), poses, rate), number=1, repeat=3)) / ticks
+        print('{:>7} {:>10} {:>18.2f} {:>22.2f} {:>8.1f}x'.format(size, size * (size - 1), rebuilt * 1e3, preallocated * 1e3, rebuilt / preallocated))
+        if (size == fleet_sizes[-1]):
+            shares = (rebuilt * rate * 100.0, preallocated * rate * 100.0)
+    print('CPU share at {:.0f} Hz with {} robots >>> rebuilt: {:.1f}%, preallocated: {:.1f}%'.format(rate, fleet_sizes[-1], *shares))
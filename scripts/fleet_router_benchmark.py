@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Measures the command throughput of the command router for fleets of simulated robots
+(default: 10, 50 and 200). Drive commands addressed to random robots are passed to the
+router as received from the broker, without a broker. With one router per robot, every
+router parses every command of the fleet to find the ones addressed to its robot; in
+fleet mode, one router parses every command once and looks its robot up. The commands
+are published on the simulated robots' rob_action topics. Requires a running roscore.
+
+Usage: fleet_router_benchmark.py [commands] [fleet sizes...]
+"""
+
+import sys, json, random, logging, timeit, tempfile, os
+import rospy
+from command_router import RobotRouter, demultiplex
+from tracing import TraceCollector, trace
+
+
+'''
+#######################################################################################
+'''
+
+FLEET_SIZES = [10, 50, 200]
+
+'''
+#######################################################################################
+'''
+
+def command(robot_id, command_id):
+    return json.dumps({'robot_id': robot_id, 'command_id': command_id, 'action': 'drive', 'cart_id': '', 'station_id': '',
+                       'bound_mode': '', 'direction': '', 'cancellation_stamp': 0.0,
+                       'pose': {'position': {'x': 1.0, 'y': 2.0, 'z': 0.0}, 'orientation': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}}})
+
+def per_robot_routers(routers, payloads):
+    """ One router per robot: every router parses every command. """
+    single = [{robot_id: router} for robot_id, router in routers.items()]
+    for payload in payloads:
+        for routers_of_process in single:
+            router, mqtt_msg = demultiplex(routers_of_process, payload)
+            if (router != None):
+                router.handle(mqtt_msg, 0.0, 0.0)
+
+def fleet_router(routers, payloads):
+    """ Fleet mode: one parse and one lookup per command. """
+    for payload in payloads:
+        router, mqtt_msg = demultiplex(routers, payload)
+        if (router != None):
+            router.handle(mqtt_msg, 0.0, 0.0)
+
+if __name__ == '__main__':
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    fleet_sizes = [int(size) for size in sys.argv[2:]] or FLEET_SIZES
+    rospy.init_node('fleet_router_benchmark')
+    logging.getLogger('rosout').setLevel(logging.WARN) # the routers log every selected action
+    trace_dir = tempfile.mkdtemp()
+    traces = TraceCollector(os.path.join(trace_dir, 'traces.jsonl'))
+    trace.sink = traces.add
+    print('{:>7} {:>22} {:>22} {:>9}'.format('robots', 'per robot [msg/s]', 'fleet mode [msg/s]', 'speedup'))
+    for size in fleet_sizes:
+        robot_ids = ['sim_robot_{}'.format(i) for i in range(size)]
+        routers = dict((robot_id, RobotRouter(robot_id, 'queue', traces)) for robot_id in robot_ids)
+        payloads = [command(random.choice(robot_ids), str(i)) for i in range(commands)]
+        per_robot = min(timeit.repeat(lambda: per_robot_routers(routers, payloads), number=1, repeat=3))
+        fleet = min(timeit.repeat(lambda: fleet_router(routers, payloads), number=1, repeat=3))
+        print('{:>7} {:>22.0f} {:>22.0f} {:>8.1f}x'.format(size, commands / per_robot, commands / fleet, per_robot / fleet))
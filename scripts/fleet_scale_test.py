@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+"""
+Scale test of the package with fleets of simulated robots (default: 1, 5 and 10) on one
+local roscore. For every fleet size, the robot stacks are launched in their namespaces
+together with the kinematic stand-ins of sim_stubs.py (move_base, odom, elevator and the
+robot's Vicon pose), and the carts and stations are published on their Vicon topics.
+Once all robots are ready, every robot is driven from a local MQTT broker (localhost:1883)
+through randomized missions (pick, dock, place, return and undock of a random cart at a
+random station). The launched nodes reach the master through a counting XML-RPC proxy.
+
+Reported per fleet size: the command throughput and status latency (command sent until
+its first status message) of every robot and of the fleet, the CPU share and RSS of every
+node, and the rate of the master API calls by method. Requires a running roscore and a
+local MQTT broker.
+
+Usage: fleet_scale_test.py [duration] [use_fleet_router] [fleet sizes...]
+"""
+
+import os, sys, time, signal, json, random, tempfile, threading
+import subprocess
+from math import pi
+import rospy
+import paho.mqtt.client as mqttClient
+from geometry_msgs.msg import TransformStamped
+from fms_rob.msg import RobReadiness
+from executor_benchmark import child_pids, rss_kb
+from pose_geometry import compose, inverse, yaw_to_quaternion
+from pose_subscriber import PoseSubscriber
+from tracing import TERMINAL_STATES
+try:
+    from SimpleXMLRPCServer import SimpleXMLRPCServer # python 2
+    from SocketServer import ThreadingMixIn
+    import xmlrpclib
+except ImportError:
+    from xmlrpc.server import SimpleXMLRPCServer
+    from socketserver import ThreadingMixIn
+    import xmlrpc.client as xmlrpclib
+
+
+'''
+#######################################################################################
+'''
+
+FLEET_SIZES = [1, 5, 10]
+MQTT_BROKER = 'localhost'
+MQTT_PORT = 1883
+METRICS_PORT = 9200 # metrics port of the first robot's command router, one port per robot
+STARTUP_TIMEOUT = 180.0 # seconds until all robots have to be ready
+COMMAND_TIMEOUT = 300.0 # seconds after which a command without final status counts as failed (ex: rejected by the interlocks)
+OBJECT_RATE = 10.0 # Vicon rate of the carts and stations [Hz]
+BOUND_MODES = ['inbound', 'outbound', 'inbound_queue', 'outbound_queue']
+DIRECTIONS = ['north', 'south']
+
+'''
+#######################################################################################
+'''
+
+class ThreadingXMLRPCServer(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+class MasterProxy:
+    """ Forwards the master API calls of the launched nodes to the master and counts them by method. """
+    def __init__(self, master_uri):
+        self.master_uri = master_uri
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingXMLRPCServer(('127.0.0.1', 0), logRequests=False, allow_none=True)
+        self.server.register_instance(self)
+        self.uri = 'http://127.0.0.1:{}/'.format(self.server.server_address[1])
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def _dispatch(self, method, params):
+        with self.lock:
+            self.counts[method] = self.counts.get(method, 0) + 1
+        return getattr(xmlrpclib.ServerProxy(self.master_uri, allow_none=True), method)(*params)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def launch_file(robots, use_fleet_router, journal_dir):
+    """ Launch file of the robot stacks with their kinematic stand-ins, the robots start side by side. """
+    lines = ['<?xml version="1.0"?>', '<launch>']
+    for i, robot_id in enumerate(robots):
+        lines += ['\t<include file="$(find fms_rob)/launch/fms_rob.launch">',
+                  '\t\t<arg name="id_robot" value="{}"/>'.format(robot_id),
+                  '\t\t<arg name="use_fleet_router" value="{}"/>'.format(use_fleet_router),
+                  '\t\t<arg name="metrics_port" value="{}"/>'.format(METRICS_PORT + i),
+                  '\t\t<arg name="mqtt_broker" value="{}"/>'.format(MQTT_BROKER),
+                  '\t\t<arg name="mqtt_port" value="{}"/>'.format(MQTT_PORT),
+                  '\t</include>',
+                  '\t<param name="{}/state_server/journal_path" value="{}"/>'.format(robot_id, os.path.join(journal_dir, robot_id+'_mission')),
+                  '\t<param name="{}/state_server/resume" value="false"/>'.format(robot_id),
+                  '\t<node ns="{}" pkg="fms_rob" name="sim_stubs" type="sim_stubs.py">'.format(robot_id),
+                  '\t\t<param name="kinematic" value="true"/>',
+                  '\t\t<rosparam param="initial_pose">[{}, 0.0, {}]</rosparam>'.format(2.0 * i, pi / 2),
+                  '\t</node>']
+    if (use_fleet_router == 'true'):
+        lines += ['\t<include file="$(find fms_rob)/launch/fleet_router.launch">',
+                  '\t\t<arg name="robots" value="[{}]"/>'.format(', '.join(robots)),
+                  '\t\t<arg name="metrics_port" value="{}"/>'.format(METRICS_PORT),
+                  '\t\t<arg name="mqtt_broker" value="{}"/>'.format(MQTT_BROKER),
+                  '\t\t<arg name="mqtt_port" value="{}"/>'.format(MQTT_PORT),
+                  '\t\t<arg name="cart_history" value="false"/>', # the simulated carts are not recorded
+                  '\t</include>']
+    lines.append('</launch>')
+    return '\n'.join(lines) + '\n'
+
+def command(robot_id, command_id, action, cart_id='', station_id='', bound_mode='', direction=''):
+    return json.dumps({'robot_id': robot_id, 'command_id': command_id, 'action': action, 'cart_id': cart_id, 'station_id': station_id,
+                       'bound_mode': bound_mode, 'direction': direction, 'cancellation_stamp': 0.0,
+                       'pose': {'position': {'x': 0.0, 'y': 0.0, 'z': 0.0}, 'orientation': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}}})
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def node_name(pid):
+    """ Namespaced name of a node process started by roslaunch, None for other processes. """
+    try:
+        with open('/proc/'+str(pid)+'/cmdline') as f:
+            args = f.read().split('\0')
+        with open('/proc/'+str(pid)+'/environ') as f:
+            env = dict(entry.split('=', 1) for entry in f.read().split('\0') if '=' in entry)
+    except IOError:
+        return None
+    names = [arg.split(':=', 1)[1] for arg in args if arg.startswith('__name:=')]
+    if not names:
+        return None
+    return env.get('ROS_NAMESPACE', '/').rstrip('/') + '/' + names[0]
+
+def cpu_ticks(pid):
+    """ User and system time of a process in clock ticks. """
+    try:
+        with open('/proc/'+str(pid)+'/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except IOError:
+        return 0
+    return int(fields[11]) + int(fields[12])
+
+'''
+#######################################################################################
+'''
+
+class World:
+    """ Carts and stations of the simulated fleet, published on their Vicon topics. Docked carts follow their robot. """
+    def __init__(self, robots, rng):
+        self.rng = rng
+        self.objects = {}
+        for i in range(2 * len(robots)):
+            self.objects['sim_cart_{}'.format(i)] = (1.0 * i, 4.0, pi / 2)
+        for i in range(max(1, len(robots) // 2)):
+            self.objects['sim_station_{}'.format(i)] = (3.0 * i, 10.0, 0.0)
+        self.free_carts = sorted(name for name in self.objects if name.startswith('sim_cart'))
+        self.stations = sorted(name for name in self.objects if name.startswith('sim_station'))
+        self.carried = {} # cart --> (robot id, cart pose in the robot frame)
+        self.robot_poses = dict((robot_id, PoseSubscriber('/vicon/'+robot_id+'/'+robot_id, TransformStamped)) for robot_id in robots)
+        self.lock = threading.Lock()
+        self.pubs = dict((name, rospy.Publisher('/vicon/'+name+'/'+name, TransformStamped, queue_size=1)) for name in self.objects)
+        self.timer = rospy.Timer(rospy.Duration(1.0 / OBJECT_RATE), self.publish)
+
+    def claim_cart(self):
+        with self.lock:
+            cart = self.rng.choice(self.free_carts)
+            self.free_carts.remove(cart)
+            return cart
+
+    def release_cart(self, cart):
+        with self.lock:
+            self.carried.pop(cart, None)
+            self.free_carts.append(cart)
+
+    def attach(self, robot_id, cart):
+        """ The docked cart moves with the robot from now on. """
+        with self.lock:
+            self.carried[cart] = (robot_id, compose(inverse(self.robot_poses[robot_id].pose()), self.objects[cart]))
+
+    def detach(self, cart):
+        with self.lock:
+            self.carried.pop(cart, None)
+
+    def publish(self, event):
+        msg = TransformStamped()
+        msg.header.stamp = rospy.Time.now()
+        msg.header.frame_id = 'vicon_world'
+        with self.lock:
+            for cart, (robot_id, relative) in self.carried.items():
+                self.objects[cart] = compose(self.robot_poses[robot_id].pose(), relative)
+            objects = list(self.objects.items())
+        for name, (x, y, theta) in objects:
+            msg.child_frame_id = name
+            msg.transform.translation.x, msg.transform.translation.y = x, y
+            rotation = msg.transform.rotation
+            rotation.x, rotation.y, rotation.z, rotation.w = yaw_to_quaternion(theta)
+            self.pubs[name].publish(msg)
+
+class MissionDriver:
+    """ Drives one robot through randomized missions, one command at a time. """
+    def __init__(self, robot_id, world, client, rng):
+        self.robot_id = robot_id
+        self.world = world
+        self.client = client
+        self.rng = rng
+        self.steps = [] # remaining commands of the mission
+        self.cart = None # cart of the current mission
+        self.current = None # (command_id, action, time sent, first status received)
+        self.sent = 0
+        self.completed = 0
+        self.failed = 0
+        self.latencies = [] # command sent until its first status [s]
+        self.lock = threading.Lock()
+
+    def new_mission(self):
+        if (self.cart != None):
+            self.world.release_cart(self.cart)
+        self.cart = self.world.claim_cart()
+        station, bound_mode, direction = self.rng.choice(self.world.stations), self.rng.choice(BOUND_MODES), self.rng.choice(DIRECTIONS)
+        return [('pick', {'cart_id': self.cart, 'direction': direction}), ('dock', {'cart_id': self.cart, 'direction': direction}),
+                ('place', {'station_id': station, 'bound_mode': bound_mode}), ('return', {'cart_id': self.cart}),
+                ('undock', {'cart_id': self.cart})]
+
+    def send_next(self):
+        if not self.steps:
+            self.steps = self.new_mission()
+        action, fields = self.steps.pop(0)
+        self.sent += 1
+        command_id = '{}-{}'.format(self.robot_id, self.sent)
+        self.current = (command_id, action, time.time(), False)
+        self.client.publish('/robotnik/mqtt_ros_command', command(self.robot_id, command_id, action, **fields))
+
+    def status_update(self, command_id, status, received):
+        with self.lock:
+            if (self.current == None) or (self.current[0] != command_id):
+                return
+            _, action, sent, status_received = self.current
+            if not status_received:
+                self.latencies.append(received - sent)
+                self.current = (command_id, action, sent, True)
+            if status not in TERMINAL_STATES:
+                return
+            if (status == 3):
+                self.completed += 1
+                if (action == 'dock'):
+                    self.world.attach(self.robot_id, self.cart)
+                elif (action == 'undock'):
+                    self.world.detach(self.cart)
+            else:
+                self.recover()
+            self.send_next()
+
+    def check_timeout(self):
+        with self.lock:
+            if (self.current != None) and (time.time() - self.current[2] > COMMAND_TIMEOUT):
+                self.recover()
+                self.send_next()
+
+    def recover(self):
+        """ A failed command ends the mission, the cart is undocked where it is. """
+        self.failed += 1
+        self.world.detach(self.cart)
+        self.steps = [('undock', {'cart_id': self.cart})] if self.current[1] != 'undock' else []
+
+    def stop(self):
+        with self.lock:
+            self.current = None
+
+'''
+#######################################################################################
+'''
+
+class FleetScaleTest:
+    def __init__(self, duration, use_fleet_router):
+        rospy.init_node('fleet_scale_test')
+        self.duration = duration
+        self.use_fleet_router = use_fleet_router
+        self.drivers = {}
+        self.ready = set() # robots of which all dependencies are ready
+        self.proxy = MasterProxy(os.environ['ROS_MASTER_URI'])
+        self.client = mqttClient.Client('fleet_scale_test')
+        self.client.on_message = self.on_message
+        self.client.connect(MQTT_BROKER, port=MQTT_PORT)
+        self.client.subscribe('/robotnik/mqtt_ros_info')
+        self.client.loop_start()
+
+    def on_message(self, client, userdata, message):
+        received = time.time()
+        info = json.loads(message.payload)
+        command_id = str(info.get('command_id', ''))
+        driver = self.drivers.get(command_id.rsplit('-', 1)[0])
+        if (driver != None):
+            driver.status_update(command_id, info.get('status'), received)
+
+    def readiness_update(self, msg, robot_id):
+        if (msg.ready):
+            self.ready.add(robot_id)
+
+    def wait_ready(self, robots):
+        """ Waits until the readiness monitors of all robots report every dependency ready, returns the number of ready robots. """
+        self.ready = set()
+        subs = [rospy.Subscriber('/'+robot_id+'/rob_readiness', RobReadiness, self.readiness_update, callback_args=robot_id) for robot_id in robots]
+        deadline = time.time() + STARTUP_TIMEOUT
+        while (len(self.ready) < len(robots)) and (time.time() < deadline) and not rospy.is_shutdown():
+            time.sleep(0.5)
+        for sub in subs:
+            sub.unregister()
+        return len(self.ready)
+
+    def sample_nodes(self, pids):
+        return dict((pid, (node_name(pid), cpu_ticks(pid))) for pid in pids)
+
+    def run(self, size, rng):
+        robots = ['sim_robot_{}'.format(i) for i in range(size)]
+        work_dir = tempfile.mkdtemp(prefix='fleet_scale_')
+        path = os.path.join(work_dir, 'fleet.launch')
+        with open(path, 'w') as f:
+            f.write(launch_file(robots, self.use_fleet_router, work_dir))
+        world = World(robots, rng)
+        env = dict(os.environ, ROS_MASTER_URI=self.proxy.uri)
+        with open(os.path.join(work_dir, 'roslaunch.log'), 'w') as log_file:
+            proc = subprocess.Popen(['roslaunch', path], stdout=log_file, stderr=subprocess.STDOUT, env=env)
+            start = time.time()
+            ready = self.wait_ready(robots)
+            print('{} robots: {} ready after {:.1f} s (log: {})'.format(size, ready, time.time() - start, work_dir))
+            time.sleep(2.0) # publishers and subscribers of the stand-ins connected
+            self.drivers = dict((robot_id, MissionDriver(robot_id, world, self.client, rng)) for robot_id in robots)
+            pids = child_pids(proc.pid)
+            before, calls_before = self.sample_nodes(pids), self.proxy.snapshot()
+            start = time.time()
+            for driver in self.drivers.values():
+                with driver.lock:
+                    driver.send_next()
+            while (time.time() - start < self.duration) and not rospy.is_shutdown():
+                time.sleep(1.0)
+                for driver in self.drivers.values():
+                    driver.check_timeout()
+            for driver in self.drivers.values():
+                driver.stop()
+            elapsed = time.time() - start
+            after, calls_after = self.sample_nodes(pids), self.proxy.snapshot()
+            rss = dict((pid, rss_kb(pid)) for pid in pids)
+            proc.send_signal(signal.SIGINT)
+            proc.wait()
+        world.timer.shutdown()
+        return self.report(size, elapsed, before, after, rss, calls_before, calls_after)
+
+    def report(self, size, elapsed, before, after, rss, calls_before, calls_after):
+        print('\n{:<16} {:>9} {:>7} {:>14} {:>13} {:>13}'.format('robot', 'commands', 'failed', 'commands/min', 'p50 lat [ms]', 'p95 lat [ms]'))
+        latencies = []
+        for robot_id in sorted(self.drivers):
+            driver = self.drivers[robot_id]
+            latencies += driver.latencies
+            print('{:<16} {:>9} {:>7} {:>14.2f} {:>13.1f} {:>13.1f}'.format(robot_id, driver.completed, driver.failed, driver.completed * 60.0 / elapsed,
+                  percentile(driver.latencies, 0.5) * 1e3, percentile(driver.latencies, 0.95) * 1e3))
+        completed = sum(driver.completed for driver in self.drivers.values())
+        print('{:<16} {:>9} {:>7} {:>14.2f} {:>13.1f} {:>13.1f}'.format('fleet', completed, sum(driver.failed for driver in self.drivers.values()),
+              completed * 60.0 / elapsed, percentile(latencies, 0.5) * 1e3, percentile(latencies, 0.95) * 1e3))
+        nodes = {} # node name without robot namespace --> [(cpu share, rss)]
+        ticks_per_s = os.sysconf('SC_CLK_TCK')
+        for pid, (name, ticks) in after.items():
+            if (name == None) or (pid not in before):
+                continue
+            share = (ticks - before[pid][1]) / float(ticks_per_s) / elapsed * 100.0
+            nodes.setdefault(name.rsplit('/', 1)[1], []).append((share, rss[pid]))
+        print('\n{:<24} {:>6} {:>14} {:>14} {:>14}'.format('node', 'count', 'mean CPU [%]', 'max CPU [%]', 'mean RSS [MB]'))
+        for name in sorted(nodes, key=lambda name: -sum(share for share, _ in nodes[name])):
+            samples = nodes[name]
+            print('{:<24} {:>6} {:>14.2f} {:>14.2f} {:>14.1f}'.format(name, len(samples), sum(share for share, _ in samples) / len(samples),
+                  max(share for share, _ in samples), sum(kb for _, kb in samples) / 1024.0 / len(samples)))
+        total_cpu = sum(share for samples in nodes.values() for share, _ in samples)
+        total_rss = sum(rss.values()) / 1024.0
+        calls = dict((method, calls_after[method] - calls_before.get(method, 0)) for method in calls_after)
+        print('\n{:<24} {:>14}'.format('master method', 'calls/s'))
+        for method in sorted(calls, key=lambda method: -calls[method]):
+            if calls[method] > 0:
+                print('{:<24} {:>14.2f}'.format(method, calls[method] / elapsed))
+        print('')
+        return size, completed * 60.0 / elapsed, percentile(latencies, 0.95) * 1e3, total_cpu, total_rss, sum(calls.values()) / elapsed
+
+    def shutdown(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.proxy.shutdown()
+
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 300.0 # seconds of missions per fleet size
+    use_fleet_router = sys.argv[2] if len(sys.argv) > 2 else 'false'
+    fleet_sizes = [int(size) for size in sys.argv[3:]] or FLEET_SIZES
+    test = FleetScaleTest(duration, use_fleet_router)
+    rng = random.Random(0)
+    results = []
+    try:
+        for size in fleet_sizes:
+            results.append(test.run(size, rng))
+    finally:
+        test.shutdown()
+    print('{:>7} {:>14} {:>18} {:>13} {:>10} {:>10} {:>16}'.format('robots', 'commands/min', 'per robot [1/min]', 'p95 lat [ms]', 'CPU [%]', 'RSS [MB]', 'master calls/s'))
+    for size, throughput, latency, cpu, rss, calls in results:
+        print('{:>7} {:>14.2f} {:>18.2f} {:>13.1f} {:>10.1f} {:>10.1f} {:>16.1f}'.format(size, throughput, throughput / size, latency, cpu, rss, calls))
+    if (len(results) > 1) and (results[0][1] > 0):
+        first, last = results[0], results[-1]
+        print('Per robot throughput at {} robots >>> {:.0f}% of the throughput at {} robots'.format(last[0], last[1] / last[0] / (first[1] / first[0]) * 100.0, first[0]))
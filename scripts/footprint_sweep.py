@@ -0,0 +1,48 @@
+"""
+Oriented footprints of moving robots and the polygons they sweep. A footprint is a list of
+vertices [[x, y], ...] in the robot frame, a single vertex [[0, 0]] for a round robot
+(given with a radius). The footprints of all robots are placed at all poses of a constant
+velocity prediction in one vectorized step, and the area swept by every robot over the
+horizon is the convex hull of its placed footprints (a segment for a round robot).
+"""
+
+import numpy as np
+
+
+'''
+#######################################################################################
+'''
+
+def predict(poses, velocities, horizon, steps):
+    """ Poses (n x steps x 3) of robots moving at constant velocities (vx, vy, yaw rate in the world frame) from now to the horizon. """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+    velocities = np.asarray(velocities, dtype=float).reshape(-1, 3)
+    t = np.linspace(0.0, horizon, steps) if steps > 1 else np.zeros(1)
+    return poses[:, None, :] + t[None, :, None] * velocities[:, None, :]
+
+def place(poses, vertices):
+    """ Vertices (n x steps x k x 2) of a footprint (k x 2) in the world frame at poses (n x steps x 3). """
+    poses = np.asarray(poses, dtype=float)
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+    c, s = np.cos(poses[..., 2])[..., None], np.sin(poses[..., 2])[..., None]
+    x = poses[..., 0][..., None] + c * vertices[:, 0] - s * vertices[:, 1]
+    y = poses[..., 1][..., None] + s * vertices[:, 0] + c * vertices[:, 1]
+    return np.stack([x, y], axis=-1)
+
+def convex_hull(points):
+    """ Counter clockwise convex hull of points (m x 2) as a list of (x, y), without collinear or repeated points (to the micrometre). """
+    points = sorted(set((round(float(x), 6), round(float(y), 6)) for x, y in points))
+    if (len(points) < 3):
+        return points
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+    lower, upper = [], []
+    for p in points:
+        while (len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0.0):
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while (len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0.0):
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
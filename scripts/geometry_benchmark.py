@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+Compares the pose geometry of pose_geometry.py with the tf_conversions path it replaced.
+Three cases are timed: the yaw extraction of a Vicon callback (one pose per call, as
+received at the Vicon rate), the docking pose (yaw, flip and offset of one cart pose) and
+the yaw extraction of a batch of poses (ex: all carts of the fleet). The results of both
+paths are checked to agree before timing. Runs without a roscore.
+
+Usage: geometry_benchmark.py [calls] [batch size] [vicon rate]
+"""
+
+import sys, timeit
+from math import cos, sin, pi
+import numpy as np
+import pose_geometry as geometry
+from tf_conversions import transformations
+
+
+'''
+#######################################################################################
+'''
+
+def tf_docking_pose(x, y, rot, distance):
+    euler = transformations.euler_from_quaternion(rot)
+    rot_opp = transformations.quaternion_from_euler(euler[0], euler[1], euler[2]+pi)
+    return x + distance * cos(euler[2]), y + distance * sin(euler[2]), rot_opp
+
+def docking_pose(x, y, rot, distance):
+    theta = geometry.yaw(rot)
+    x, y = geometry.offset_along_heading(x, y, theta, distance)
+    return x, y, geometry.flip_yaw(rot)
+
+def same_rotation(q1, q2):
+    return abs(abs(np.dot(q1, q2)) - 1.0) < 1e-9 # q and -q are the same rotation
+
+def time_per_call(function, calls):
+    return min(timeit.repeat(function, number=calls, repeat=3)) / calls
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    vicon_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100.0 # Hz per tracked body
+    rng = np.random.RandomState(0)
+    batch = rng.normal(size=(batch_size, 4))
+    batch /= np.linalg.norm(batch, axis=1)[:, None]
+    rot = [float(value) for value in batch[0]]
+    tf_yaws = np.array([transformations.euler_from_quaternion(q)[2] for q in batch])
+    assert np.allclose(tf_yaws, geometry.yaw(batch))
+    tf_pose, pose = tf_docking_pose(1.0, 2.0, rot, 0.5), docking_pose(1.0, 2.0, rot, 0.5)
+    assert np.allclose(tf_pose[:2], pose[:2]) and same_rotation(tf_pose[2], pose[2])
+    cases = [
+        ('vicon callback yaw', 1, lambda: transformations.euler_from_quaternion(rot)[2], lambda: geometry.yaw(rot)),
+        ('docking pose', 1, lambda: tf_docking_pose(1.0, 2.0, rot, 0.5), lambda: docking_pose(1.0, 2.0, rot, 0.5)),
+        ('batch yaw ({})'.format(batch_size), batch_size, lambda: [transformations.euler_from_quaternion(q)[2] for q in batch],
+                                                         lambda: geometry.yaw(batch)),
+    ]
+    print('{:<22} {:>14} {:>14} {:>9}'.format('case', 'tf [us/pose]', 'new [us/pose]', 'speedup'))
+    for name, poses, tf_path, new_path in cases:
+        repetitions = max(1, calls // poses)
+        tf_time = time_per_call(tf_path, repetitions) / poses
+        new_time = time_per_call(new_path, repetitions) / poses
+        print('{:<22} {:>14.2f} {:>14.2f} {:>8.1f}x'.format(name, tf_time * 1e6, new_time * 1e6, tf_time / new_time))
+        if (name == 'vicon callback yaw'):
+            callback_share = (tf_time * vicon_rate * 100.0, new_time * vicon_rate * 100.0)
+    print('CPU share of the yaw extraction at {:.0f} Hz per body >>> tf: {:.3f}%, new: {:.3f}%'.format(vicon_rate, *callback_share))
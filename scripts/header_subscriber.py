@@ -0,0 +1,64 @@
+"""
+Liveness subscriber for topics of any message type (ex: laser scans of several KB at 15 to
+25 Hz). The messages are received serialized and only the leading std_msgs/Header of the
+buffer (sequence number and stamp, three little endian uint32) is unpacked, without
+deserializing the rest of the message (ranges, intensities, covariances). Messages
+without a header (known from the type in the connection header) only count as arrivals.
+"""
+
+import struct
+import rospy
+import roslib.message
+
+
+'''
+#######################################################################################
+'''
+
+HEADER = struct.Struct('<3I') # seq, stamp.secs, stamp.nsecs: the first fields of a serialized message with a header
+
+def header_of(buff):
+    """ (seq, stamp [s]) of a serialized message starting with a std_msgs/Header. """
+    seq, secs, nsecs = HEADER.unpack_from(buff)
+    return seq, secs + nsecs * 1e-9
+
+def has_header(msg_type):
+    """ True for message types (ex: 'sensor_msgs/LaserScan') starting with a std_msgs/Header. """
+    msg_class = roslib.message.get_message_class(msg_type)
+    return msg_class != None and msg_class._has_header
+
+'''
+#######################################################################################
+'''
+
+class HeaderSubscriber:
+    def __init__(self, topic, callback=None, msg_class=None):
+        self.callback = callback # called with (seq, stamp [s]) of every message, (None, None) without a header
+        self.with_header = msg_class._has_header if msg_class != None else None # None: from the connection header of the first message
+        self.latest = (None, None) # (seq, stamp [s]) of the latest message
+        self.messages = 0
+        self.sub = None
+        if (topic != None): # without a topic, the serialized messages are passed to update by the caller
+            self.sub = rospy.Subscriber(topic, rospy.AnyMsg, self.update)
+
+    def update(self, data):
+        if (self.with_header == None):
+            self.with_header = has_header(data._connection_header['type'])
+        if self.with_header:
+            self.latest = header_of(data._buff)
+        self.messages += 1
+        if (self.callback != None):
+            self.callback(*self.latest)
+
+    def received(self):
+        return self.messages > 0
+
+    def seq(self):
+        return self.latest[0]
+
+    def stamp(self):
+        return self.latest[1]
+
+    def unregister(self):
+        if (self.sub != None):
+            self.sub.unregister()
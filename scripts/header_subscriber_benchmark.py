@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Compares the CPU time per message of a liveness check with full deserialization (as done
+by rospy before a typed callback) and with the header only decoding of the
+HeaderSubscriber of header_subscriber.py, for the monitored sensor messages: laser scans
+with ranges and intensities, Vicon poses and odom. The serialized messages are passed to
+the callbacks directly, so the benchmark runs without a roscore.
+
+Usage: header_subscriber_benchmark.py [messages] [scan beams]
+"""
+
+import sys, timeit
+from io import BytesIO
+import rospy
+from geometry_msgs.msg import TransformStamped
+from nav_msgs.msg import Odometry
+from sensor_msgs.msg import LaserScan
+from header_subscriber import HeaderSubscriber
+
+
+'''
+#######################################################################################
+'''
+
+def serialized(msg):
+    buff = BytesIO()
+    msg.serialize(buff)
+    any_msg = rospy.AnyMsg()
+    any_msg._buff = buff.getvalue()
+    return any_msg
+
+class FullLiveness:
+    """ The previous checks: the message deserialized by rospy, its header kept. """
+    def __init__(self, msg_class):
+        self.msg_class = msg_class
+        self.latest = (None, None)
+
+    def update(self, data):
+        msg = self.msg_class()
+        msg.deserialize(data._buff)
+        self.latest = (msg.header.seq, msg.header.stamp.to_sec())
+
+def per_message(subscriber, data, messages):
+    """ CPU time per message [us]. """
+    return min(timeit.repeat(lambda: subscriber.update(data), number=messages, repeat=3)) / messages * 1e6
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    beams = int(sys.argv[2]) if len(sys.argv) > 2 else 1081
+    scan = LaserScan()
+    scan.ranges = [1.0] * beams
+    scan.intensities = [100.0] * beams
+    vicon, odom = TransformStamped(), Odometry()
+    vicon.transform.rotation.w = odom.pose.pose.orientation.w = 1.0
+    for msg in (scan, vicon, odom):
+        msg.header.seq = 42
+        msg.header.stamp = rospy.Time(1000, 500)
+        msg.header.frame_id = 'base_link'
+    print('{:<18} {:>8} {:>18} {:>18} {:>9}'.format('message', 'bytes', 'full [us/msg]', 'header [us/msg]', 'speedup'))
+    for name, msg in [('LaserScan', scan), ('TransformStamped', vicon), ('Odometry', odom)]:
+        data = serialized(msg)
+        full, header = FullLiveness(type(msg)), HeaderSubscriber(None, msg_class=type(msg))
+        full.update(data)
+        header.update(data)
+        assert header.seq() == full.latest[0] and abs(header.stamp() - full.latest[1]) < 1e-9
+        full_time, header_time = per_message(full, data, messages), per_message(header, data, messages)
+        print('{:<18} {:>8} {:>18.2f} {:>18.2f} {:>8.1f}x'.format(name, len(data._buff), full_time, header_time, full_time / header_time))
+        if (name == 'LaserScan'):
+            shares = (full_time * 25.0 * 1e-4, header_time * 25.0 * 1e-4)
+    print('CPU share of a 25 Hz scan with {} beams >>> full: {:.3f}%, header: {:.4f}%'.format(beams, *shares))
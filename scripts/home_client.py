@@ -13,46 +13,51 @@ import sys
 from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
 from geometry_msgs.msg import Pose, TransformStamped
 from fms_rob.msg import RobActionSelect, RobActionStatus
-from actionlib_msgs.msg import GoalStatusArray
 from std_msgs.msg import String, Bool
 from std_srvs.srv import Empty
 import time
-import dynamic_reconfigure.client
+from action_context import ActionContext
+from startup_profiler import profile, wait_until
+from structured_log import log
+from tracing import trace
+from metrics import service_timer
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
 '''
 
 class HomeAction:
-    def __init__(self):
-        rospy.init_node('home_action_client')
-        self.status_flag = False # used to throttle further message sending after action execution
-        self.act_client = actionlib.SimpleActionClient('/'+ROBOT_ID+'/move_base', MoveBaseAction) 
-        rospy.loginfo('Waiting for move_base server')
-        err_flag = False
-        if (self.act_client.wait_for_server(timeout=rospy.Duration.from_sec(5))): # wait for server start up
-            #rospy.loginfo('[ {} ]: Move Base Server Running'.format(rospy.get_name()))
-            pass
-        else:
-            rospy.logerr('[ {} ]: Timedout waiting for Move Base Server!'.format(rospy.get_name()))  
-            err_flag = True      
-        self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.home)
-        self.status_update_sub = rospy.Subscriber('/'+ROBOT_ID+'/move_base/status', GoalStatusArray, self.status_update) # status from move base action server 
-        self.action_status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=10) # publishes status msgs upstream
-        self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
-        self.reconf_client = dynamic_reconfigure.client.Client("dynamic_reconf_server", timeout=30) # client of fms_rob dynmaic reconfigure server
+    def __init__(self, context=None):
+        self.hosted = (context != None) # True when running as a plugin of the action executor
+        if not self.hosted:
+            rospy.init_node('home_action_client')
+            context = ActionContext()
+        self.context = context
+        self.status_flag = False # True while a sent goal has not been terminated yet
+        self.last_status = None # last status forwarded upstream
+        self.act_client = context.move_base_client
+        err_flag = not context.move_base_ready
+        if not self.hosted:
+            self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.home)
+        self.action_status_pub = context.action_status_pub # publishes status msgs upstream
+        self.klt_num_pub = context.klt_num_pub # used for interfacing with the ros_mocap package
+        self.interlocks = context.interlocks # local cache of the interlocks held by the state server
         rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
         #self.undock_flag = True
         ###self.undock_flag = Bool()
         #self.home_pose = {}
-        rospy.sleep(1)
+        if self.hosted:
+            return
+        wait_until(lambda: self.action_sub.get_num_connections() > 0, 1.0) # command router connected
+        profile.ready()
         if not err_flag:
             rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
         else:
@@ -64,8 +69,8 @@ class HomeAction:
             self.command_id = data.command_id
             self.action = data.action # to be removed after msg modification
             home_pose = rospy.get_param('/robot_home/'+ROBOT_ID) # add default pose
-            undock_flag = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/undock')
-            if (undock_flag == True):
+            permitted, reason = self.interlocks.check('home')
+            if (permitted):
                 if (home_pose == None):
                     rospy.logerr('[ {} ]: Home Pose can Not be Obtained!'.format(rospy.get_name()))
                     return
@@ -83,32 +88,34 @@ class HomeAction:
                 try:
                     rospy.wait_for_service('/'+ROBOT_ID+'/move_base/clear_costmaps') # clear cost maps before sending goal to remove false positive obstacles
                     reset_costmaps = rospy.ServiceProxy('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty)
-                    reset_costmaps()
+                    with service_timer('clear_costmaps'):
+                        reset_costmaps()
                     rospy.loginfo('[ {} ]: Costmaps Cleared Successfully'.format(rospy.get_name())) 
                 except:
                     rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
                 rospy.sleep(0.5)
                 #self.act_client.send_goal_and_wait(goal) # blocking
-                self.act_client.send_goal(goal) # non-blocking
                 self.status_flag = True
+                self.last_status = None
+                self.context.send_move_base_goal(self, goal) # non-blocking
             else:
                 #self.act_client.cancel_goal()
-                rospy.logerr('[ {} ]: Action Rejected! - Invalid Home Action'.format(rospy.get_name()))
+                rospy.logerr('[ {} ]: Action Rejected! - Invalid Home Action ({})'.format(rospy.get_name(), reason))
                 return
         else:
             if (data.action == 'cancelCurrent'):
                 self.act_client.cancel_goal()
                 rospy.logwarn('Cancelling Current Goal')
-                self.reconf_client.update_configuration({"undock": False})
+                self.interlocks.cancelled('home')
             if (data.action == 'cancelAll'):
                 self.act_client.cancel_all_goals()
                 rospy.logwarn('cancelling All Goals')
-                self.reconf_client.update_configuration({"undock": False})
+                self.interlocks.cancelled('home')
             if (data.action == 'cancelAtAndBefore'):
                 self.act_client.cancel_goals_at_and_before_time(data.cancellation_stamp)
                 s = 'Cancelling all Goals at and before {}'.format(data.cancellation_stamp)
                 rospy.logwarn(s)
-                self.reconf_client.update_configuration({"undock": False})
+                self.interlocks.cancelled('home')
             #self.act_client.stop_tracking_goal()
             #self.status_flag = False
             return
@@ -120,53 +127,55 @@ class HomeAction:
         self.undock_flag = config['undock']
     '''
 
-    def status_update(self, data):
-        """ Forwarding status messages upstream. """
-        if (self.status_flag == True):
-            #print(data.status_list[1].status) # All status list info are at indices 0 and 1
-            status = self.act_client.get_state()
-            #print(status)
-            rospy.loginfo('[ {} ] >>> Status: {} '.format(rospy.get_name(), status))
-            msg = RobActionStatus()
+    def goal_active(self):
+        """ Forwarding the activation of the goal upstream. """
+        trace.mark(self.command_id, 'goal_active', action=self.action)
+        self.publish_status(self.act_client.get_state())
+
+    def goal_feedback(self, feedback):
+        """ Forwarding status changes reported while the goal is being executed. """
+        self.publish_status(self.act_client.get_state())
+
+    def publish_status(self, status):
+        """ Publishes the goal status upstream on status transitions only. """
+        if (status == self.last_status):
+            return
+        self.last_status = status
+        log.info('status', command_id=self.command_id, action=self.action, status=status)
+        msg = RobActionStatus()
+        msg.status = status
+        msg.command_id = self.command_id
+        msg.action = self.action # to be removed after msg modification
+        self.action_status_pub.publish(msg)
+
+    def goal_done(self, status, result):
+        """ Forwarding the final status upstream once the goal is terminated. """
+        self.publish_status(status)
+        self.status_flag = False # no further status messages are expected for this goal
+        if (status == 3): # if action execution is successful 
+            rospy.loginfo('[ {} ]: Home Action Successful'.format(rospy.get_name()))
+            print('--------------------------------')
+            self.interlocks.succeeded('home')
+            self.act_client.stop_tracking_goal()
+            return
+        if (status == 4): # if action execution is aborted
+            #self.reconf_client.update_configuration({"undock": False})
             #self.act_client.stop_tracking_goal()
-            msg.status = status
-            msg.command_id = self.command_id
-            msg.action = self.action # to be removed after msg modification
-            self.action_status_pub.publish(msg)
-            if (status == 3): # if action execution is successful 
-                rospy.loginfo('[ {} ]: Home Action Successful'.format(rospy.get_name()))
-                print('--------------------------------')
-                self.reconf_client.update_configuration({"home": True})
-                self.reconf_client.update_configuration({"pick": False})
-                self.reconf_client.update_configuration({"undock": False})
-                self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                return
-            if (status == 4): # if action execution is aborted
-                #self.reconf_client.update_configuration({"undock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logerr('[ {} ]: Execution Aborted by Move Base Server!'.format(rospy.get_name()))
-                try:
-                    rospy.wait_for_service('/'+ROBOT_ID+'/move_base/clear_costmaps') # clear cost maps before sending goal to remove false positive obstacles
-                    reset_costmaps = rospy.ServiceProxy('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty)
-                    reset_costmaps()
-                    rospy.loginfo('[ {} ]: Costmaps Cleared Successfully'.format(rospy.get_name())) 
-                except:
-                    rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
-                rospy.sleep(1)
-            if (status == 2): # if action execution is preempted
-                #self.reconf_client.update_configuration({"dock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
-    
+            rospy.logerr('[ {} ]: Execution Aborted by Move Base Server!'.format(rospy.get_name()))
+            log.dump('(goal aborted)') # keep the records that led to the abortion
+            # the costmaps are cleared by the command thread before the next goal is sent, not in the goal's done callback
+        if (status == 2): # if action execution is preempted
+            #self.reconf_client.update_configuration({"dock": False})
+            #self.act_client.stop_tracking_goal()
+            rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
+
     def shutdown_hook(self):
         self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
         self.act_client.cancel_all_goals()
         rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
     
 if __name__ == '__main__':
+    profile.imports_done()
     try:
         hac = HomeAction()
     except KeyboardInterrupt:
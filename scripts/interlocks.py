@@ -0,0 +1,90 @@
+"""
+Local cache of the interlock flags and the saved cart return pose that are held by
+the state server. The cache is kept up to date by the change notifications of the
+server (see state_bus.py), so that permission checks are done in memory instead
+of reading the flags from the parameter server on every command.
+"""
+
+import rospy
+import time
+from actionlib_msgs.msg import GoalStatus
+from state_bus import StateProxy
+from startup_profiler import profile
+from metrics import metrics
+from tracing import trace
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+# action: (interlocks of which at least one has to be set, updates on success, updates on cancellation or abortion)
+TRANSITIONS = {
+    'home': (('undock',), {'home': True, 'pick': False, 'undock': False}, {'undock': False}),
+    'pick': (('home', 'undock'), {'pick': True}, {'pick': False}),
+    'dock': (('pick',), {'dock': True, 'pick': False, 'undock': False, 'home': False}, {'pick': False, 'return': False}),
+    'place': (('dock',), {'place': True}, {'dock': False}),
+    'undock': ((), {'undock': True, 'return': False}, {'pick': False, 'return': False}), # undocking is always permitted to enable recovery
+    'return': (('place', 'dock'), {'return': True, 'place': False, 'dock': False}, {'place': False, 'dock': False}),
+}
+
+INITIAL_STATE = {'pick': False, 'dock': False, 'undock': True, 'place': False, 'home': False, 'return': False} # robot is free and without cart
+
+'''
+#######################################################################################
+'''
+
+class InterlockCache:
+    def __init__(self):
+        with profile.blocked('state_server'):
+            self.state = StateProxy() # local copy of the state held by the state server
+
+    def get(self, name):
+        """ Returns the cached value of an interlock flag or return pose parameter. """
+        return self.state.get(name)
+
+    def check(self, action):
+        """ Checks whether an action is permitted by the current interlocks. Returns the result and the reason of a rejection. """
+        if action not in TRANSITIONS:
+            return False, 'no interlock transition defined for action {}'.format(action)
+        required = TRANSITIONS[action][0]
+        if (not required) or any(self.state.get(flag) for flag in required):
+            return True, ''
+        return False, '{} requires one of the interlocks: {}'.format(action, ', '.join(required))
+
+    def set(self, updates):
+        """ Sends interlock updates to the state server in a single request. """
+        self.state.set(updates)
+
+    def succeeded(self, action):
+        self.set(TRANSITIONS[action][1])
+
+    def cancelled(self, action):
+        self.set(TRANSITIONS[action][2])
+
+    def tracked(self, action, command_id, done_cb):
+        """
+        Records the command as being executed (mission phase) and returns a done callback that
+        clears the phase once the goal is terminated, so that a restart can tell which command was interrupted.
+        The command id marks the mission as unfinished until the robot returned home or a command was aborted.
+        """
+        self.set({'command_id': command_id, 'phase': action})
+        sent = time.time()
+        trace.mark(command_id, 'goal_sent', action=action)
+        def done(status, result):
+            trace.mark(command_id, 'goal_done', action=action, status=status)
+            metrics.histogram('fms_rob_goal_duration_seconds', 'Time from sending a goal until it is terminated', action=action).observe(time.time() - sent)
+            metrics.counter('fms_rob_goals_total', 'Terminated goals by final status', action=action, status=status).inc()
+            updates = {'phase': ''}
+            if (status == GoalStatus.SUCCEEDED and action == 'home') or (status == GoalStatus.ABORTED): # mission completed or aborted
+                updates['command_id'] = ''
+            self.state.update_if(lambda state: state.get('command_id') == command_id, updates) # unless already replaced by a newer command
+            done_cb(status, result)
+        return done
+
+    def warm_start(self):
+        """ True when the state server resumed an unfinished mission or a command of the current mission was already executed. """
+        return rospy.get_param('/'+ROBOT_ID+'/state_server/warm_start', False) or bool(self.state.get('command_id'))
@@ -0,0 +1,181 @@
+"""
+Metrics registry shared by the fms_rob nodes (counters, gauges and fixed-bucket
+histograms). Recording a value costs a few microseconds, so metrics can be updated
+from the 10 Hz control loops. Each process publishes a snapshot of its registry on the
+robot's metrics topic, where the command router collects the snapshots of all nodes
+and exposes them in the Prometheus text format on a local HTTP port.
+"""
+
+import time
+import json
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+import rospy
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0) # seconds
+
+'''
+#######################################################################################
+'''
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(labels[key]).replace('\\', '\\\\').replace('"', '\\"')) for key in sorted(labels)) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+class Counter:
+    def __init__(self, labels):
+        self.labels = labels
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1.0):
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name):
+        return [(name, self.labels, self.value)]
+
+class Gauge(Counter):
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1.0):
+        self.inc(-amount)
+
+class Histogram:
+    def __init__(self, labels, buckets=DURATION_BUCKETS):
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # last count is the +Inf bucket
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value) # upper bounds are inclusive
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """ Observes the duration of the enclosed block. """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start)
+
+    def samples(self, name):
+        with self.lock:
+            counts = list(self.counts)
+            total_sum = self.sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = dict(self.labels)
+            labels['le'] = format_value(bound)
+            samples.append((name + '_bucket', labels, cumulative))
+        samples.append((name + '_sum', self.labels, total_sum))
+        samples.append((name + '_count', self.labels, cumulative))
+        return samples
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = {} # name --> (type, help)
+        self.metrics = {} # (name, labels) --> metric
+        self.lock = threading.Lock()
+        self.snapshot_pub = None
+
+    def get(self, kind, name, doc, labels, factory):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric == None:
+            with self.lock:
+                metric = self.metrics.get(key)
+                if metric == None:
+                    self.families.setdefault(name, (kind, doc))
+                    metric = factory(labels)
+                    self.metrics[key] = metric
+        return metric
+
+    def counter(self, name, doc='', **labels):
+        return self.get('counter', name, doc, labels, Counter)
+
+    def gauge(self, name, doc='', **labels):
+        return self.get('gauge', name, doc, labels, Gauge)
+
+    def histogram(self, name, doc='', buckets=DURATION_BUCKETS, **labels):
+        return self.get('histogram', name, doc, labels, lambda labels: Histogram(labels, buckets))
+
+    def snapshot(self, **extra_labels):
+        """ Returns the families of the registry as {name: [type, help, [[sample name, labels, value], ...]]}. """
+        with self.lock:
+            metrics = list(self.metrics.items())
+        families = {}
+        for (name, _), metric in metrics:
+            kind, doc = self.families[name]
+            family = families.setdefault(name, [kind, doc, []])
+            for sample_name, labels, value in metric.samples(name):
+                labels = dict(labels)
+                labels.update(extra_labels)
+                family[2].append([sample_name, labels, value])
+        return families
+
+    def start_publishing(self, period=1.0):
+        """ Publishes snapshots of the registry periodically on the robot's metrics topic. """
+        from std_msgs.msg import String
+        if (self.snapshot_pub != None):
+            return
+        robot_id = get_robot_id()
+        self.snapshot_pub = rospy.Publisher('/'+robot_id+'/metrics', String, queue_size=1)
+        def publish(event):
+            node = rospy.get_name()
+            self.snapshot_pub.publish(json.dumps({'node': node, 'families': self.snapshot(node=node)}))
+        rospy.Timer(rospy.Duration(period), publish)
+
+def timed(histogram):
+    """ Decorator observing the duration of every call of a function. """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with histogram.time():
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def service_timer(service):
+    """ Context manager observing the latency of a service call. """
+    return metrics.histogram('fms_rob_service_call_seconds', 'Service call latency', service=service).time()
+
+def render(snapshots):
+    """ Renders merged registry snapshots in the Prometheus text exposition format. """
+    merged = {}
+    for families in snapshots:
+        for name, (kind, doc, samples) in families.items():
+            merged.setdefault(name, [kind, doc, []])[2].extend(samples)
+    lines = []
+    for name in sorted(merged):
+        kind, doc, samples = merged[name]
+        lines.append('# HELP {} {}'.format(name, doc))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for sample_name, labels, value in samples:
+            lines.append('{}{} {}'.format(sample_name, format_labels(labels), format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry() # one registry per process
@@ -0,0 +1,92 @@
+"""
+Append-only journal of the mission state held by the state server
+(interlocks, return pose, current command and phase, cart on elevator). Every state
+change is appended as a single json line and synced to disk, so that a crash loses
+at most the change that was being written. The journal is periodically compacted
+into a snapshot, which keeps the load time on restart independent of the mission length.
+"""
+
+import os
+import json
+
+
+'''
+#######################################################################################
+'''
+
+STATE_KEYS = ['pick', 'dock', 'undock', 'place', 'home', 'return',
+              'return_pose_trans_x', 'return_pose_trans_y', 'return_pose_rot_x',
+              'return_pose_rot_y', 'return_pose_rot_z', 'return_pose_rot_w',
+              'command_id', 'phase', 'cart_id', 'cart_loaded'] # persisted configuration parameters
+
+'''
+#######################################################################################
+'''
+
+class MissionJournal:
+    def __init__(self, path, compact_every=100):
+        self.snapshot_path = path + '.snapshot'
+        self.journal_path = path + '.journal'
+        self.compact_every = compact_every # number of journal entries after which a snapshot is written
+        self.state = {}
+        self.entries = 0
+        directory = os.path.dirname(self.journal_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.journal = None
+
+    def load(self):
+        """ Restores the last recorded state from the snapshot and the journal entries written after it. """
+        self.state = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                self.state = json.load(f)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        self.state.update(json.loads(line))
+                    except ValueError: # partially written last entry of a crash
+                        break
+        self.compact() # start every run from a fresh snapshot and an empty journal
+        return dict(self.state)
+
+    def record(self, config):
+        """ Appends the persisted parameters that changed in a configuration to the journal. """
+        updates = dict((key, config[key]) for key in STATE_KEYS if key in config and self.state.get(key) != config[key])
+        if not updates:
+            return
+        self.state.update(updates)
+        self.journal.write(json.dumps(updates) + '\n')
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.entries += 1
+        if (self.entries >= self.compact_every):
+            self.compact()
+
+    def compact(self):
+        """
+        Writes the current state to the snapshot and truncates the journal. The snapshot is
+        replaced atomically, and as journal entries hold absolute values, replaying entries that
+        are already contained in the snapshot (crash before truncation) leads to the same state.
+        """
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_path, self.snapshot_path)
+        if self.journal != None:
+            self.journal.close()
+        self.journal = open(self.journal_path, 'w')
+        self.entries = 0
+
+    def reset(self):
+        """ Discards the recorded state. """
+        self.state = {}
+        self.compact()
+
+    def close(self):
+        if self.journal != None:
+            self.journal.close()
+            self.journal = None
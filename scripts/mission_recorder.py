@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Records the inputs of a mission for replaying it away from the lab (see mission_replayer.py):
+the MQTT commands, the vicon streams, the odom, joystick and laser scan topics of
+the robot, together with its status messages (upstream over MQTT and downstream on
+rob_action_status) as the reference cycle times. ROS messages are recorded serialized as
+received. Vicon topics that are advertised after the start are subscribed to when found.
+The recording is closed on shutdown.
+"""
+
+import rospy
+import sys, time, os
+import rospkg
+import paho.mqtt.client as mqttClient
+from mission_recording import RecordingWriter
+from topic_cache import topics
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+BROKER_ADDRESS = rospy.get_param('/MQTT_BROKER', 'gopher.phynetlab.com')
+BROKER_PORT = rospy.get_param('/MQTT_PORT', 8883)
+MQTT_TOPICS = {'/robotnik/mqtt_ros_command': 'input', '/robotnik/mqtt_ros_info': 'output'}
+
+'''
+#######################################################################################
+'''
+
+class MissionRecorder:
+    def __init__(self):
+        rospy.init_node('mission_recorder')
+        default_path = os.path.join(rospkg.get_ros_home(), 'fms_rob', 'recordings', '{}_{}.rec'.format(ROBOT_ID, time.strftime('%Y%m%d_%H%M%S')))
+        self.writer = RecordingWriter(rospy.get_param('~path', default_path))
+        self.start = time.time()
+        self.subscribers = {}
+        self.topics = { # topic --> role in the replay
+            '/'+ROBOT_ID+'/dummy_odom': 'input',
+            '/'+ROBOT_ID+'/joy': 'input',
+            '/'+ROBOT_ID+'/scan': 'input', # checked by the dynamic collision detector
+            '/'+ROBOT_ID+'/rob_action_status': 'output',
+        }
+        for topic in self.topics:
+            self.subscribe(topic)
+        self.discover_vicon_topics(None)
+        rospy.Timer(rospy.Duration(1.0), self.discover_vicon_topics)
+        self.mqtt_client = mqttClient.Client()
+        self.mqtt_client.on_connect = self.on_connect
+        self.mqtt_client.on_message = self.on_message
+        self.mqtt_client.connect_async(BROKER_ADDRESS, port=BROKER_PORT)
+        self.mqtt_client.loop_start()
+        rospy.on_shutdown(self.shutdown_hook)
+        rospy.loginfo('[ {} ]: Recording to {}'.format(rospy.get_name(), self.writer.path))
+
+    def subscribe(self, topic):
+        if topic not in self.subscribers:
+            self.subscribers[topic] = rospy.Subscriber(topic, rospy.AnyMsg, self.record, callback_args=topic)
+
+    def discover_vicon_topics(self, event):
+        """ Subscribes to the vicon topics (robots, carts and stations) advertised so far. """
+        for topic, msg_type in topics.published_topics('/vicon'):
+            if (msg_type == 'geometry_msgs/TransformStamped') and (topic not in self.subscribers):
+                self.topics[topic] = 'input'
+                self.subscribe(topic)
+
+    def record(self, data, topic):
+        header = data._connection_header
+        self.writer.write(time.time() - self.start, topic, data._buff, header['type'], header['md5sum'], self.topics[topic])
+
+    def on_connect(self, client, userdata, flags, rc):
+        if rc == 0:
+            for topic in MQTT_TOPICS:
+                client.subscribe(topic, 0)
+        else:
+            rospy.logerr('[ {} ]: Connection to Broker Failed!'.format(rospy.get_name()))
+
+    def on_message(self, client, userdata, message):
+        self.writer.write(time.time() - self.start, message.topic, message.payload, 'mqtt', '', MQTT_TOPICS.get(message.topic, 'input'))
+
+    def shutdown_hook(self):
+        self.mqtt_client.loop_stop()
+        self.writer.close()
+        rospy.logwarn('[ {} ]: {} records written to {}'.format(rospy.get_name(), self.writer.count, self.writer.path))
+
+
+if __name__ == '__main__':
+    try:
+        mr = MissionRecorder()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
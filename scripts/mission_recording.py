@@ -0,0 +1,129 @@
+"""
+File format of the mission recordings used by the record-and-replay harness. A
+recording is a sequence of records, each one a fixed header (time since the start of
+the recording, topic index, payload length) followed by the payload: the serialized
+ROS message as received (no deserialization while recording) or the raw MQTT payload.
+A topic is defined by a record of its own the first time it is seen, so a recording
+that was not closed properly can still be read. On close, an index of the record
+offsets (one entry per INDEX_PERIOD) is appended so that a replay can start at any
+time without reading the records before it.
+"""
+
+import os
+import json
+import struct
+import threading
+from bisect import bisect_right
+
+
+'''
+#######################################################################################
+'''
+
+MAGIC = b'FMSREC01'
+INDEX_MAGIC = b'FMSIDX01'
+RECORD = struct.Struct('<dHI') # time [s], topic index, payload length
+INDEX_ENTRY = struct.Struct('<dQ') # time [s], file offset
+FOOTER = struct.Struct('<QI8s') # index offset, index entries, index magic
+TOPIC_RECORD = 0xFFFF # topic index of the records defining a topic
+INDEX_PERIOD = 1.0 # seconds between index entries
+
+'''
+#######################################################################################
+'''
+
+class RecordingWriter:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.topics = {} # topic --> index
+        self.index = [] # (time, offset) of the first record after every index period
+        self.lock = threading.Lock() # records arrive from the subscriber and MQTT threads
+        self.count = 0
+
+    def write(self, stamp, topic, payload, msg_type='', md5sum='', source='ros'):
+        """ Appends a record of a topic, defining the topic on its first record. """
+        with self.lock:
+            if (self.file == None):
+                return
+            index = self.topics.get(topic)
+            if (index == None):
+                index = self.topics[topic] = len(self.topics)
+                definition = json.dumps({'index': index, 'topic': topic, 'type': msg_type, 'md5sum': md5sum, 'source': source}).encode('utf-8')
+                self.file.write(RECORD.pack(stamp, TOPIC_RECORD, len(definition)) + definition)
+            if not self.index or (stamp - self.index[-1][0] >= INDEX_PERIOD):
+                self.index.append((stamp, self.file.tell()))
+            self.file.write(RECORD.pack(stamp, index, len(payload)))
+            self.file.write(payload)
+            self.count += 1
+
+    def close(self):
+        """ Appends the index and closes the file. """
+        with self.lock:
+            if (self.file == None):
+                return
+            index_offset = self.file.tell()
+            for entry in self.index:
+                self.file.write(INDEX_ENTRY.pack(*entry))
+            self.file.write(FOOTER.pack(index_offset, len(self.index), INDEX_MAGIC))
+            self.file.close()
+            self.file = None
+
+class RecordingReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if (self.file.read(len(MAGIC)) != MAGIC):
+            raise ValueError('{} is not a mission recording'.format(path))
+        self.topics = {} # index --> topic definition
+        self.index = [] # (time, offset)
+        self.end = os.path.getsize(path) # records end at the index if there is one
+        if (self.end >= len(MAGIC) + FOOTER.size):
+            self.file.seek(self.end - FOOTER.size)
+            index_offset, entries, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+            if (magic == INDEX_MAGIC):
+                self.file.seek(index_offset)
+                data = self.file.read(entries * INDEX_ENTRY.size)
+                self.index = [INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size) for i in range(entries)]
+                self.end = index_offset
+        self.read_topics()
+
+    def read_topics(self):
+        """ Reads the topic definitions, which precede the first record of their topic. """
+        for _ in self.records(with_definitions=True):
+            pass
+
+    def records(self, start=0.0, with_definitions=False):
+        """ Yields (time, topic definition, payload) of the records from the start time on. """
+        offset = len(MAGIC)
+        if self.index and (start > 0.0):
+            position = bisect_right([entry[0] for entry in self.index], start) - 1
+            if (position >= 0):
+                offset = self.index[position][1]
+        while (offset + RECORD.size <= self.end):
+            self.file.seek(offset)
+            stamp, index, length = RECORD.unpack(self.file.read(RECORD.size))
+            payload = self.file.read(length)
+            if (len(payload) < length): # truncated by an interrupted recording
+                return
+            offset += RECORD.size + length
+            if (index == TOPIC_RECORD):
+                definition = json.loads(payload.decode('utf-8'))
+                self.topics[definition['index']] = definition
+                continue
+            if with_definitions or (stamp < start):
+                continue
+            yield stamp, self.topics[index], payload
+
+    def duration(self):
+        last = 0.0
+        for stamp, _, _ in self.records():
+            last = stamp
+        return last
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Replays a mission recorded by mission_recorder.py into the fms_rob nodes, at the recorded
+pace or accelerated (~rate), against the stubbed move_base and elevator (sim_stubs.py).
+The recorded inputs are fed back in their recorded order and timing once the robot is
+ready: the MQTT commands to the broker, the vicon, odom, joystick and laser scan
+messages on their topics (restamped with the replay time). The cycle time of every
+command (MQTT command sent until its final status) is measured and compared against
+the recording and against the results of a previous run (~baseline), which makes the
+replay a regression benchmark between versions. The results are written to ~results.
+"""
+
+import rospy
+import sys, time, json
+import threading
+import roslib.message
+import paho.mqtt.client as mqttClient
+from fms_rob.msg import RobActionStatus, RobReadiness
+from mission_recording import RecordingReader
+from startup_profiler import wait_until
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+BROKER_ADDRESS = rospy.get_param('/MQTT_BROKER', 'gopher.phynetlab.com')
+BROKER_PORT = rospy.get_param('/MQTT_PORT', 8883)
+TERMINAL_STATES = [2, 3, 4, 5, 8] # preempted, succeeded, aborted, rejected, recalled
+
+'''
+#######################################################################################
+'''
+
+def command_of(definition, payload):
+    """ Returns (command_id, action) of a recorded MQTT command of the robot, None otherwise. """
+    if (definition['type'] != 'mqtt') or (definition['source'] != 'input'):
+        return None
+    try:
+        command = json.loads(payload)
+    except ValueError:
+        return None
+    if (command.get('robot_id') != ROBOT_ID) or (command.get('action') in ['cancelCurrent', 'cancelAll', 'cancelAtAndBefore']):
+        return None
+    return str(command['command_id']), command['action']
+
+def recorded_cycles(reader):
+    """ Cycle times of the commands in the recording, from the command until its final status. """
+    sent, cycles = {}, {}
+    for stamp, definition, payload in reader.records():
+        command = command_of(definition, payload)
+        if (command != None):
+            sent[command[0]] = stamp
+        elif (definition['topic'] == '/'+ROBOT_ID+'/rob_action_status'):
+            status = RobActionStatus()
+            status.deserialize(payload)
+            if (status.status in TERMINAL_STATES) and (status.command_id in sent) and (status.command_id not in cycles):
+                cycles[status.command_id] = stamp - sent[status.command_id]
+    return cycles
+
+def fmt(seconds):
+    return '-' if (seconds == None) else '{:.2f}'.format(seconds)
+
+class MissionReplayer:
+    def __init__(self):
+        rospy.init_node('mission_replayer')
+        path = rospy.get_param('~path')
+        self.rate = rospy.get_param('~rate', 1.0) # 2.0 --> twice as fast as recorded
+        self.start = rospy.get_param('~start', 0.0) # seconds into the recording
+        self.restamp = rospy.get_param('~restamp', True) # stamp the replayed messages with the replay time
+        self.results_path = rospy.get_param('~results', path+'.cycles.json')
+        self.baseline_path = rospy.get_param('~baseline', '') # results of a previous version
+        self.tolerance = rospy.get_param('~tolerance', 0.1) # relative cycle time increase reported as regression
+        self.settle_timeout = rospy.get_param('~settle_timeout', 120.0) # seconds to wait for running commands after the last record
+        self.reader = RecordingReader(path)
+        self.recorded = recorded_cycles(self.reader)
+        self.publishers = {} # topic --> (publisher, message class)
+        for definition in self.reader.topics.values():
+            if (definition['source'] == 'input') and (definition['type'] != 'mqtt'):
+                msg_class = roslib.message.get_message_class(definition['type'])
+                self.publishers[definition['topic']] = (rospy.Publisher(definition['topic'], msg_class, queue_size=100), msg_class)
+        self.sent = {} # command_id --> (action, replay time the command was sent)
+        self.cycles = {} # command_id --> replayed cycle time
+        self.lock = threading.Lock()
+        rospy.Subscriber('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, self.status_update)
+        self.ready = False
+        rospy.Subscriber('/'+ROBOT_ID+'/rob_readiness', RobReadiness, self.readiness_update)
+        self.mqtt_client = mqttClient.Client()
+        self.mqtt_client.connect(BROKER_ADDRESS, port=BROKER_PORT)
+        self.mqtt_client.loop_start()
+        rospy.loginfo('[ {} ]: Ready - replaying {} at {}x'.format(rospy.get_name(), path, self.rate))
+
+    def readiness_update(self, data):
+        self.ready = data.ready
+
+    def status_update(self, data):
+        with self.lock:
+            if (data.status in TERMINAL_STATES) and (data.command_id in self.sent) and (data.command_id not in self.cycles):
+                self.cycles[data.command_id] = time.time() - self.sent[data.command_id][1]
+
+    def replay(self):
+        """ Feeds the recorded inputs back at their recorded times divided by the rate. """
+        if not wait_until(lambda: self.ready or rospy.is_shutdown(), 60.0):
+            rospy.logwarn('[ {} ]: Robot not ready after 60 s - replaying anyway'.format(rospy.get_name()))
+        begin = time.time()
+        for stamp, definition, payload in self.reader.records(self.start):
+            if rospy.is_shutdown():
+                return
+            delay = begin + (stamp - self.start) / self.rate - time.time()
+            if (delay > 0.0):
+                time.sleep(delay)
+            if (definition['type'] == 'mqtt'):
+                if (definition['source'] != 'input'):
+                    continue
+                command = command_of(definition, payload)
+                if (command != None):
+                    with self.lock:
+                        self.sent[command[0]] = (command[1], time.time())
+                self.mqtt_client.publish(definition['topic'], payload)
+            elif definition['topic'] in self.publishers:
+                publisher, msg_class = self.publishers[definition['topic']]
+                msg = msg_class()
+                msg.deserialize(payload)
+                if self.restamp and hasattr(msg, 'header'):
+                    msg.header.stamp = rospy.Time.now()
+                publisher.publish(msg)
+        wait_until(lambda: (len(self.cycles) == len(self.sent)) or rospy.is_shutdown(), self.settle_timeout)
+
+    def report(self):
+        """ Prints the cycle times against the recording and the baseline, and writes the results. """
+        baseline = {}
+        if self.baseline_path:
+            with open(self.baseline_path) as f:
+                baseline_run = json.load(f)
+            if (baseline_run['rate'] != self.rate):
+                rospy.logwarn('[ {} ]: Baseline replayed at {}x - cycle times are not comparable'.format(rospy.get_name(), baseline_run['rate']))
+            baseline = baseline_run['cycles']
+        regressions = 0
+        print('{:<20} {:<10} {:>12} {:>12} {:>12} {:>8}'.format('command_id', 'action', 'recorded [s]', 'replayed [s]', 'baseline [s]', 'delta'))
+        for command_id, (action, _) in sorted(self.sent.items(), key=lambda item: item[1][1]):
+            cycle = self.cycles.get(command_id)
+            reference = baseline.get(command_id)
+            delta = ''
+            if (cycle != None) and (reference != None):
+                delta = '{:+.0%}'.format(cycle / reference - 1.0) if reference > 0.0 else ''
+                if (cycle > reference * (1.0 + self.tolerance)):
+                    regressions += 1
+                    delta += ' !'
+            print('{:<20} {:<10} {:>12} {:>12} {:>12} {:>8}'.format(command_id, action, fmt(self.recorded.get(command_id)), fmt(cycle), fmt(reference), delta))
+        unfinished = len(self.sent) - len(self.cycles)
+        print('Commands: {}, unfinished: {}, regressions (>{:.0%}): {} >>> {}'.format(len(self.sent), unfinished, self.tolerance, regressions,
+                                                                                    'OK' if (regressions == 0 and unfinished == 0) else 'REGRESSION'))
+        with open(self.results_path, 'w') as f:
+            json.dump({'rate': self.rate, 'cycles': self.cycles}, f, indent=1)
+        rospy.loginfo('[ {} ]: Results written to {}'.format(rospy.get_name(), self.results_path))
+
+
+if __name__ == '__main__':
+    try:
+        mr = MissionReplayer()
+    except KeyboardInterrupt:
+        sys.exit()
+    mr.replay()
+    mr.report()
+    mr.mqtt_client.loop_stop()
+    mr.reader.close()
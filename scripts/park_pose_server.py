@@ -8,17 +8,19 @@ reliant on the pose published from vicon.
 
 import rospy
 from geometry_msgs.msg import TransformStamped, PoseStamped
-from math import cos, sin
-import tf_conversions
+import numpy as np
+from pose_geometry import yaw, compose
 from fms_rob.srv import parkPose, parkPoseResponse
-import tf
+from startup_profiler import profile
+from topic_cache import topics
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
@@ -29,51 +31,30 @@ station_pose = TransformStamped()
 def get_parking_spots(req):
     """ Calculates the inbound, outbound, and queue poses with respect to a station. """
     global station_pose
-    goal_inbound = PoseStamped()
-    goal_outbound = PoseStamped()
-    goal_inbound_queue = PoseStamped()
-    goal_outbound_queue = PoseStamped()
-    outbound_to_station_listener = tf.TransformListener()
-    inbound_to_station_listener = tf.TransformListener()
-    inbound_queue_to_station_listener = tf.TransformListener()
-    outbound_queue_to_station_listener = tf.TransformListener()
     station_id = req.station_id
     distance = req.distance
-    topic = ['/vicon/'+station_id+'/'+station_id, 'geometry_msgs/TransformStamped']
-    if(topic not in rospy.get_published_topics('/vicon/')):
+    if(not topics.published('/vicon/'+station_id+'/'+station_id, 'geometry_msgs/TransformStamped')):
         rospy.logerr('[ {} ]: Station Topic Not Found!'.format(rospy.get_name()))
         return
     rospy.Subscriber('/vicon/'+station_id+'/'+station_id, TransformStamped, get_vicon_pose)
     rospy.sleep(1) #waits for completion of topic subscribtion   
     station_pose_quat = [station_pose.transform.rotation.x, station_pose.transform.rotation.y, station_pose.transform.rotation.z, station_pose.transform.rotation.w]
-    #station_pose_euler = tf_conversions.transformations.euler_from_quaternion(station_pose_quat)
+    station = (station_pose.transform.translation.x, station_pose.transform.translation.y, yaw(station_pose_quat))
    
-    # offset from station for parking
-    goal_outbound.header.frame_id = 'vicon/'+station_id+'/'+station_id
-    goal_outbound.pose.position.y -= distance
-    goal_outbound_transformed = outbound_to_station_listener.transformPose('vicon_world', goal_outbound) # goal point in vicon_world frame
-
-    goal_inbound.header.frame_id = 'vicon/'+station_id+'/'+station_id
-    goal_inbound.pose.position.y += distance
-    goal_inbound_transformed = inbound_to_station_listener.transformPose('vicon_world', goal_inbound)
-
-    goal_outbound_queue.header.frame_id = 'vicon/'+station_id+'/'+station_id
-    goal_outbound_queue.pose.position.x -= distance
-    goal_outbound_queue.pose.position.y -= distance
-    goal_outbound_queue_transformed = outbound_queue_to_station_listener.transformPose('vicon_world', goal_outbound_queue)
-
-    goal_inbound_queue.header.frame_id = 'vicon/'+station_id+'/'+station_id
-    goal_inbound_queue.pose.position.x -= distance
-    goal_inbound_queue.pose.position.y += distance
-    goal_inbound_queue_transformed = inbound_queue_to_station_listener.transformPose('vicon_world', goal_inbound_queue)
-
-    # orientation wrt station - same orientaiton as the station
-    goal_inbound.pose.orientation.x = goal_outbound.pose.orientation.x = goal_inbound_queue.pose.orientation.x = goal_outbound_queue.pose.orientation.x = station_pose_quat[0] 
-    goal_inbound.pose.orientation.y = goal_outbound.pose.orientation.x = goal_inbound_queue.pose.orientation.x = goal_outbound_queue.pose.orientation.x = station_pose_quat[1]
-    goal_inbound.pose.orientation.z = goal_outbound.pose.orientation.x = goal_inbound_queue.pose.orientation.x = goal_outbound_queue.pose.orientation.x = station_pose_quat[2]
-    goal_inbound.pose.orientation.w = goal_outbound.pose.orientation.x = goal_inbound_queue.pose.orientation.x = goal_outbound_queue.pose.orientation.x = station_pose_quat[3]
+    # offset from station for parking: outbound, inbound, outbound queue, inbound queue (in the station frame)
+    offsets = np.array([[0.0, -distance, 0.0], [0.0, distance, 0.0], [-distance, -distance, 0.0], [-distance, distance, 0.0]])
+    spots = compose(np.tile(station, (len(offsets), 1)), offsets) # goal points in vicon_world frame
+    goals = []
+    for spot in spots:
+        goal = PoseStamped()
+        goal.header.frame_id = 'vicon_world'
+        goal.pose.position.x, goal.pose.position.y = spot[0], spot[1]
+        goal.pose.position.z = station_pose.transform.translation.z
+        # orientation wrt station - same orientaiton as the station
+        goal.pose.orientation.x, goal.pose.orientation.y, goal.pose.orientation.z, goal.pose.orientation.w = station_pose_quat
+        goals.append(goal)
     rospy.loginfo('[ {} ]: Parking Spots Calculated'.format(rospy.get_name()))
-    return [goal_outbound_transformed, goal_inbound_transformed, goal_outbound_queue_transformed, goal_inbound_queue_transformed]
+    return goals
 
 def get_vicon_pose(data):
     """ Returns the location of the station in Vicon. """
@@ -82,12 +63,14 @@ def get_vicon_pose(data):
 
 def dock_pose_server():
     s = rospy.Service('/'+ROBOT_ID+'/get_parking_spots', parkPose, get_parking_spots)
+    profile.ready()
     rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
 
 def shutdown_hook():
     rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
 
 if __name__ == "__main__":
+    profile.imports_done()
     rospy.init_node('park_pose_server')
     rospy.on_shutdown(shutdown_hook)
     dock_pose_server()
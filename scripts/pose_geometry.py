@@ -0,0 +1,84 @@
+"""
+Planar pose geometry shared by the pose servers, the dock-undock server and the return
+clients. Quaternions are (x, y, z, w) like in geometry_msgs, poses are (x, y, yaw).
+Every function accepts a single value or an array of values (one per row) and returns
+the same shape. Single values are computed with the math module, which is faster than
+NumPy for one element (ex: a Vicon callback), arrays are computed vectorized.
+The yaw follows the static x-y-z Euler convention of tf.transformations.
+"""
+
+from math import atan2, sin, cos, pi
+import numpy as np
+
+
+'''
+#######################################################################################
+'''
+
+def is_single(value):
+    """ True for a single value given as a list or tuple of scalars (not an array). """
+    return (not isinstance(value, np.ndarray)) and (not hasattr(value[0], '__len__'))
+
+def msg_yaw(q):
+    """ Yaw of a geometry_msgs Quaternion, without copying it to a list. """
+    return atan2(2.0 * (q.w * q.z + q.x * q.y), 1.0 - 2.0 * (q.y * q.y + q.z * q.z))
+
+def yaw(q):
+    """ Yaw of quaternions (x, y, z, w). """
+    if is_single(q):
+        x, y, z, w = q
+        return atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    q = np.asarray(q, dtype=float)
+    return np.arctan2(2.0 * (q[..., 3] * q[..., 2] + q[..., 0] * q[..., 1]), 1.0 - 2.0 * (q[..., 1] ** 2 + q[..., 2] ** 2))
+
+def yaw_to_quaternion(theta):
+    """ Quaternions (x, y, z, w) of rotations by yaw about the z axis. """
+    if np.isscalar(theta):
+        return (0.0, 0.0, sin(theta / 2.0), cos(theta / 2.0))
+    theta = np.asarray(theta, dtype=float)
+    q = np.zeros(theta.shape + (4,))
+    q[..., 2] = np.sin(theta / 2.0)
+    q[..., 3] = np.cos(theta / 2.0)
+    return q
+
+def flip_yaw(q):
+    """ Quaternions rotated by pi about the world z axis (yaw + pi, roll and pitch kept). """
+    if is_single(q):
+        x, y, z, w = q
+        return (-y, x, w, -z)
+    q = np.asarray(q, dtype=float)
+    return np.stack([-q[..., 1], q[..., 0], q[..., 3], -q[..., 2]], axis=-1)
+
+def wrap_angle(angle):
+    """ Angles wrapped to [-pi, pi]. """
+    if np.isscalar(angle):
+        return atan2(sin(angle), cos(angle))
+    angle = np.asarray(angle, dtype=float)
+    return np.arctan2(np.sin(angle), np.cos(angle))
+
+def offset_along_heading(x, y, theta, distance):
+    """ Positions moved by distance along the heading theta (backwards for a negative distance). """
+    if np.isscalar(theta):
+        return (x + distance * cos(theta), y + distance * sin(theta))
+    theta = np.asarray(theta, dtype=float)
+    return (np.asarray(x) + distance * np.cos(theta), np.asarray(y) + distance * np.sin(theta))
+
+def compose(a, b):
+    """ SE(2) composition a * b of poses (x, y, yaw): pose b given in the frame of pose a. """
+    if is_single(a) and is_single(b):
+        c, s = cos(a[2]), sin(a[2])
+        return (a[0] + c * b[0] - s * b[1], a[1] + s * b[0] + c * b[1], atan2(sin(a[2] + b[2]), cos(a[2] + b[2])))
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    c, s = np.cos(a[..., 2]), np.sin(a[..., 2])
+    return np.stack([a[..., 0] + c * b[..., 0] - s * b[..., 1], a[..., 1] + s * b[..., 0] + c * b[..., 1],
+                     wrap_angle(a[..., 2] + b[..., 2])], axis=-1)
+
+def inverse(a):
+    """ SE(2) inverse of poses (x, y, yaw), such that compose(a, inverse(a)) is the identity. """
+    if is_single(a):
+        c, s = cos(a[2]), sin(a[2])
+        return (-c * a[0] - s * a[1], s * a[0] - c * a[1], -a[2])
+    a = np.asarray(a, dtype=float)
+    c, s = np.cos(a[..., 2]), np.sin(a[..., 2])
+    return np.stack([-c * a[..., 0] - s * a[..., 1], s * a[..., 0] - c * a[..., 1], -a[..., 2]], axis=-1)
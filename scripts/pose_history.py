@@ -0,0 +1,149 @@
+"""
+History of the planar poses of the carts (or any tracked body). The timestamped poses
+(t, x, y, yaw) of every cart are kept in fixed size ring buffers backed by memory-mapped
+files, so the history survives restarts and is written to disk by the page cache instead
+of by the recording node. Samples are decimated: a pose is only recorded when the cart
+moved or turned by more than a threshold since the last recorded pose, or when a period
+elapsed (so resting carts cost one sample per period). Moves of a cart by more than the
+motion distance are additionally recorded as events in a second, smaller ring buffer.
+The samples of a ring are ordered by time, so the pose at a time is found by a binary
+search in O(log n).
+"""
+
+import os
+import threading
+import numpy as np
+from pose_geometry import wrap_angle
+
+
+'''
+#######################################################################################
+'''
+
+FIELDS = 4 # t, x, y, yaw
+
+class PoseRing:
+    def __init__(self, path, capacity):
+        """ Opens the ring buffer in the file, created if missing. An existing file keeps its capacity. """
+        if os.path.exists(path) and os.path.getsize(path) >= 2 * FIELDS * 8:
+            capacity = os.path.getsize(path) // (FIELDS * 8) - 1
+            self.data = np.memmap(path, dtype=np.float64, mode='r+', shape=(FIELDS, capacity + 1))
+        else:
+            self.data = np.memmap(path, dtype=np.float64, mode='w+', shape=(FIELDS, capacity + 1))
+        self.capacity = capacity
+        self.header = self.data[:, 0] # number of poses ever appended, in the first field
+        self.columns = self.data[:, 1:] # one column per pose
+        self.times = self.columns[0] # contiguous, so searched without a copy
+
+    def count(self):
+        return int(self.header[0])
+
+    def __len__(self):
+        return min(self.count(), self.capacity)
+
+    def start(self):
+        """ Column of the oldest pose. """
+        count = self.count()
+        return count % self.capacity if count > self.capacity else 0
+
+    def row(self, i):
+        """ Column of the i-th oldest pose. """
+        return (self.start() + i) % self.capacity
+
+    def append(self, t, x, y, yaw):
+        count = self.count()
+        self.columns[:, count % self.capacity] = (t, x, y, yaw)
+        self.header[0] = count + 1 # written after the pose, so a crash never exposes a partial pose
+
+    def last(self):
+        """ Latest (t, x, y, yaw), None if empty. """
+        count = self.count()
+        if (count == 0):
+            return None
+        return tuple(self.columns[:, (count - 1) % self.capacity])
+
+    def index(self, t):
+        """ Index (0: oldest) of the latest pose at or before t, -1 if t is before the oldest pose. """
+        size, start = len(self), self.start()
+        if (start == 0):
+            return int(np.searchsorted(self.times[:size], t, 'right')) - 1
+        if (t < self.times[0]): # in the older part, columns start..capacity
+            return int(np.searchsorted(self.times[start:], t, 'right')) - 1
+        return self.capacity - start + int(np.searchsorted(self.times[:start], t, 'right')) - 1
+
+    def at(self, t):
+        """ Latest (t, x, y, yaw) at or before t, None if t is before the oldest pose. """
+        i = self.index(t)
+        if (i < 0):
+            return None
+        return tuple(self.columns[:, self.row(i)])
+
+    def between(self, start_t, end_t):
+        """ Poses with start_t <= t <= end_t, ordered by time (k x 4). """
+        first, last = self.index(np.nextafter(start_t, -np.inf)) + 1, self.index(end_t)
+        if (last < first):
+            return np.zeros((0, FIELDS))
+        return self.columns[:, (self.start() + np.arange(first, last + 1)) % self.capacity].T
+
+    def flush(self):
+        self.data.flush()
+
+'''
+#######################################################################################
+'''
+
+class CartHistory:
+    def __init__(self, directory, capacity=100000, event_capacity=10000, period=5.0, distance=0.01, angle=0.02, motion=0.05):
+        self.directory = directory
+        self.capacity = capacity # poses per cart
+        self.event_capacity = event_capacity # motion events per cart
+        self.period = period # seconds between the poses recorded while a cart rests
+        self.distance = distance # meters moved since the last recorded pose to record a pose
+        self.angle = angle # radians turned since the last recorded pose to record a pose
+        self.motion = motion # meters moved since the last event to record an event
+        self.carts = {} # cart --> (poses, events)
+        self.lock = threading.Lock() # rings opened once, by the recording or the querying thread
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def rings(self, cart):
+        rings = self.carts.get(cart)
+        if (rings == None):
+            with self.lock:
+                rings = self.carts.get(cart)
+                if (rings == None):
+                    rings = self.carts[cart] = (PoseRing(os.path.join(self.directory, cart+'.poses'), self.capacity),
+                                                PoseRing(os.path.join(self.directory, cart+'.events'), self.event_capacity))
+        return rings
+
+    def add(self, cart, t, x, y, yaw):
+        """ Records the pose of a cart if it moved, turned or the period elapsed. Returns True if recorded. """
+        poses, events = self.rings(cart)
+        last = poses.last()
+        if (last != None):
+            if (t <= last[0]): # not newer than the recorded poses (ex: Vicon frames out of order)
+                return False
+            if (t - last[0] < self.period and np.hypot(x - last[1], y - last[2]) <= self.distance and abs(wrap_angle(yaw - last[3])) <= self.angle):
+                return False
+        poses.append(t, x, y, yaw)
+        event = events.last()
+        if (event == None or np.hypot(x - event[1], y - event[2]) > self.motion):
+            events.append(t, x, y, yaw)
+        return True
+
+    def pose_at(self, cart, t):
+        """ Recorded (t, x, y, yaw) of the cart at or before t, None if unknown. """
+        if (cart not in self.carts and not os.path.exists(os.path.join(self.directory, cart+'.poses'))):
+            return None
+        return self.rings(cart)[0].at(t)
+
+    def moves(self, cart, start_t, end_t):
+        """ Poses of the cart after its moves between start_t and end_t (k x 4). """
+        if (cart not in self.carts and not os.path.exists(os.path.join(self.directory, cart+'.events'))):
+            return np.zeros((0, FIELDS))
+        return self.rings(cart)[1].between(start_t, end_t)
+
+    def flush(self):
+        for poses, events in self.carts.values():
+            poses.flush()
+            events.flush()
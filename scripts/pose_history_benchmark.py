@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Measures the time-indexed lookup of the pose history of pose_history.py (binary search
+in the memory-mapped ring buffer) against a linear scan of the recorded stamps, for
+growing histories that have wrapped around the ring, and the cost of recording a pose.
+The rings are written to a temporary directory, so the benchmark runs without a roscore.
+
+Usage: pose_history_benchmark.py [lookups]
+"""
+
+import sys, timeit
+import shutil, tempfile
+import numpy as np
+from pose_history import PoseRing, CartHistory
+
+
+'''
+#######################################################################################
+'''
+
+def linear_at(ring, t):
+    """ Latest pose at or before t found by scanning all recorded stamps. """
+    start = ring.start()
+    times = np.concatenate((ring.times[start:len(ring)], ring.times[:start]))
+    before = np.flatnonzero(times <= t)
+    if (len(before) == 0):
+        return None
+    return tuple(ring.columns[:, ring.row(before[-1])])
+
+if __name__ == '__main__':
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    directory = tempfile.mkdtemp()
+    rng = np.random.RandomState(0)
+    try:
+        print('{:>10} {:>18} {:>18} {:>9}'.format('poses', 'search [us]', 'scan [us]', 'speedup'))
+        for capacity in (1000, 10000, 100000, 1000000):
+            ring = PoseRing('{}/ring_{}'.format(directory, capacity), capacity)
+            count = capacity + capacity // 3 # wrapped around
+            stamps = np.arange(count) * 0.1
+            ring.columns[0] = np.roll(stamps[-capacity:], count % capacity)
+            ring.header[0] = count
+            queries = rng.uniform(stamps[-capacity], stamps[-1], lookups)
+            assert all(ring.at(t) == linear_at(ring, t) for t in queries[:20])
+            search = min(timeit.repeat(lambda: [ring.at(t) for t in queries], number=1, repeat=3)) / lookups * 1e6
+            scan = min(timeit.repeat(lambda: [linear_at(ring, t) for t in queries[:50]], number=1, repeat=3)) / 50 * 1e6
+            print('{:>10} {:>18.2f} {:>18.2f} {:>8.1f}x'.format(capacity, search, scan, scan / search))
+        history = CartHistory(directory + '/history', capacity=100000, period=0.0)
+        poses = rng.uniform(0.0, 10.0, (lookups, 3))
+        record = min(timeit.repeat(lambda: [history.add('cart', history.rings('cart')[0].count() + 1.0, *pose) for pose in poses], number=1, repeat=3)) / lookups * 1e6
+        print('Pose recording >>> {:.2f} us per pose, lookup in {} poses: {:.2f} us'.format(record, capacity, search))
+    finally:
+        shutil.rmtree(directory)
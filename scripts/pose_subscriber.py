@@ -0,0 +1,80 @@
+"""
+Subscriber for the high-rate pose topics (Vicon at 100+ Hz, odom) that are read by the
+10 Hz control loops. The callback only stores the serialized message with a sequence
+number. The message is deserialized, and its planar pose derived, when read, at most
+once per received message (memoized per sequence number), so the messages that arrive
+between two reads of a control loop cost a callback only.
+"""
+
+import rospy
+from pose_geometry import msg_yaw
+
+
+'''
+#######################################################################################
+'''
+
+def transform_of(msg):
+    """ Translation and rotation of a TransformStamped. """
+    return msg.transform.translation, msg.transform.rotation
+
+def odom_of(msg):
+    """ Position and orientation of an Odometry. """
+    return msg.pose.pose.position, msg.pose.pose.orientation
+
+'''
+#######################################################################################
+'''
+
+class PoseSubscriber:
+    def __init__(self, topic, msg_class, pose_of=transform_of):
+        self.msg_class = msg_class
+        self.pose_of = pose_of # returns the (translation, rotation) of a message
+        self.latest = (0, None) # (sequence number, serialized message), replaced as a whole by the callback
+        self.decoded = (0, None) # (sequence number, message)
+        self.derived = (0, None) # (sequence number, (x, y, yaw))
+        self.sub = None
+        if (topic != None): # without a topic, the serialized messages are passed to the callback by the caller
+            self.sub = rospy.Subscriber(topic, rospy.AnyMsg, self.callback)
+
+    def callback(self, data):
+        self.latest = (self.latest[0] + 1, data._buff)
+
+    def received(self):
+        return self.latest[0] > 0
+
+    def seq(self):
+        return self.latest[0]
+
+    def decode(self):
+        """ Returns (sequence number, message) of the latest message, deserializing it on its first read. """
+        seq, buff = self.latest
+        decoded = self.decoded
+        if (decoded[0] != seq):
+            msg = self.msg_class()
+            msg.deserialize(buff)
+            decoded = self.decoded = (seq, msg)
+        return decoded
+
+    def msg(self):
+        """ Latest message, None before the first one. """
+        return self.decode()[1]
+
+    def translation(self):
+        return self.pose_of(self.msg())[0]
+
+    def rotation(self):
+        return self.pose_of(self.msg())[1]
+
+    def pose(self):
+        """ Latest planar pose (x, y, yaw). """
+        seq, msg = self.decode()
+        derived = self.derived
+        if (derived[0] != seq):
+            translation, rotation = self.pose_of(msg)
+            derived = self.derived = (seq, (translation.x, translation.y, msg_yaw(rotation)))
+        return derived[1]
+
+    def unregister(self):
+        if (self.sub != None):
+            self.sub.unregister()
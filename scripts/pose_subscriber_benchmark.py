@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Compares the CPU time spent on the Vicon and odom messages by the dock-undock server
+during a dock, with eager callbacks (every message deserialized and its yaw computed in
+the callback, as before) and with the lazy PoseSubscriber of pose_subscriber.py (messages
+stored serialized, decoded when read by the 10 Hz control loop). The messages of a dock
+are generated at the Vicon and odom rates and passed to the callbacks directly, so the
+benchmark runs without a roscore.
+
+Usage: pose_subscriber_benchmark.py [dock duration] [vicon rate] [odom rate] [control rate]
+"""
+
+import sys, timeit
+from io import BytesIO
+import rospy
+from geometry_msgs.msg import TransformStamped
+from nav_msgs.msg import Odometry
+from pose_geometry import msg_yaw
+from pose_subscriber import PoseSubscriber, odom_of
+
+
+'''
+#######################################################################################
+'''
+
+def serialized(msg):
+    buff = BytesIO()
+    msg.serialize(buff)
+    any_msg = rospy.AnyMsg()
+    any_msg._buff = buff.getvalue()
+    return any_msg
+
+class EagerPose:
+    """ The previous callbacks: deserialization by rospy and the yaw computed on every message. """
+    def __init__(self, msg_class, pose_of):
+        self.msg_class = msg_class
+        self.pose_of = pose_of
+
+    def callback(self, data):
+        msg = self.msg_class()
+        msg.deserialize(data._buff) # done by rospy before the callback
+        translation, rotation = self.pose_of(msg)
+        self.curr_pose = (translation.x, translation.y, msg_yaw(rotation))
+        self.latest = msg
+
+    def pose(self):
+        return self.curr_pose
+
+    def translation(self):
+        return self.pose_of(self.latest)[0]
+
+def run_dock(vicon, odom, events):
+    """ Feeds the dock's messages in time order and runs the control loop reads, returns the elapsed time. """
+    start = timeit.default_timer()
+    for kind, data in events:
+        if (kind == 'vicon'):
+            vicon.callback(data)
+        elif (kind == 'odom'):
+            odom.callback(data)
+        else: # control loop iteration
+            vicon.pose()
+            odom.translation()
+    return timeit.default_timer() - start
+
+if __name__ == '__main__':
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 30.0 # seconds of docking
+    vicon_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 120.0
+    odom_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    control_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 10.0
+    vicon_msg, odom_msg = TransformStamped(), Odometry()
+    vicon_msg.transform.rotation.w = odom_msg.pose.pose.orientation.w = 1.0
+    vicon_data, odom_data = serialized(vicon_msg), serialized(odom_msg)
+    events = [(i / vicon_rate, 'vicon', vicon_data) for i in range(int(duration * vicon_rate))]
+    events += [(i / odom_rate, 'odom', odom_data) for i in range(int(duration * odom_rate))]
+    events += [(i / control_rate + 1e-6, 'control', None) for i in range(int(duration * control_rate))]
+    events = [(kind, data) for _, kind, data in sorted(events, key=lambda event: event[0])]
+    results = []
+    for name, vicon, odom in [('eager callbacks', EagerPose(TransformStamped, lambda msg: (msg.transform.translation, msg.transform.rotation)),
+                                                  EagerPose(Odometry, odom_of)),
+                              ('lazy decode', PoseSubscriber(None, TransformStamped), PoseSubscriber(None, Odometry, odom_of))]:
+        elapsed = min(run_dock(vicon, odom, events) for _ in range(3))
+        results.append(elapsed)
+        print('{:<16} {:>10.1f} ms per dock {:>8.3f}% of a core'.format(name, elapsed * 1e3, elapsed / duration * 100.0))
+    print('Messages per dock: {} vicon, {} odom, {} control loop reads >>> {:.1f}x less CPU time'.format(
+          int(duration * vicon_rate), int(duration * odom_rate), int(duration * control_rate), results[0] / results[1]))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+A node that probes the dependencies of the robot's actions (action servers, services
+and the client nodes) concurrently, each one in its own thread, so that a slow or missing
+dependency does not delay the probing of the others. The readiness of every dependency,
+the overall readiness and the actions that can currently be executed are published on
+a latched topic whenever one of them changes.
+"""
+
+import rospy
+import sys, time
+import threading
+import actionlib
+import rosgraph
+from move_base_msgs.msg import MoveBaseAction
+from fms_rob.msg import dockUndockAction, RobReadiness
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+'''
+#######################################################################################
+'''
+
+# action: (dependencies, client node in the multi-process layout)
+ACTIONS = {
+    'drive': (['move_base'], 'drive_client'),
+    'pick': (['move_base', 'state_server', 'get_docking_pose'], 'pick_client'),
+    'place': (['move_base', 'state_server', 'get_parking_spots'], 'place_client'),
+    'home': (['move_base', 'state_server'], 'home_client'),
+    'return': (['move_base', 'state_server'], 'return_client'),
+    'dock': (['do_dock_undock', 'state_server', 'teb_local_planner', 'dynamic_collision_detector'], 'dock_undock_client'),
+    'undock': (['do_dock_undock', 'state_server', 'teb_local_planner', 'dynamic_collision_detector'], 'dock_undock_client'),
+}
+
+'''
+#######################################################################################
+'''
+
+class ReadinessMonitor:
+    def __init__(self):
+        rospy.init_node('readiness_monitor')
+        self.period = rospy.get_param('~probe_period', 1.0) # seconds between probes of a dependency
+        use_executor = rospy.get_param('~use_executor', False) # clients hosted by the action executor
+        self.master = rosgraph.Master(rospy.get_name())
+        self.probes = {
+            'move_base': self.action_probe('/'+ROBOT_ID+'/move_base', MoveBaseAction),
+            'do_dock_undock': self.action_probe('/'+ROBOT_ID+'/do_dock_undock', dockUndockAction),
+            'state_server': self.service_probe('/'+ROBOT_ID+'/state_server/set_state'),
+            'teb_local_planner': self.service_probe('/'+ROBOT_ID+'/move_base/TebLocalPlannerROS/set_parameters'),
+            'get_docking_pose': self.service_probe('/'+ROBOT_ID+'/get_docking_pose'),
+            'get_parking_spots': self.service_probe('/'+ROBOT_ID+'/get_parking_spots'),
+            'dynamic_collision_detector': self.node_probe('dynamic_collision_detector'),
+        }
+        self.requirements = {} # action --> dependencies including the client node
+        for action, (dependencies, client) in ACTIONS.items():
+            node = 'action_executor' if use_executor else client
+            self.probes.setdefault(node, self.node_probe(node))
+            self.requirements[action] = dependencies + [node]
+        self.names = sorted(self.probes.keys())
+        self.states = dict((name, False) for name in self.names)
+        self.lock = threading.Lock()
+        self.readiness_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_readiness', RobReadiness, queue_size=1, latch=True)
+        self.publish()
+        for name in self.names:
+            worker = threading.Thread(target=self.run, args=(name,))
+            worker.daemon = True
+            worker.start()
+        rospy.on_shutdown(self.shutdown_hook)
+        rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+
+    def action_probe(self, name, action_type):
+        client = actionlib.SimpleActionClient(name, action_type)
+        return lambda: client.wait_for_server(timeout=rospy.Duration.from_sec(self.period))
+
+    def service_probe(self, name):
+        def probe():
+            try:
+                rospy.wait_for_service(name, timeout=self.period)
+                return True
+            except rospy.ROSException:
+                return False
+        return probe
+
+    def node_probe(self, node):
+        """ A client node is ready once it is registered and the registered instance stored its start up profile. """
+        name = '/'+ROBOT_ID+'/'+node
+        def probe():
+            try:
+                uri = self.master.lookupNode(name)
+                profile = rospy.get_param(name+'/startup_profile')
+            except (rosgraph.MasterError, IOError, KeyError):
+                return False
+            return profile.get('uri') == uri # a profile left by a crashed or restarted instance has another uri
+        return probe
+
+    def run(self, name):
+        """ Probes a dependency periodically. """
+        probe = self.probes[name]
+        while not rospy.is_shutdown():
+            started = time.time()
+            try:
+                state = bool(probe())
+            except Exception:
+                state = False
+            self.update(name, state)
+            time.sleep(max(0.0, self.period - (time.time() - started)))
+
+    def update(self, name, state):
+        with self.lock:
+            if (self.states[name] == state):
+                return
+            self.states[name] = state
+            if state:
+                rospy.loginfo('[ {} ]: {} Ready'.format(rospy.get_name(), name))
+            else:
+                rospy.logwarn('[ {} ]: {} Not Ready!'.format(rospy.get_name(), name))
+            self.publish()
+
+    def publish(self):
+        """ Publishes the readiness state. Called on changes only. """
+        msg = RobReadiness()
+        msg.header.stamp = rospy.Time.now()
+        msg.names = self.names
+        msg.states = [self.states[name] for name in self.names]
+        msg.ready = all(msg.states)
+        msg.actions_ready = sorted(action for action, dependencies in self.requirements.items()
+                                   if all(self.states[name] for name in dependencies))
+        self.readiness_pub.publish(msg)
+
+    def shutdown_hook(self):
+        rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
+
+if __name__ == '__main__':
+    try:
+        rm = ReadinessMonitor()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
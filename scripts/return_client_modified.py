@@ -14,22 +14,25 @@ from move_base_msgs.msg import MoveBaseAction, MoveBaseGoal
 from geometry_msgs.msg import Pose, TransformStamped
 from fms_rob.msg import RobActionSelect, RobActionStatus
 from fms_rob.srv import  dockPose
-from actionlib_msgs.msg import GoalStatusArray
 from std_msgs.msg import String, Bool
 from math import pi
 from std_srvs.srv import Empty
 import time
-import dynamic_reconfigure.client
-import tf_conversions
-from math import sqrt, atan2, sin, cos
+from interlocks import InterlockCache
+from structured_log import log
+from tracing import trace
+from pose_geometry import yaw, wrap_angle
+from pose_subscriber import PoseSubscriber
+from math import sqrt, atan2
 from geometry_msgs.msg import PoseStamped, TransformStamped, Twist, PointStamped
+from robot_namespace import get_robot_id
 
 
 '''
 #######################################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the package's launch file
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 #######################################################################################
@@ -38,7 +41,8 @@ ROBOT_ID = rospy.get_param('/ROBOT_ID') # by default the robot id is set in the
 class ReturnAction:
     def __init__(self):
         rospy.init_node('return_action_client')
-        self.status_flag = False # used to throttle further message sending after action execution
+        self.status_flag = False # True while a sent goal has not been terminated yet
+        self.last_status = None # last status forwarded upstream
         self.act_client = actionlib.SimpleActionClient('/'+ROBOT_ID+'/move_base', MoveBaseAction) 
         rospy.loginfo('[ {} ]: Waiting for move_base server'.format(rospy.get_name()))
         err_flag = False
@@ -49,13 +53,13 @@ class ReturnAction:
             rospy.logerr('[ {} ]: Timedout waiting for Move Base Server!'.format(rospy.get_name()))
             err_flag = True
         self.action_sub = rospy.Subscriber('/'+ROBOT_ID+'/rob_action', RobActionSelect, self.returns)
-        self.status_update_sub = rospy.Subscriber('/'+ROBOT_ID+'/move_base/status', GoalStatusArray, self.status_update) # status from move base action server 
         self.action_status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=10) # publishes status msgs upstream
         self.klt_num_pub = rospy.Publisher('/'+ROBOT_ID+'/klt_num', String, queue_size=10) # used for interfacing with the ros_mocap package
         self.vel_pub = rospy.Publisher('/'+ROBOT_ID+'/move_base/cmd_vel', Twist, queue_size=10)
-        self.klt_pose_sub = rospy.Subscriber('/'+ROBOT_ID+'/klt_num', TransformStamped, self.update_pose)
-        self.reconf_client = dynamic_reconfigure.client.Client("dynamic_reconf_server", timeout=30) # client of fms_rob dynmaic reconfigure server
+        self.klt_pose = PoseSubscriber('/'+ROBOT_ID+'/klt_num', TransformStamped) # decoded when read by the control loops
+        self.interlocks = InterlockCache() # local cache of the interlocks held by the state server
         rospy.on_shutdown(self.shutdown_hook) # used to reset the interface with the ros_mocap package
+        log.advertise_dump()
         #self.place_flag = True
         #self.dock_flag = True
         ###self.dock_flag = Bool()
@@ -85,9 +89,8 @@ class ReturnAction:
         self.command_id = data.command_id
         self.action = data.action # to be removed after msg modification 
         if (data.action == 'return'):
-            dock_flag = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/dock')
-            place_flag = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/place')
-            if ((place_flag == True) or (dock_flag == True)):
+            permitted, reason = self.interlocks.check('return')
+            if (permitted):
                 rospy.loginfo('[ {} ]: Navigating to secondary return position'.format(rospy.get_name())) 
                 se_goal = self.get_secondary_goal()
                 try:
@@ -99,33 +102,32 @@ class ReturnAction:
                     rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
                 rospy.sleep(0.5)
                 #self.act_client.send_goal_and_wait(goal) # blocking
-                self.act_client.send_goal(se_goal) # non-blocking
                 self.status_flag = True
-                while(self.act_client.get_state() != 3):
-                    pass
-                # reutrn to original cart position
-                self.amend_return_pose()
+                self.last_status = None
+                self.act_client.send_goal(se_goal, done_cb=self.interlocks.tracked(self.action, self.command_id, self.goal_done), active_cb=self.goal_active, feedback_cb=self.goal_feedback) # non-blocking
+                while (self.status_flag): # wait for the secondary goal to terminate
+                    rospy.sleep(0.1)
+                if (self.last_status == 3):
+                    # reutrn to original cart position
+                    self.amend_return_pose()
             else:
                 #self.act_client.cancel_goal()
-                rospy.logerr('[ {} ]: Action Rejected! - Invalid Return Action'.format(rospy.get_name()))
+                rospy.logerr('[ {} ]: Action Rejected! - Invalid Return Action ({})'.format(rospy.get_name(), reason))
                 return
         else:
             if (data.action == 'cancelCurrent'):
                 self.act_client.cancel_goal()
                 rospy.logwarn('Cancelling Current Goal')
-                self.reconf_client.update_configuration({"place": False})
-                self.reconf_client.update_configuration({"dock": False})
+                self.interlocks.cancelled('return')
             if (data.action == 'cancelAll'):
                 self.act_client.cancel_all_goals()
                 rospy.logwarn('cancelling All Goals')
-                self.reconf_client.update_configuration({"place": False})
-                self.reconf_client.update_configuration({"dock": False})
+                self.interlocks.cancelled('return')
             if (data.action == 'cancelAtAndBefore'):
                 self.act_client.cancel_goals_at_and_before_time(data.cancellation_stamp)
                 s = 'Cancelling all Goals at and before {}'.format(data.cancellation_stamp)
                 rospy.logwarn(s)
-                self.reconf_client.update_configuration({"place": False})
-                self.reconf_client.update_configuration({"dock": False})
+                self.interlocks.cancelled('return')
             #self.act_client.stop_tracking_goal()
             #self.status_flag = False
             return
@@ -134,12 +136,12 @@ class ReturnAction:
         goal = MoveBaseGoal()
         goal.target_pose.header.frame_id = "vicon_world" # Always send goals in reference to vicon_world when using ros_mocap package
         goal.target_pose.header.stamp = rospy.Time.now()
-        goal.target_pose.pose.position.x = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_trans_x')
-        goal.target_pose.pose.position.y = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_trans_y')
-        goal.target_pose.pose.orientation.x = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_rot_x')
-        goal.target_pose.pose.orientation.y = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_rot_y')
-        goal.target_pose.pose.orientation.z = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_rot_z')
-        goal.target_pose.pose.orientation.w = rospy.get_param('/'+ROBOT_ID+'/dynamic_reconf_server/return_pose_rot_w')
+        goal.target_pose.pose.position.x = self.interlocks.get('return_pose_trans_x')
+        goal.target_pose.pose.position.y = self.interlocks.get('return_pose_trans_y')
+        goal.target_pose.pose.orientation.x = self.interlocks.get('return_pose_rot_x')
+        goal.target_pose.pose.orientation.y = self.interlocks.get('return_pose_rot_y')
+        goal.target_pose.pose.orientation.z = self.interlocks.get('return_pose_rot_z')
+        goal.target_pose.pose.orientation.w = self.interlocks.get('return_pose_rot_w')
         # rospy.loginfo('[ {} ]: Sending Return goal to action server'.format(rospy.get_name())) 
         return goal
     
@@ -179,14 +181,14 @@ class ReturnAction:
         vel_msg.angular.z = 0
         self.vel_pub.publish(vel_msg)
         rospy.loginfo('[ {} ]: Amended Return Position Reached'.format(rospy.get_name()))
-        goal_rot = tf_conversions.transformations.euler_from_quaternion([goal_rot_x, goal_rot_y, goal_rot_z, goal_rot_w])
-        orientation_error = goal_rot - self.curr_theta
-        orientation_error_mod = atan2(sin(orientation_error),cos(orientation_error))
+        goal_rot = yaw([goal_rot_x, goal_rot_y, goal_rot_z, goal_rot_w])
+        orientation_error = goal_rot - self.klt_pose.pose()[2]
+        orientation_error_mod = wrap_angle(orientation_error)
         while(abs(orientation_error_mod) >= self.orientation_tolerance):
             vel_msg.angular.z = orientation_error * self.kp_orient
             self.vel_pub.publish(vel_msg)
-            orientation_error = goal_rot - self.curr_theta
-            orientation_error_mod = atan2(sin(orientation_error),cos(orientation_error))
+            orientation_error = goal_rot - self.klt_pose.pose()[2]
+            orientation_error_mod = wrap_angle(orientation_error)
         rospy.loginfo('[ {} ]:  Amended Return Orientation Reached'.format(rospy.get_name()))
         return success
         
@@ -194,8 +196,8 @@ class ReturnAction:
     def angular_vel(self, goal_x, goal_y):
         """ PD controller output calculation. """
         current_time = None
-        self.error_theta = self.goal_angle(goal_x, goal_y) - self.curr_theta
-        self.error_theta = atan2(sin(self.error_theta), cos(self.error_theta)) # angle sign regulation
+        self.error_theta = self.goal_angle(goal_x, goal_y) - self.klt_pose.pose()[2]
+        self.error_theta = wrap_angle(self.error_theta) # angle sign regulation
         #print('Goal angle: {}'.format(self.goal_angle(goal_x, goal_y)))
         #print('Current angle: {}'.format(self.curr_theta))
         #print('Error angle: {}'.format(self.error_theta))
@@ -215,63 +217,65 @@ class ReturnAction:
 
     def goal_angle(self, goal_x, goal_y):
         """ Angle between current orientation and the heading of the next way point. """
-        return atan2(goal_y - self.curr_pose_trans_y, goal_x - self.curr_pose_trans_x)
+        x, y, _ = self.klt_pose.pose()
+        return atan2(goal_y - y, goal_x - x)
         
-    def update_pose(self, data):
-        """ Robot vicon pose (under cart) update. """
-        self.curr_pose_trans_x = data.transform.translation.x
-        self.curr_pose_trans_y = data.transform.translation.y
-        rot=[data.transform.rotation.x, data.transform.rotation.y, data.transform.rotation.z, data.transform.rotation.w]
-        rot_euler = tf_conversions.transformations.euler_from_quaternion(rot)
-        self.curr_theta = rot_euler[2]
-
     def euclidean_distance(self, goal_x, goal_y):
         """ Euclidean distance between current pose and the next way point."""
-        return sqrt(pow((goal_x - self.curr_pose_trans_x), 2) + pow((goal_y - self.curr_pose_trans_y), 2))
+        x, y, _ = self.klt_pose.pose()
+        return sqrt(pow((goal_x - x), 2) + pow((goal_y - y), 2))
+
+    def goal_active(self):
+        """ Forwarding the activation of the goal upstream. """
+        trace.mark(self.command_id, 'goal_active', action=self.action)
+        self.publish_status(self.act_client.get_state())
+
+    def goal_feedback(self, feedback):
+        """ Forwarding status changes reported while the goal is being executed. """
+        self.publish_status(self.act_client.get_state())
+
+    def publish_status(self, status):
+        """ Publishes the goal status upstream on status transitions only. """
+        if (status == self.last_status):
+            return
+        self.last_status = status
+        log.info('status', command_id=self.command_id, action=self.action, status=status)
+        msg = RobActionStatus()
+        msg.status = status
+        msg.command_id = self.command_id
+        msg.action = self.action # to be removed after msg modification
+        #msg.cart_id = self.cart_id
+        self.action_status_pub.publish(msg)
 
-    def status_update(self, data):
-        """ Forwarding status messages upstream. """
-        if (self.status_flag == True):
-            #print(data.status_list[1].status) # All status list info are at indices 0 and 1
-            status = self.act_client.get_state()
-            #print(status)
-            rospy.loginfo('[ {} ] >>> Status: {} '.format(rospy.get_name(), status))
-            msg = RobActionStatus()
+    def goal_done(self, status, result):
+        """ Forwarding the final status upstream once the goal is terminated. """
+        self.publish_status(status)
+        self.status_flag = False # no further status messages are expected for this goal
+        if (status == 3): # if action execution is successful
+            rospy.loginfo('[ {} ]: Return Action Successful'.format(rospy.get_name()))
+            print('--------------------------------')
+            self.interlocks.succeeded('return')
+            self.act_client.stop_tracking_goal()
+            return
+        if (status == 4): # if action execution is aborted
+            #self.reconf_client.update_configuration({"place": False})
+            #self.reconf_client.update_configuration({"dock": False})
             #self.act_client.stop_tracking_goal()
-            msg.status = status
-            msg.command_id = self.command_id
-            msg.action = self.action # to be removed after msg modification
-            #msg.cart_id = self.cart_id
-            self.action_status_pub.publish(msg)
-            if (status == 3): # if action execution is successful
-                rospy.loginfo('[ {} ]: Return Action Successful'.format(rospy.get_name()))
-                print('--------------------------------')
-                self.reconf_client.update_configuration({"return": True})
-                self.reconf_client.update_configuration({"place": False})
-                self.reconf_client.update_configuration({"dock": False})
-                self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                return
-            if (status == 4): # if action execution is aborted
-                #self.reconf_client.update_configuration({"place": False})
-                #self.reconf_client.update_configuration({"dock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logerr('[ {} ]: Execution Aborted by Move Base Server!'.format(rospy.get_name()))
-                try:
-                    rospy.wait_for_service('/'+ROBOT_ID+'/move_base/clear_costmaps') # clear cost maps before sending goal to remove false positive obstacles
-                    reset_costmaps = rospy.ServiceProxy('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty)
-                    reset_costmaps()
-                    rospy.loginfo('[ {} ]: Costmaps Cleared Successfully'.format(rospy.get_name())) 
-                except:
-                    rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
-                rospy.sleep(1)
-            if (status == 2): # if action execution is preempted
-                #self.reconf_client.update_configuration({"dock": False})
-                #self.act_client.stop_tracking_goal()
-                self.status_flag = False
-                rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
-    
+            rospy.logerr('[ {} ]: Execution Aborted by Move Base Server!'.format(rospy.get_name()))
+            log.dump('(goal aborted)') # keep the records that led to the abortion
+            try:
+                rospy.wait_for_service('/'+ROBOT_ID+'/move_base/clear_costmaps') # clear cost maps before sending goal to remove false positive obstacles
+                reset_costmaps = rospy.ServiceProxy('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty)
+                reset_costmaps()
+                rospy.loginfo('[ {} ]: Costmaps Cleared Successfully'.format(rospy.get_name())) 
+            except:
+                rospy.logwarn('[ {} ]: Costmaps Clearing Service Call Failed!'.format(rospy.get_name())) 
+            rospy.sleep(1)
+        if (status == 2): # if action execution is preempted
+            #self.reconf_client.update_configuration({"dock": False})
+            #self.act_client.stop_tracking_goal()
+            rospy.logwarn('[ {} ]: Execution Preempted by user!'.format(rospy.get_name())) 
+
     def shutdown_hook(self):
         self.klt_num_pub.publish('') # resets the picked up cart number in the ros_mocap package
         self.act_client.cancel_all_goals()
@@ -0,0 +1,24 @@
+"""
+Robot id of a node. The nodes of a robot are launched in the namespace of the robot (see
+the package's launch file), so the id is taken from the namespace of the node. This lets
+the stacks of several robots share one roscore, where the global /ROBOT_ID parameter
+can only hold one of them. Nodes started outside of a robot namespace (ex: with rosrun)
+fall back to the /ROBOT_ID parameter.
+"""
+
+import rospy
+import rosgraph.names
+
+
+'''
+#######################################################################################
+'''
+
+def get_robot_id(default=None):
+    """ Returns the robot id of the node, read before or after the node is initialized. """
+    namespace = rosgraph.names.get_ros_namespace().strip('/') # __ns remapping or ROS_NAMESPACE set by roslaunch
+    if namespace:
+        return namespace.split('/')[0]
+    if (default != None):
+        return rospy.get_param('/ROBOT_ID', default)
+    return rospy.get_param('/ROBOT_ID')
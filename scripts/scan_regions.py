@@ -0,0 +1,79 @@
+"""
+Region of interest checks on laser scans (ex: the cart slot before docking, the exit
+corridor before undocking). The beam directions (cos and sin of every beam angle, in the
+robot frame) are computed once per scan configuration, so that converting a scan to
+points costs two multiplications per beam. All points are tested against all regions
+(polygons in the robot frame) in one vectorized even-odd pass. The state of a region
+switches with hysteresis: it becomes occupied once it was hit in enter_scans consecutive
+scans, and free once it was not hit in exit_scans consecutive scans.
+"""
+
+import numpy as np
+
+
+'''
+#######################################################################################
+'''
+
+class ScanRegions:
+    def __init__(self, regions, laser_pose=(0.0, 0.0, 0.0), min_points=3, enter_scans=2, exit_scans=5):
+        self.names = sorted(regions) # regions: name --> polygon vertices [[x, y], ...] in the robot frame
+        self.laser_pose = laser_pose # (x, y, yaw) of the laser in the robot frame
+        self.min_points = min_points # points inside a region for a hit, single points are treated as noise
+        self.enter_scans = enter_scans
+        self.exit_scans = exit_scans
+        starts, edges = [], []
+        for name in self.names:
+            vertices = np.asarray(regions[name], dtype=float)
+            starts.append(len(edges))
+            edges.extend(np.hstack([vertices, np.roll(vertices, -1, axis=0)]))
+        edges = np.asarray(edges)
+        self.starts = np.asarray(starts) # first edge of every region
+        self.x1, self.y1, self.x2, self.y2 = edges.T
+        dy = self.y2 - self.y1
+        self.slope = np.where(dy != 0.0, (self.x2 - self.x1) / np.where(dy != 0.0, dy, 1.0), 0.0) # horizontal edges are never crossed
+        corners = edges[:, :2]
+        self.bounds = (corners[:, 0].min(), corners[:, 0].max(), corners[:, 1].min(), corners[:, 1].max())
+        self.config = None # (angle_min, angle_increment, beams) of the cached tables
+        self.cos = self.sin = None
+        self.occupied = dict((name, False) for name in self.names)
+        self.streaks = dict((name, 0) for name in self.names) # consecutive scans contradicting the state
+
+    def beam_tables(self, angle_min, angle_increment, beams):
+        config = (angle_min, angle_increment, beams)
+        if (config != self.config):
+            angles = self.laser_pose[2] + angle_min + angle_increment * np.arange(beams)
+            self.cos, self.sin = np.cos(angles), np.sin(angles)
+            self.config = config
+        return self.cos, self.sin
+
+    def hits(self, ranges, angle_min, angle_increment, range_min, range_max):
+        """ Number of scan points inside every region, in the order of names. """
+        ranges = np.asarray(ranges, dtype=float)
+        cos, sin = self.beam_tables(angle_min, angle_increment, len(ranges))
+        with np.errstate(invalid='ignore'):
+            valid = (ranges > range_min) & (ranges < range_max) # drops inf and NaN readings
+        x = self.laser_pose[0] + ranges * cos
+        y = self.laser_pose[1] + ranges * sin
+        x_min, x_max, y_min, y_max = self.bounds
+        with np.errstate(invalid='ignore'):
+            near = valid & (x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max)
+        x, y = x[near, None], y[near, None]
+        crossings = ((self.y1 > y) != (self.y2 > y)) & (x < self.x1 + (y - self.y1) * self.slope) # points x edges
+        inside = np.add.reduceat(crossings, self.starts, axis=1, dtype=np.int32) % 2 == 1 # points x regions
+        return inside.sum(axis=0)
+
+    def update(self, ranges, angle_min, angle_increment, range_min, range_max):
+        """ Checks a scan, returns the regions that changed their state as (name, occupied). """
+        changes = []
+        for name, count in zip(self.names, self.hits(ranges, angle_min, angle_increment, range_min, range_max)):
+            hit = bool(count >= self.min_points)
+            if (hit == self.occupied[name]):
+                self.streaks[name] = 0
+                continue
+            self.streaks[name] += 1
+            if (self.streaks[name] >= (self.enter_scans if hit else self.exit_scans)):
+                self.occupied[name] = hit
+                self.streaks[name] = 0
+                changes.append((name, hit))
+        return changes
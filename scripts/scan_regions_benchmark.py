@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Compares the region checks of scan_regions.py (cached beam tables, one vectorized pass
+over all beams and regions) with a per-beam Python loop (cos and sin of every beam angle
+and an even-odd test of every region per beam). Scans with obstacles at random ranges are
+checked against the default regions of the dynamic collision detector. The hit counts of
+both paths are checked to agree before timing. Runs without a roscore.
+
+Usage: scan_regions_benchmark.py [scans] [beams] [scan rate]
+"""
+
+import sys, timeit
+from math import cos, sin, pi
+import numpy as np
+from scan_regions import ScanRegions
+
+
+'''
+#######################################################################################
+'''
+
+REGIONS = {
+    'cart_slot': [[0.0, -0.3], [0.7, -0.3], [0.7, 0.3], [0.0, 0.3]],
+    'exit_corridor': [[0.0, -0.4], [0.65, -0.4], [0.65, 0.4], [0.0, 0.4]],
+}
+
+'''
+#######################################################################################
+'''
+
+def inside(polygon, x, y):
+    crossings = 0
+    for i in range(len(polygon)):
+        (x1, y1), (x2, y2) = polygon[i], polygon[(i + 1) % len(polygon)]
+        if ((y1 > y) != (y2 > y)) and (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1)):
+            crossings += 1
+    return crossings % 2 == 1
+
+def loop_hits(names, ranges, angle_min, angle_increment, range_min, range_max):
+    """ Per-beam loop: beam direction and region tests computed for every beam of every scan. """
+    counts = [0] * len(names)
+    for i, r in enumerate(ranges):
+        if not (range_min < r < range_max):
+            continue
+        angle = angle_min + i * angle_increment
+        x, y = r * cos(angle), r * sin(angle)
+        for j, name in enumerate(names):
+            if inside(REGIONS[name], x, y):
+                counts[j] += 1
+    return counts
+
+if __name__ == '__main__':
+    scans = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    beams = int(sys.argv[2]) if len(sys.argv) > 2 else 811
+    scan_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 15.0 # Hz
+    angle_min, angle_increment = -0.75 * pi, 1.5 * pi / (beams - 1)
+    rng = np.random.RandomState(0)
+    batch = rng.uniform(0.05, 3.0, size=(scans, beams)).astype(np.float32) # as received through numpy_msg
+    batch[:, ::40] = np.inf # no return
+    regions = ScanRegions(REGIONS)
+    for ranges in batch[:10]:
+        assert list(regions.hits(ranges, angle_min, angle_increment, 0.05, 30.0)) == loop_hits(regions.names, ranges.tolist(), angle_min, angle_increment, 0.05, 30.0)
+    lists = [ranges.tolist() for ranges in batch] # rospy's default deserialization returns tuples of floats
+    loop = min(timeit.repeat(lambda: [loop_hits(regions.names, ranges, angle_min, angle_increment, 0.05, 30.0) for ranges in lists], number=1, repeat=3)) / scans
+    vectorized = min(timeit.repeat(lambda: [regions.update(ranges, angle_min, angle_increment, 0.05, 30.0) for ranges in batch], number=1, repeat=3)) / scans
+    print('{:<18} {:>14} {:>20}'.format('path', 'ms per scan', 'CPU at scan rate [%]'))
+    for name, elapsed in [('per-beam loop', loop), ('vectorized', vectorized)]:
+        print('{:<18} {:>14.3f} {:>20.2f}'.format(name, elapsed * 1e3, elapsed * scan_rate * 100.0))
+    print('{} beams, {} regions at {:.0f} Hz >>> {:.1f}x faster'.format(beams, len(REGIONS), scan_rate, loop / vectorized))
@@ -6,13 +6,16 @@ A node to detect disturbances in scanner readings.
 import rospy
 from std_msgs.msg import Bool
 from sensor_msgs.msg import LaserScan
+from header_subscriber import HeaderSubscriber
+from topic_cache import topics
+from robot_namespace import get_robot_id
 import time, sys
 
 '''
 ###########################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID')
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 ###########################################################################
@@ -22,45 +25,31 @@ class scanner_checker:
 
     def __init__(self):
         rospy.init_node('scanner_check')
-        self.vicon_subscriber = rospy.Subscriber('/'+ROBOT_ID+'/scan', LaserScan, self.scan_update)
+        self.scanner = HeaderSubscriber('/'+ROBOT_ID+'/scan', msg_class=LaserScan) # only the header of the scans is decoded
         self.check_pub = rospy.Publisher('/'+ROBOT_ID+'/laser_scanner_check', Bool, queue_size=10)
         self.check_msg = Bool()
         self.time_limit = 1
-        self.scanner_data = LaserScan()
-        self.pub_flag = False
         rospy.sleep(2)
         self.scanner_topic_check()
 
-    def scan_update(self, data):
-        self.scanner_data = data.header
-        self.pub_flag = True
-
     def scanner_topic_check(self):
-        topic = ['/'+ROBOT_ID+'/scan', 'sensor_msgs/LaserScan']
-        last_seq_scanner = self.scanner_data.header.seq
-        if(topic not in rospy.get_published_topics('/'+ROBOT_ID)):
+        last_messages = self.scanner.messages
+        if(not topics.published('/'+ROBOT_ID+'/scan', 'sensor_msgs/LaserScan')):
             self.check_msg.data = False
             self.check_pub.publish(self.check_msg)
             print('Scanner Topic Not Registered!') # When Laser scanner node on robot is started without publishing the topic
             return
-        else:
-            #r = rospy.Rate(10)
-            while (True):
-                self.scanner_data.header.seq == last_seq_scanner
-                timer = time.time()
-                while (self.scanner_data.header.seq == last_seq_scanner):
-                    rospy.sleep(0.2)
-                    if((time.time() - timer) >= self.time_limit):
-                        self.check_msg.data = False
-                        self.check_pub.publish(self.check_msg)
-                        print('Scanner Topic Stopped!') # When topic was already publishing
-                    #r.sleep()
-                    return
-                else:
-                    self.check_msg.data = True
-                    self.check_pub.publish(self.check_msg)
-                    print('Scanner is Online')
-                    return
+        timer = time.time()
+        while (self.scanner.messages == last_messages):
+            rospy.sleep(0.2)
+            if((time.time() - timer) >= self.time_limit):
+                self.check_msg.data = False
+                self.check_pub.publish(self.check_msg)
+                print('Scanner Topic Stopped!') # When topic was already publishing
+                return
+        self.check_msg.data = True
+        self.check_pub.publish(self.check_msg)
+        print('Scanner is Online')
 
 if __name__ == '__main__':
     try:
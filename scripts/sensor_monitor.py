@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+"""
+A node that continuously tracks the health of the robot's sensor topics (laser scan,
+Vicon poses of the robot and of the carried cart, odom, joystick and collision regions).
+Only the headers of the messages are decoded (see header_subscriber.py) and their arrival
+times recorded: the rate, inter-arrival jitter and maximum gap of every topic are kept over
+a sliding window (see window_stats.py), and the messages lost (sequence number jumps) and
+the latency of the latest stamp are tracked for the topics with a header. A topic is stale
+when no message arrived within its stale time (event topics like the joystick have none).
+A summary of all topics is published as a diagnostic array at 1 Hz, and stale changes are
+logged.
+"""
+
+import rospy
+import sys
+import threading
+from std_msgs.msg import String
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+from window_stats import WindowStats
+from header_subscriber import HeaderSubscriber
+from startup_profiler import profile
+from structured_log import log
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+TOPICS = { # name: [topic, stale time [s], 0 for event topics]
+    'scan': ['/'+ROBOT_ID+'/scan', 0.5],
+    'vicon_robot': ['/vicon/'+ROBOT_ID+'/'+ROBOT_ID, 0.5],
+    'odom': ['/'+ROBOT_ID+'/dummy_odom', 0.5], # dummy odom is the remapped odom topic - please check ros_mocap package
+    'joy': ['/'+ROBOT_ID+'/joy', 0.0],
+    'collision_cart_slot': ['/'+ROBOT_ID+'/collision/cart_slot', 0.0],
+    'collision_exit_corridor': ['/'+ROBOT_ID+'/collision/exit_corridor', 0.0],
+}
+CART = 'vicon_cart' # Vicon pose of the carried cart, tracked while klt_num names a cart
+
+'''
+#######################################################################################
+'''
+
+class SensorMonitor:
+    def __init__(self):
+        rospy.init_node('sensor_monitor')
+        self.window = rospy.get_param('~window', 50) # intervals per topic
+        self.topics = dict((name, list(entry)) for name, entry in rospy.get_param('~topics', TOPICS).items())
+        self.topics[CART] = [None, rospy.get_param('~cart_stale_time', 0.5)]
+        self.lock = threading.Lock()
+        self.stats = dict((name, WindowStats(self.window)) for name in self.topics)
+        self.stale = dict((name, False) for name in self.topics)
+        self.headers = dict((name, (None, 0, None)) for name in self.topics) # (last seq, lost messages, latency [s])
+        self.subs = {}
+        for name, (topic, stale_time) in self.topics.items():
+            if (topic != None):
+                self.subs[name] = self.subscribe(name, topic)
+        self.klt_num_sub = rospy.Subscriber('/'+ROBOT_ID+'/klt_num', String, self.klt_num_update)
+        self.diagnostics_pub = rospy.Publisher('/diagnostics', DiagnosticArray, queue_size=1)
+        self.timer = rospy.Timer(rospy.Duration(1.0 / rospy.get_param('~rate', 1.0)), self.publish_summary)
+        profile.ready()
+        rospy.loginfo('[ {} ]: Ready - monitoring {} topics'.format(rospy.get_name(), len(self.subs)))
+
+    def subscribe(self, name, topic):
+        return HeaderSubscriber(topic, lambda seq, stamp: self.message_update(name, seq, stamp))
+
+    def message_update(self, name, seq, stamp):
+        now = rospy.get_time()
+        with self.lock:
+            self.stats[name].add(now)
+            if (seq != None):
+                last, lost, latency = self.headers[name]
+                if (last != None and seq > last + 1):
+                    lost += seq - last - 1
+                self.headers[name] = (seq, lost, now - stamp if stamp > 0.0 else None) # unstamped messages have no latency
+
+    def klt_num_update(self, data):
+        """ Follows the Vicon topic of the carried cart, empty when no cart is carried. """
+        topic = data.data or None
+        if (topic == self.topics[CART][0]):
+            return
+        with self.lock:
+            if (CART in self.subs):
+                self.subs.pop(CART).unregister()
+            self.topics[CART][0] = topic
+            self.stats[CART] = WindowStats(self.window)
+            self.stale[CART] = False
+            self.headers[CART] = (None, 0, None)
+            if (topic != None):
+                self.subs[CART] = self.subscribe(CART, topic)
+        log.info('cart_topic', topic=topic)
+
+    def status(self, name, now):
+        """ Diagnostic status of a topic, updating its stale flag. """
+        topic, stale_time = self.topics[name]
+        stats = self.stats[name]
+        seq, lost, latency = self.headers[name]
+        age = stats.age(now)
+        stale = stale_time > 0.0 and (age == None or age > stale_time)
+        if (stale != self.stale[name]):
+            self.stale[name] = stale
+            if stale:
+                rospy.logwarn('[ {} ]: {} Stale!'.format(rospy.get_name(), topic))
+            else:
+                rospy.loginfo('[ {} ]: {} Online'.format(rospy.get_name(), topic))
+        status = DiagnosticStatus()
+        status.name = '{}/sensors/{}'.format(ROBOT_ID, name)
+        status.hardware_id = ROBOT_ID
+        if (age == None):
+            status.level = DiagnosticStatus.STALE if stale_time > 0.0 else DiagnosticStatus.OK
+            status.message = 'no messages'
+        elif stale:
+            status.level = DiagnosticStatus.ERROR
+            status.message = 'stale'
+        else:
+            status.level = DiagnosticStatus.OK
+            status.message = 'ok'
+        status.values = [
+            KeyValue('topic', topic),
+            KeyValue('rate', '{:.1f}'.format(stats.rate())), # Hz
+            KeyValue('jitter', '{:.1f}'.format(stats.jitter() * 1e3)), # ms
+            KeyValue('max_gap', '{:.3f}'.format(stats.max_gap(now))), # s
+            KeyValue('age', '{:.3f}'.format(age) if age != None else ''), # s
+            KeyValue('messages', str(stats.messages)),
+            KeyValue('lost', str(lost)), # sequence number jumps
+            KeyValue('latency', '{:.3f}'.format(latency) if latency != None else ''), # s, from the stamp of the latest message
+        ]
+        return status
+
+    def publish_summary(self, event):
+        now = rospy.get_time()
+        msg = DiagnosticArray()
+        msg.header.stamp = rospy.Time.from_sec(now)
+        with self.lock:
+            msg.status = [self.status(name, now) for name in sorted(self.topics) if self.topics[name][0] != None]
+        self.diagnostics_pub.publish(msg)
+
+
+if __name__ == '__main__':
+    profile.imports_done()
+    try:
+        sm = SensorMonitor()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
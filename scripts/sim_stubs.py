@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Stand-ins for the robot's hardware and navigation stack, used when replaying a recorded
+mission away from the lab: the move_base action server (goals succeed after a fixed
+duration), its clear_costmaps service and the TEB planner's reconfigure server, the
+elevator (set_digital_output) and the odometry reset (set_odometry) services. Durations
+are divided by the replay rate, so that accelerated replays stay consistent.
+In kinematic mode (used by the fleet scale test, where no recording provides the poses),
+the stubs also simulate the robot base: the velocity commands are integrated into the
+odometry (dummy_odom) and into the robot's Vicon pose, and navigation goals move the
+robot to the goal pose at a constant speed.
+"""
+
+import rospy
+import actionlib
+import sys, time
+import threading
+from math import hypot
+from move_base_msgs.msg import MoveBaseAction, MoveBaseResult
+from std_srvs.srv import Empty, EmptyResponse
+from robotnik_msgs.srv import set_odometry, set_odometryResponse, set_digital_output, set_digital_outputResponse
+from dynamic_reconfigure.server import Server
+from fms_rob.cfg import teb_stubConfig
+from geometry_msgs.msg import TransformStamped, Twist
+from nav_msgs.msg import Odometry
+from pose_geometry import yaw, yaw_to_quaternion, wrap_angle, compose, inverse
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+'''
+#######################################################################################
+'''
+
+def advance(pose, v, w, dt):
+    """ Pose (x, y, yaw) after moving with the linear and angular velocities for dt seconds. """
+    return compose(pose, (v * dt, 0.0, w * dt))
+
+def interpolate(start, end, fraction):
+    """ Pose on the straight line from start to end, turning on the way. """
+    return (start[0] + (end[0] - start[0]) * fraction, start[1] + (end[1] - start[1]) * fraction,
+            wrap_angle(start[2] + wrap_angle(end[2] - start[2]) * fraction))
+
+class KinematicBase:
+    """ Planar robot base with a Vicon pose (vicon_world frame) and an odometry pose (odom frame). """
+    def __init__(self, pose):
+        self.pose = pose
+        self.odom = (0.0, 0.0, 0.0)
+        self.twist = (0.0, 0.0) # commanded linear and angular velocity
+        self.lock = threading.Lock()
+
+    def step(self, dt):
+        with self.lock:
+            v, w = self.twist
+            self.pose = advance(self.pose, v, w, dt)
+            self.odom = advance(self.odom, v, w, dt)
+
+    def place(self, pose):
+        """ Moves the robot to a pose, the odometry follows the same relative motion. """
+        with self.lock:
+            self.odom = compose(self.odom, compose(inverse(self.pose), pose))
+            self.pose = pose
+
+    def reset_odom(self, pose):
+        with self.lock:
+            self.odom = pose
+
+'''
+#######################################################################################
+'''
+
+class SimStubs:
+    def __init__(self):
+        rospy.init_node('sim_stubs')
+        rate = rospy.get_param('~rate', 1.0) # replay rate
+        self.move_base_duration = rospy.get_param('~move_base_duration', 5.0) / rate # time taken by every navigation goal
+        self.elevator_duration = rospy.get_param('~elevator_duration', 0.05) / rate # time taken by every elevator service call
+        self.base = None # simulated robot base in kinematic mode
+        self.move_base_server = actionlib.SimpleActionServer('/'+ROBOT_ID+'/move_base', MoveBaseAction, self.move_base, False)
+        self.move_base_server.start()
+        self.services = [
+            rospy.Service('/'+ROBOT_ID+'/move_base/clear_costmaps', Empty, lambda req: EmptyResponse()),
+            rospy.Service('/'+ROBOT_ID+'/set_odometry', set_odometry, self.set_odometry),
+            rospy.Service('/'+ROBOT_ID+'/robotnik_base_hw/set_digital_output', set_digital_output, self.set_digital_output),
+        ]
+        self.teb_reconf_server = Server(teb_stubConfig, lambda config, level: config, namespace='/'+ROBOT_ID+'/move_base/TebLocalPlannerROS')
+        if (rospy.get_param('~kinematic', False)):
+            self.start_base(rate)
+        rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+
+    def start_base(self, rate):
+        """ Simulates the robot base, starting at the initial pose (x, y, yaw) or at the robot's home pose. """
+        home = rospy.get_param('/robot_home/'+ROBOT_ID, {})
+        rot = [home.get('rot_x', 0.0), home.get('rot_y', 0.0), home.get('rot_z', 0.0), home.get('rot_w', 1.0)]
+        self.base = KinematicBase(tuple(rospy.get_param('~initial_pose', [home.get('trans_x', 0.0), home.get('trans_y', 0.0), yaw(rot)])))
+        self.speed = rospy.get_param('~speed', 0.5) * rate # navigation speed [m/s]
+        self.odom_msg = Odometry()
+        self.odom_msg.header.frame_id = 'odom'
+        self.vicon_msg = TransformStamped()
+        self.vicon_msg.header.frame_id = 'vicon_world'
+        self.vicon_msg.child_frame_id = ROBOT_ID
+        self.odom_pub = rospy.Publisher('/'+ROBOT_ID+'/dummy_odom', Odometry, queue_size=10)
+        self.vicon_pub = rospy.Publisher('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, TransformStamped, queue_size=10)
+        self.vel_sub = rospy.Subscriber('/'+ROBOT_ID+'/move_base/cmd_vel', Twist, self.vel_update)
+        period = 1.0 / rospy.get_param('~publish_rate', 50.0) # odom and Vicon rate
+        self.timer = rospy.Timer(rospy.Duration(period), lambda event: self.publish_base(period))
+
+    def publish_base(self, dt):
+        self.base.step(dt)
+        stamp = rospy.Time.now()
+        x, y, theta = self.base.odom
+        self.odom_msg.header.stamp = stamp
+        position, orientation = self.odom_msg.pose.pose.position, self.odom_msg.pose.pose.orientation
+        position.x, position.y = x, y
+        orientation.x, orientation.y, orientation.z, orientation.w = yaw_to_quaternion(theta)
+        self.odom_pub.publish(self.odom_msg)
+        x, y, theta = self.base.pose
+        self.vicon_msg.header.stamp = stamp
+        translation, rotation = self.vicon_msg.transform.translation, self.vicon_msg.transform.rotation
+        translation.x, translation.y = x, y
+        rotation.x, rotation.y, rotation.z, rotation.w = yaw_to_quaternion(theta)
+        self.vicon_pub.publish(self.vicon_msg)
+
+    def vel_update(self, data):
+        self.base.twist = (data.linear.x, data.angular.z)
+
+    def move_base(self, goal):
+        """ Succeeds every navigation goal after the move base duration, or once the simulated robot reached the goal, unless preempted. """
+        start_time = time.time()
+        duration = self.move_base_duration
+        if (self.base != None):
+            start = self.base.pose
+            pose = goal.target_pose.pose
+            end = (pose.position.x, pose.position.y, yaw([pose.orientation.x, pose.orientation.y, pose.orientation.z, pose.orientation.w]))
+            duration = hypot(end[0] - start[0], end[1] - start[1]) / self.speed
+        r = rospy.Rate(20)
+        while (time.time() < start_time + duration) and not rospy.is_shutdown():
+            if (self.move_base_server.is_preempt_requested()):
+                self.move_base_server.set_preempted()
+                return
+            if (self.base != None):
+                self.base.place(interpolate(start, end, (time.time() - start_time) / duration))
+            r.sleep()
+        if (self.base != None):
+            self.base.place(end)
+        self.move_base_server.set_succeeded(MoveBaseResult())
+
+    def set_odometry(self, req):
+        if (self.base != None):
+            self.base.reset_odom((req.x, req.y, req.orientation))
+        return set_odometryResponse(ret=True)
+
+    def set_digital_output(self, req):
+        time.sleep(self.elevator_duration)
+        return set_digital_outputResponse(ret=True)
+
+
+if __name__ == '__main__':
+    try:
+        ss = SimStubs()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
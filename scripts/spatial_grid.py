@@ -0,0 +1,63 @@
+"""
+Uniform grid of points in the plane (ex: the robots of the fleet), rebuilt from all points
+at once. The points are binned into square cells and sorted by cell, so that the points of
+a cell are a contiguous range found by binary search. Pairs of points closer than a
+distance are found by scanning the cells around every point, in one vectorized pass per
+neighbouring cell offset, and checking the exact distances of the candidates only.
+"""
+
+import numpy as np
+
+
+'''
+#######################################################################################
+'''
+
+class UniformGrid:
+    def __init__(self, cell):
+        self.cell = float(cell) # side of the cells [m]
+        self.points = np.zeros((0, 2))
+        self.cells = np.zeros((0, 2), dtype=np.int64)
+        self.width = 1 # cells per column of the grid (with the scanned margin)
+        self.margin = 0 # cells scanned around every cell
+        self.order = np.zeros(0, dtype=np.int64) # points sorted by cell
+        self.keys = np.zeros(0, dtype=np.int64) # sorted cell keys
+
+    def build(self, points, margin=1):
+        """ Bins the points (n x 2) for queries up to margin cells away. """
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.cells = np.floor(self.points / self.cell).astype(np.int64)
+        self.margin = margin
+        if (len(self.points) != 0):
+            self.cells[:, 1] += margin - self.cells[:, 1].min() # the scanned rows of a column never overlap the next column
+            self.width = int(self.cells[:, 1].max()) + margin + 1
+        keys = self.cells[:, 0] * self.width + self.cells[:, 1]
+        self.order = np.argsort(keys, kind='mergesort')
+        self.keys = keys[self.order]
+
+    def pairs(self, distance, reach=None):
+        """ Ordered pairs (i, j) of distinct points with |p_i - p_j| <= distance + reach_i + reach_j, as two index arrays. """
+        reach = np.zeros(len(self.points)) if reach is None else np.asarray(reach, dtype=float)
+        limit = distance + 2.0 * reach.max() if len(reach) else distance
+        margin = int(np.ceil(limit / self.cell))
+        if (margin > self.margin):
+            self.build(self.points, margin)
+        margin = self.margin
+        candidates_i, candidates_j = [], []
+        for dx in range(-margin, margin + 1):
+            for dy in range(-margin, margin + 1):
+                query = (self.cells[:, 0] + dx) * self.width + self.cells[:, 1] + dy
+                lo = np.searchsorted(self.keys, query, side='left')
+                counts = np.searchsorted(self.keys, query, side='right') - lo
+                total = counts.sum()
+                if (total == 0):
+                    continue
+                starts = np.cumsum(counts) - counts
+                candidates_i.append(np.repeat(np.arange(len(query)), counts))
+                candidates_j.append(self.order[np.repeat(lo - starts, counts) + np.arange(total)])
+        if not candidates_i:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        i, j = np.concatenate(candidates_i), np.concatenate(candidates_j)
+        delta = self.points[i] - self.points[j]
+        near = (i != j) & ((delta * delta).sum(axis=1) <= (distance + reach[i] + reach[j]) ** 2)
+        return i[near], j[near]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Measures the cost of one publishing tick of the fleet obstacle publisher and the obstacles
+received per robot as the fleet grows, with the robots spread over a floor of constant
+density and moving at random constant velocities. Every robot receiving all other robots
+(obstacle range 0) is compared with every robot receiving the robots within the obstacle
+range and time horizon only, found on the uniform grid of spatial_grid.py. A tick updates
+and serializes the obstacle arrays of all robots (as done by rospy on publish). Runs
+without a roscore.
+
+Usage: spatial_grid_benchmark.py [ticks] [obstacle range] [time horizon] [floor per robot] [fleet sizes...]
+"""
+
+import sys, timeit
+from io import BytesIO
+import numpy as np
+import rospy
+from fleet_publisher import FleetObstacles
+
+
+'''
+#######################################################################################
+'''
+
+FLEET_SIZES = [5, 20, 50, 100, 200]
+RATE = 10.0 # Hz
+
+'''
+#######################################################################################
+'''
+
+def serialize(arrays):
+    buff = BytesIO()
+    for array in arrays:
+        buff.seek(0)
+        array.serialize(buff)
+
+def run(robot_ids, ticks, obstacle_range, time_horizon):
+    """ Publishing ticks of a new publisher over the poses, returns the mean obstacles per robot. """
+    fleet = FleetObstacles(robot_ids, 0.5, obstacle_range=obstacle_range, time_horizon=time_horizon)
+    obstacles = 0
+    for t in range(len(ticks)):
+        fleet.update(ticks[t], [t / RATE] * len(ticks[t]), rospy.Time.from_sec(t / RATE))
+        serialize(fleet.arrays)
+        obstacles += sum(len(array.obstacles) for array in fleet.arrays)
+    return obstacles / float(len(ticks) * len(robot_ids))
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    obstacle_range = float(sys.argv[2]) if len(sys.argv) > 2 else 4.0 # m
+    time_horizon = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0 # s
+    floor = float(sys.argv[4]) if len(sys.argv) > 4 else 25.0 # m^2 per robot
+    fleet_sizes = [int(size) for size in sys.argv[5:]] or FLEET_SIZES
+    rng = np.random.RandomState(0)
+    print('{:>7} {:>16} {:>17} {:>18} {:>18} {:>9}'.format('robots', 'all [obst/robot]', 'near [obst/robot]', 'all [ms/tick]', 'near [ms/tick]', 'speedup'))
+    for size in fleet_sizes:
+        side = np.sqrt(size * floor)
+        start = rng.uniform(0.0, side, size=(size, 3))
+        velocity = rng.uniform(-0.5, 0.5, size=(size, 3))
+        poses = start[None] + (np.arange(ticks) / RATE)[:, None, None] * velocity[None]
+        poses = [[tuple(float(value) for value in pose) for pose in tick] for tick in poses]
+        robot_ids = ['sim_robot_{}'.format(i) for i in range(size)]
+        per_robot = (run(robot_ids, poses, 0.0, time_horizon), run(robot_ids, poses, obstacle_range, time_horizon))
+        every = min(timeit.repeat(lambda: run(robot_ids, poses, 0.0, time_horizon), number=1, repeat=3)) / ticks
+        near = min(timeit.repeat(lambda: run(robot_ids, poses, obstacle_range, time_horizon), number=1, repeat=3)) / ticks
+        print('{:>7} {:>16.1f} {:>17.1f} {:>18.2f} {:>18.2f} {:>8.1f}x'.format(size, per_robot[0], per_robot[1], every * 1e3, near * 1e3, every / near))
+    print('Obstacles per robot with {} robots >>> all: {:.1f}, within {:.1f} m and {:.1f} s: {:.1f}'.format(fleet_sizes[-1], per_robot[0], obstacle_range, time_horizon, per_robot[1]))
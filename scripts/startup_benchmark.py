@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Measures the bring-up time of the package's launch file. The launch file is started
+against an already running roscore and move_base, and the start up profile stored by
+every node once it is ready (see startup_profiler.py) is collected from the parameter
+server. For each node the import time, the time blocked waiting for dependencies and
+the time until ready are printed, together with the bring-up time of the whole launch
+file compared against the target.
+
+Usage: startup_benchmark.py [robot_id] [use_executor] [target] [timeout]
+"""
+
+import os, sys, time, signal
+import subprocess
+import rospy
+
+
+'''
+#######################################################################################
+'''
+
+SERVER_NODES = ['command_router', 'dock_pose_server', 'dock_undock_server', 'park_pose_server', 'state_server']
+CLIENT_NODES = ['dock_undock_client', 'drive_client', 'pick_client', 'place_client', 'home_client', 'return_client']
+EXECUTOR_NODES = ['action_executor']
+TARGET_BRINGUP = 5.0 # seconds from launch until all nodes are ready
+
+'''
+#######################################################################################
+'''
+
+def profile_param(robot_id, node):
+    return '/'+robot_id+'/'+node+'/startup_profile'
+
+def collect_profiles(robot_id, nodes, timeout):
+    """ Polls the parameter server until every node stored its start up profile. """
+    profiles = {}
+    deadline = time.time() + timeout
+    while (len(profiles) < len(nodes)) and (time.time() < deadline):
+        for node in nodes:
+            if (node not in profiles) and rospy.has_param(profile_param(robot_id, node)):
+                profiles[node] = rospy.get_param(profile_param(robot_id, node))
+        time.sleep(0.1)
+    return profiles
+
+if __name__ == '__main__':
+    robot_id = sys.argv[1] if len(sys.argv) > 1 else 'rb1_base_b'
+    use_executor = sys.argv[2] if len(sys.argv) > 2 else 'false'
+    target = float(sys.argv[3]) if len(sys.argv) > 3 else TARGET_BRINGUP
+    timeout = float(sys.argv[4]) if len(sys.argv) > 4 else 60.0
+    nodes = SERVER_NODES + (EXECUTOR_NODES if use_executor == 'true' else CLIENT_NODES)
+    for node in nodes: # profiles of a previous run are kept by the running roscore
+        if rospy.has_param(profile_param(robot_id, node)):
+            rospy.delete_param(profile_param(robot_id, node))
+    devnull = open(os.devnull, 'w')
+    start = time.time()
+    proc = subprocess.Popen(['roslaunch', 'fms_rob', 'fms_rob.launch', 'id_robot:='+robot_id, 'use_executor:='+use_executor],
+                            stdout=devnull, stderr=subprocess.STDOUT)
+    profiles = collect_profiles(robot_id, nodes, timeout)
+    proc.send_signal(signal.SIGINT)
+    proc.wait()
+    print('{:<25} {:>12} {:>12} {:>12}   {}'.format('node', 'imports [s]', 'blocked [s]', 'ready [s]', 'blocked on'))
+    for node in nodes:
+        if node not in profiles:
+            print('{:<25} {:>12}'.format(node, 'timeout'))
+            continue
+        profile = profiles[node]
+        blocked = ', '.join('{} {:.2f}'.format(name, seconds) for name, seconds in sorted(profile['blocked'].items()))
+        print('{:<25} {:>12.2f} {:>12.2f} {:>12.2f}   {}'.format(node, profile['imports'] or 0.0, sum(profile['blocked'].values()),
+                                                             profile['ready'], blocked))
+    if len(profiles) == len(nodes):
+        bringup = max(profile['process_start'] + profile['ready'] for profile in profiles.values()) - start
+        print('Bring-up time: {:.2f} s (target: {:.2f} s) >>> {}'.format(bringup, target, 'OK' if bringup <= target else 'MISSED'))
+    else:
+        print('Bring-up time: timeout after {:.0f} s ({} of {} nodes ready)'.format(timeout, len(profiles), len(nodes)))
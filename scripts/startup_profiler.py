@@ -0,0 +1,79 @@
+"""
+Records the start up profile of a node: the time spent on interpreter start up and
+module imports, the time blocked waiting for servers and other nodes, and the time
+until the node is ready. The profile is stored in the node's private startup_profile
+parameter once the node is ready, from where it is collected by the start up benchmark.
+"""
+
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+import rospy
+
+
+'''
+#######################################################################################
+'''
+
+def process_start_time():
+    """ Wall time at which the current process was started, read from /proc. Falls back to the import time of this module. """
+    try:
+        with open('/proc/self/stat') as f:
+            start_ticks = float(f.read().rsplit(')', 1)[1].split()[19]) # starttime field, clock ticks since boot
+        with open('/proc/stat') as f:
+            boot_time = [float(line.split()[1]) for line in f if line.startswith('btime')][0]
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (IOError, OSError, IndexError, ValueError):
+        return time.time()
+
+class StartupProfile:
+    def __init__(self):
+        self.start = process_start_time()
+        self.imports = None # seconds from process start until all modules were imported
+        self.blocking = {} # dependency --> seconds blocked waiting for it
+        self.ready_time = None # seconds from process start until the node was ready
+        self.lock = threading.Lock() # waits of the hosted clients can overlap in the action executor
+
+    def imports_done(self):
+        """ Called once the node's modules are imported. """
+        if (self.imports == None):
+            self.imports = time.time() - self.start
+
+    @contextmanager
+    def blocked(self, name):
+        """ Accounts the time spent in the enclosed block as blocked waiting for a dependency. """
+        begin = time.time()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.blocking[name] = self.blocking.get(name, 0.0) + time.time() - begin
+
+    def ready(self):
+        """ Called when the node is ready. Stores the profile in the node's startup_profile parameter, removed on shutdown. """
+        self.ready_time = time.time() - self.start
+        profile = {'process_start': self.start, 'imports': self.imports, 'blocked': dict(self.blocking), 'ready': self.ready_time,
+                   'uri': rospy.get_node_uri()} # tells the profile of the running node from one left by a crashed instance
+        rospy.set_param('~startup_profile', profile)
+        rospy.on_shutdown(self.clear)
+        rospy.logdebug('[ {} ]: Start up profile: {}'.format(rospy.get_name(), profile))
+        return profile
+
+    def clear(self):
+        try:
+            rospy.delete_param('~startup_profile')
+        except (KeyError, IOError):
+            pass
+
+def wait_until(condition, timeout, period=0.01):
+    """ Polls a readiness condition instead of sleeping for a fixed time. Returns whether it was met before the timeout. """
+    deadline = time.time() + timeout
+    while not condition():
+        if (time.time() >= deadline) or rospy.is_shutdown():
+            return False
+        time.sleep(period)
+    return True
+
+profile = StartupProfile() # one profile per process
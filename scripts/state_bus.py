@@ -0,0 +1,120 @@
+"""
+Client side of the robot's shared state (see state_server.py). A StateProxy keeps a local
+copy of the versioned state, kept up to date by the change notifications of the server
+(only the changed keys) and by the latched state topic (the whole state, used on start up
+and to recover from a missed notification), so reads are done in memory. Updates are sent
+over a persistent service connection, which avoids the connection set up of a rospy
+service call per update, and are applied unconditionally or as compare-and-set on the
+version the caller has read. Callbacks registered with on_change receive the changed keys.
+"""
+
+import json
+import threading
+import rospy
+from fms_rob.msg import RobState
+from fms_rob.srv import setState
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+def encode_state(state):
+    """ Keys and JSON encoded values of a state dictionary, sorted by key. """
+    keys = sorted(state)
+    return keys, [json.dumps(state[key]) for key in keys]
+
+def decode_state(keys, values):
+    return dict((key, json.loads(value)) for key, value in zip(keys, values))
+
+'''
+#######################################################################################
+'''
+
+class StateProxy:
+    def __init__(self, server=None, timeout=30):
+        self.server = server if server != None else '/'+get_robot_id()+'/state_server'
+        self.timeout = timeout
+        self.state = {}
+        self.version = 0
+        self.lock = threading.Lock() # local copy of the state
+        self.call_lock = threading.Lock() # the persistent connection carries one call at a time
+        self.listeners = []
+        rospy.wait_for_service(self.server+'/set_state', timeout=timeout)
+        self.proxy = rospy.ServiceProxy(self.server+'/set_state', setState, persistent=True)
+        self.refresh()
+        self.state_sub = rospy.Subscriber(self.server+'/state', RobState, self.state_update)
+        self.changes_sub = rospy.Subscriber(self.server+'/changes', RobState, self.changes_update)
+
+    def state_update(self, data):
+        self.apply(data.version, decode_state(data.keys, data.values))
+
+    def changes_update(self, data):
+        self.apply(data.version, changes=decode_state(data.keys, data.values))
+
+    def apply(self, version, state=None, changes=None):
+        """ Applies a newer whole state or the changes of the next version, and notifies the listeners of the changed keys. """
+        with self.lock:
+            if (version <= self.version):
+                return
+            if (state != None):
+                changes = dict((key, value) for key, value in state.items() if self.state.get(key) != value)
+                self.state = state
+            elif (version == self.version + 1):
+                state = dict(self.state)
+                state.update(changes)
+                self.state = state # replaced as a whole, so readers never see a partial update
+            else: # a notification was missed, the whole state follows on the state topic
+                return
+            self.version = version
+        for listener in self.listeners:
+            listener(changes, version)
+
+    def call(self, updates, expected_version=0):
+        keys, values = encode_state(updates)
+        with self.call_lock:
+            try:
+                response = self.proxy(expected_version, keys, values)
+            except rospy.ROSException: # persistent connection closed (ex: the server restarted), updates are absolute values so they are sent again
+                self.proxy.close()
+                rospy.wait_for_service(self.server+'/set_state', timeout=self.timeout)
+                self.proxy = rospy.ServiceProxy(self.server+'/set_state', setState, persistent=True)
+                response = self.proxy(expected_version, keys, values)
+        self.apply(response.version, decode_state(response.keys, response.values))
+        return response.success
+
+    def refresh(self):
+        """ Reads the whole state from the server. """
+        self.call({})
+
+    def get(self, key, default=None):
+        return self.state.get(key, default)
+
+    def set(self, updates):
+        """ Sets the keys unconditionally. """
+        self.call(updates)
+
+    def compare_and_set(self, updates, version):
+        """ Sets the keys if the state is still at the version. Returns False otherwise (the local copy is then updated). """
+        return self.call(updates, version)
+
+    def update_if(self, condition, updates, retries=5):
+        """ Sets the keys if condition(state) holds, atomically with respect to other updates. Returns True if the keys were set. """
+        for _ in range(retries):
+            with self.lock:
+                state, version = self.state, self.version
+            if not condition(state):
+                return False
+            if self.compare_and_set(updates, version):
+                return True
+        return False
+
+    def on_change(self, callback):
+        """ Registers callback(changes, version), called with the changed keys of every new version. """
+        self.listeners.append(callback)
+
+    def close(self):
+        self.state_sub.unregister()
+        self.changes_sub.unregister()
+        self.proxy.close()
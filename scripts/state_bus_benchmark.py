@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Compares the round trip of an interlock update through the dynamic reconfigure server
+(the previous store of the shared state, one service connection per update) with the
+state server of state_server.py through a persistent StateProxy, unconditionally and as
+compare-and-set, and the time until the change notification reaches a second proxy.
+Both servers are hosted in the benchmark node without a journal, so the disk sync of
+the journal is not measured. Requires a roscore.
+
+Usage: state_bus_benchmark.py [updates]
+"""
+
+import sys, time
+import threading
+import rospy
+from dynamic_reconfigure.server import Server
+import dynamic_reconfigure.client
+from fms_rob.cfg import dynamic_paramsConfig
+from state_server import StateServer
+from state_bus import StateProxy
+
+
+'''
+#######################################################################################
+'''
+
+def percentiles(samples):
+    """ Median and 99th percentile [ms]. """
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1e3, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1e3
+
+def timed(update, updates):
+    samples = []
+    for i in range(updates):
+        start = time.time()
+        update(i)
+        samples.append(time.time() - start)
+    return samples
+
+if __name__ == '__main__':
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rospy.init_node('state_bus_benchmark', anonymous=True)
+    reconf_server = Server(dynamic_paramsConfig, lambda config, level: config, namespace=rospy.get_name()+'/reconf')
+    reconf_client = dynamic_reconfigure.client.Client(rospy.get_name()+'/reconf', timeout=10)
+    state_server = StateServer()
+    proxy, listener = StateProxy(rospy.get_name()), StateProxy(rospy.get_name())
+    notified = threading.Event()
+    listener.on_change(lambda changes, version: notified.set())
+    def notification(i):
+        notified.clear()
+        proxy.set({'pick': i % 2 == 0})
+        notified.wait(1.0)
+    rows = [('reconfigure update', timed(lambda i: reconf_client.update_configuration({'pick': i % 2 == 0}), updates)),
+            ('state set', timed(lambda i: proxy.set({'pick': i % 2 == 0}), updates)),
+            ('state compare-and-set', timed(lambda i: proxy.compare_and_set({'pick': i % 2 == 0}, proxy.version), updates)),
+            ('state notification', timed(notification, updates))]
+    print('{:<24} {:>12} {:>12}'.format('path', 'p50 [ms]', 'p99 [ms]'))
+    for name, samples in rows:
+        print('{:<24} {:>12.3f} {:>12.3f}'.format(name, *percentiles(samples)))
+    reconf, state = percentiles(rows[0][1])[0], percentiles(rows[1][1])[0]
+    print('Median update round trip >>> reconfigure: {:.3f} ms, state bus: {:.3f} ms ({:.1f}x)'.format(reconf, state, reconf / state))
+    proxy.close()
+    listener.close()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Server of the state that is shared between the nodes of a robot at runtime (interlocks,
+return pose of the picked cart, current command and phase, carried cart). The state is
+versioned: every change increments the version, is published as the changed keys on
+~changes and as the whole state on the latched ~state topic, and is recorded in the
+mission journal, so that after a restart the server resumes from the last recorded state
+(warm start) instead of the defaults. Updates are requested on the ~set_state service,
+unconditionally or as compare-and-set on the version read by the client (see state_bus.py).
+"""
+
+import rospy
+import sys, os, time
+import threading
+import rospkg
+
+from fms_rob.msg import RobActionStatus, RobState
+from fms_rob.srv import setState, setStateResponse
+from state_bus import encode_state, decode_state
+from mission_journal import MissionJournal
+from startup_profiler import profile
+from structured_log import log
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+
+DEFAULT_STATE = {'pick': False, 'dock': False, 'undock': False, 'place': False, 'home': False, 'return': False,
+                 'return_pose_trans_x': 0.0, 'return_pose_trans_y': 0.0, 'return_pose_rot_x': 0.0,
+                 'return_pose_rot_y': 0.0, 'return_pose_rot_z': 0.0, 'return_pose_rot_w': 0.0,
+                 'command_id': '', 'phase': '', 'cart_id': '', 'cart_loaded': False} # state of a robot without a recorded mission
+
+'''
+#######################################################################################
+'''
+
+class StateServer:
+    def __init__(self, state=None, journal=None):
+        self.state = dict(DEFAULT_STATE)
+        self.state.update(state or {})
+        self.version = int(time.time() * 1000) # keeps increasing across restarts of the server, 0 is reserved for unconditional updates
+        self.journal = journal # mission state journal, None to keep the state in memory only
+        self.lock = threading.Lock() # one update at a time
+        self.state_pub = rospy.Publisher('~state', RobState, queue_size=1, latch=True)
+        self.changes_pub = rospy.Publisher('~changes', RobState, queue_size=100)
+        self.publish(self.state_pub, self.state)
+        self.srv = rospy.Service('~set_state', setState, self.handle_set_state)
+
+    def publish(self, pub, state):
+        msg = RobState()
+        msg.header.stamp = rospy.Time.now()
+        msg.version = self.version
+        msg.keys, msg.values = encode_state(state)
+        pub.publish(msg)
+
+    def update(self, updates, expected_version=0):
+        """ Applies the updates if the state is at the expected version (any version if 0). Returns the result. """
+        with self.lock:
+            if (expected_version != 0 and expected_version != self.version):
+                return False
+            changes = dict((key, value) for key, value in updates.items() if self.state.get(key) != value)
+            if changes:
+                self.state.update(changes)
+                self.version += 1
+                if (self.journal != None):
+                    self.journal.record(self.state)
+                self.publish(self.changes_pub, changes)
+                self.publish(self.state_pub, self.state)
+                log.info('state_change', version=self.version, **changes)
+            return True
+
+    def handle_set_state(self, req):
+        success = self.update(decode_state(req.keys, req.values), req.expected_version)
+        with self.lock:
+            keys, values = encode_state(self.state)
+            return setStateResponse(success, self.version, keys, values)
+
+'''
+#######################################################################################
+'''
+
+def report_interrupted(state):
+    """ Reports the command that was being executed when the mission was interrupted as aborted. """
+    rospy.logwarn('[ {} ]: Command {} was interrupted during the {} phase'.format(rospy.get_name(), state['command_id'], state['phase']))
+    status_pub = rospy.Publisher('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, queue_size=1, latch=True) # latched for the command router to receive it after restart
+    msg = RobActionStatus()
+    msg.command_id = state['command_id']
+    msg.action = state['phase']
+    msg.cart_id = state.get('cart_id', '')
+    msg.status = 4 # aborted
+    status_pub.publish(msg)
+    return status_pub
+
+'''
+#######################################################################################
+'''
+
+if __name__ == '__main__':
+    profile.imports_done()
+    try:
+        rospy.init_node('state_server', anonymous = False)
+        default_path = os.path.join(rospkg.get_ros_home(), 'fms_rob', ROBOT_ID+'_mission')
+        journal = MissionJournal(rospy.get_param('~journal_path', default_path))
+        rospy.on_shutdown(journal.close)
+        if rospy.get_param('~resume', True): # set to False to discard the recorded mission and start cold
+            state = journal.load()
+        else:
+            journal.reset()
+            state = {}
+        warm_start = bool(state.get('command_id') or state.get('phase')) # a mission was in progress, not only recorded
+        rospy.set_param('~warm_start', warm_start)
+        ss = StateServer(state, journal)
+        if warm_start:
+            rospy.loginfo('[ {} ]: Warm start - mission state restored from {}'.format(rospy.get_name(), journal.journal_path))
+            if state.get('phase'):
+                status_pub = report_interrupted(state)
+                ss.update({'phase': '', 'command_id': ''}) # the interrupted command ends the mission
+        profile.ready()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
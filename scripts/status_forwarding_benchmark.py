@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Measures the number of status messages forwarded upstream per goal. For every command,
+the RobActionStatus messages published on rob_action_status are counted together with
+the status arrays received from the action server of the goal (dock-undock server for
+dock and undock, move base otherwise) while the goal was running. The polling based forwarding published one status message per status
+array for every tracked goal, so the status array count is the number of messages the
+command would have produced before the forwarding became transition driven.
+A summary is printed on shutdown.
+"""
+
+import rospy
+import sys
+from fms_rob.msg import RobActionStatus
+from actionlib_msgs.msg import GoalStatusArray
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+DOCK_ACTIONS = ['dock', 'undock'] # goals of the dock-undock server, all other goals are sent to move base
+
+'''
+#######################################################################################
+'''
+
+class StatusForwardingBenchmark:
+    def __init__(self):
+        rospy.init_node('status_forwarding_benchmark')
+        self.goals = {} # command_id --> [action, forwarded status messages, status arrays while running]
+        self.running = None # command id of the goal that is currently running
+        self.terminal_states = [2, 3, 4, 5, 8, 9] # preempted, succeeded, aborted, rejected, recalled, lost
+        rospy.Subscriber('/'+ROBOT_ID+'/rob_action_status', RobActionStatus, self.status_update)
+        rospy.Subscriber('/'+ROBOT_ID+'/move_base/status', GoalStatusArray, self.status_array_update, callback_args='move_base')
+        rospy.Subscriber('/'+ROBOT_ID+'/do_dock_undock/status', GoalStatusArray, self.status_array_update, callback_args='do_dock_undock')
+        rospy.on_shutdown(self.shutdown_hook)
+        rospy.loginfo('[ {} ]: Ready'.format(rospy.get_name()))
+
+    def status_update(self, data):
+        goal = self.goals.setdefault(data.command_id, [data.action, 0, 0])
+        goal[1] += 1
+        if (data.status in self.terminal_states):
+            self.running = None
+        else:
+            self.running = data.command_id
+
+    def status_array_update(self, data, server):
+        """ Counts the status arrays of the server of the running goal only, both servers publish their status also when idle. """
+        if (self.running != None) and (self.server(self.goals[self.running][0]) == server):
+            self.goals[self.running][2] += 1
+
+    def server(self, action):
+        return 'do_dock_undock' if action in DOCK_ACTIONS else 'move_base'
+
+    def shutdown_hook(self):
+        print('{:<20} {:<10} {:>15} {:>15}'.format('command_id', 'action', 'transitions', 'polling'))
+        for command_id, (action, forwarded, polled) in self.goals.items():
+            print('{:<20} {:<10} {:>15} {:>15}'.format(command_id, action, forwarded, polled))
+        if self.goals:
+            forwarded = sum(goal[1] for goal in self.goals.values()) / float(len(self.goals))
+            polled = sum(goal[2] for goal in self.goals.values()) / float(len(self.goals))
+            print('Mean messages per goal >>> transitions: {:.1f}, polling: {:.1f}'.format(forwarded, polled))
+
+if __name__ == '__main__':
+    try:
+        sfb = StatusForwardingBenchmark()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
@@ -0,0 +1,101 @@
+"""
+Logging facade for the hot control loops and callbacks. Records are an event name
+with key/value fields. Every record is appended unformatted to an in-memory ring
+buffer (a bounded deque, appends are atomic without a lock), which can be dumped to a
+file on demand (~dump_log service) or when an action is aborted. Records are only
+formatted and sent to /rosout when their level is enabled and their call site is not
+rate limited, so disabled records in 10 Hz loops cost a buffer append only.
+"""
+
+import os
+import sys
+import time
+import logging
+from collections import deque
+
+import rospy
+
+
+'''
+#######################################################################################
+'''
+
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARN = logging.WARNING
+ERROR = logging.ERROR
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARN: 'WARN', ERROR: 'ERROR'}
+
+'''
+#######################################################################################
+'''
+
+def format_fields(fields):
+    return ' '.join('{}={}'.format(key, fields[key]) for key in sorted(fields))
+
+class StructuredLog:
+    def __init__(self, buffer_size=2000):
+        self.buffer = deque(maxlen=buffer_size) # (time, level, event, fields) of the latest records
+        self.last_emitted = {} # (event, call site) --> time of the last record sent to rosout
+        self.logger = logging.getLogger('rosout') # logger used by rospy, holds the enabled level
+        self.emitters = {DEBUG: rospy.logdebug, INFO: rospy.loginfo, WARN: rospy.logwarn, ERROR: rospy.logerr}
+        self.dump_srv = None
+
+    def record(self, level, event, period=None, **fields):
+        """
+        Records an event. With a period, the event is sent to rosout at most once per period
+        (seconds) and call site, so that one event logged from several places is limited per place.
+        The record is buffered in any case.
+        """
+        now = time.time()
+        self.buffer.append((now, level, event, fields))
+        if not self.logger.isEnabledFor(level):
+            return
+        if (period != None):
+            caller = sys._getframe(1)
+            if (caller.f_globals is globals()): # called through debug, info, warn or error
+                caller = caller.f_back
+            site = (event, caller.f_code.co_filename, caller.f_lineno)
+            if (now - self.last_emitted.get(site, 0.0) < period):
+                return
+            self.last_emitted[site] = now
+        self.emitters[level]('[ {} ]: {} {}'.format(rospy.get_name(), event, format_fields(fields)))
+
+    def debug(self, event, period=None, **fields):
+        self.record(DEBUG, event, period, **fields)
+
+    def info(self, event, period=None, **fields):
+        self.record(INFO, event, period, **fields)
+
+    def warn(self, event, period=None, **fields):
+        self.record(WARN, event, period, **fields)
+
+    def error(self, event, period=None, **fields):
+        self.record(ERROR, event, period, **fields)
+
+    def dump(self, reason=''):
+        """ Writes the buffered records to a file in the ROS log directory. Returns the file path. """
+        records = list(self.buffer)
+        now = time.time()
+        log_dir = os.environ.get('ROS_LOG_DIR', os.path.join(os.environ.get('ROS_HOME', os.path.expanduser('~/.ros')), 'log'))
+        path = os.path.join(log_dir, '{}_{}.log'.format(rospy.get_name().strip('/').replace('/', '_') or 'fms_rob', time.strftime('%Y%m%d_%H%M%S', time.localtime(now)) + '_{:06d}'.format(int(now % 1.0 * 1e6)))) # microseconds, so dumps within a second are kept apart
+        try:
+            with open(path, 'w') as f:
+                for stamp, level, event, fields in records:
+                    f.write('{:.6f} {:<5} {} {}\n'.format(stamp, LEVEL_NAMES.get(level, level), event, format_fields(fields)))
+        except (IOError, OSError) as e:
+            rospy.logerr('[ {} ]: Log dump Failed! - {}'.format(rospy.get_name(), e))
+            return ''
+        rospy.logwarn('[ {} ]: {} log records dumped to {} {}'.format(rospy.get_name(), len(records), path, reason))
+        return path
+
+    def advertise_dump(self):
+        """ Offers the dump through the node's ~dump_log service. """
+        from std_srvs.srv import Trigger, TriggerResponse
+        def handle(req):
+            path = self.dump('(requested)')
+            return TriggerResponse(success=(path != ''), message=path)
+        if (self.dump_srv == None):
+            self.dump_srv = rospy.Service('~dump_log', Trigger, handle)
+
+log = StructuredLog() # one buffer per process
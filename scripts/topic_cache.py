@@ -0,0 +1,75 @@
+"""
+Cache of the topics published in the ROS graph, shared by the nodes of a process. The
+full topic list is pulled from the master by a background thread every period (instead
+of on every request, as rospy.get_published_topics does) and indexed by topic name, so
+that checking whether a topic (ex: the Vicon topic of a cart) is published costs a
+dictionary lookup. A topic missing from the cache triggers an early refresh, at most once
+per miss interval, so newly advertised topics are found without waiting for the period.
+"""
+
+import time
+import threading
+import rospy
+import rosgraph
+
+
+'''
+#######################################################################################
+'''
+
+class TopicCache:
+    def __init__(self, period=None, miss_interval=0.5):
+        self.period = period # seconds between refreshes, ~topic_cache_period (default: 2 s) of the node if None
+        self.miss_interval = miss_interval # minimum seconds between refreshes triggered by a missing topic
+        self.types = {} # topic --> type, replaced as a whole on every refresh
+        self.refreshed = 0.0 # time of the last refresh
+        self.lock = threading.Lock() # one refresh at a time
+        self.master = None
+        self.worker = None
+
+    def start(self):
+        """ Starts the background refresh on first use (after the node is initialized). """
+        if (self.worker != None):
+            return
+        with self.lock:
+            if (self.worker != None):
+                return
+            if (self.period == None):
+                self.period = rospy.get_param('~topic_cache_period', 2.0)
+            self.master = rosgraph.Master(rospy.get_name())
+            self.worker = threading.Thread(target=self.run)
+            self.worker.daemon = True
+            self.worker.start()
+        self.refresh()
+
+    def run(self):
+        while not rospy.is_shutdown():
+            time.sleep(self.period)
+            self.refresh()
+
+    def refresh(self):
+        with self.lock:
+            try:
+                published = self.master.getPublishedTopics('')
+            except (rosgraph.MasterError, IOError) as e:
+                rospy.logwarn_throttle(10.0, '[ {} ]: Topic List Refresh Failed! - {}'.format(rospy.get_name(), e))
+                return
+            self.types = dict((topic, msg_type) for topic, msg_type in published)
+            self.refreshed = time.time()
+
+    def published(self, topic, msg_type=None):
+        """ True if the topic is published (with the message type, if given). """
+        self.start()
+        found = self.types.get(topic)
+        if (found == None and time.time() - self.refreshed > self.miss_interval):
+            self.refresh()
+            found = self.types.get(topic)
+        return found != None and (msg_type == None or found == msg_type)
+
+    def published_topics(self, namespace='/'):
+        """ [topic, type] of the published topics in a namespace, like rospy.get_published_topics. """
+        self.start()
+        prefix = namespace.rstrip('/') + '/'
+        return [[topic, msg_type] for topic, msg_type in self.types.items() if topic.startswith(prefix)]
+
+topics = TopicCache() # one cache per process
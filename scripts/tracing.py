@@ -0,0 +1,138 @@
+"""
+End-to-end tracing of commands. Every hop of a command (router ingest, dispatch to
+the client, goal sent, goal active, dock-undock phases, goal termination and MQTT
+egress) records a span event stamped with the monotonic clock and keyed by the
+command_id. The events are published on the robot's trace topic, where the command
+router collects them and writes one trace record per command once its final status
+was sent back to the user.
+"""
+
+import os
+import time
+import json
+import threading
+from collections import OrderedDict
+
+import rospy
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+TERMINAL_STATES = [2, 3, 4, 5, 8] # preempted, succeeded, aborted, rejected, recalled
+
+def monotonic_clock():
+    """ Returns a system wide monotonic clock, so that events of different processes can be compared. """
+    if hasattr(time, 'monotonic'): # python 3
+        return time.monotonic
+    try:
+        import ctypes, ctypes.util
+        librt = ctypes.CDLL(ctypes.util.find_library('rt') or 'librt.so.1', use_errno=True)
+        class timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+        CLOCK_MONOTONIC = 1
+        def monotonic():
+            t = timespec()
+            librt.clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(t))
+            return t.tv_sec + t.tv_nsec * 1e-9
+        monotonic()
+        return monotonic
+    except (OSError, AttributeError):
+        return time.time
+
+now = monotonic_clock()
+
+'''
+#######################################################################################
+'''
+
+class TracePublisher(rospy.SubscribeListener):
+    """ Publishes the span events on the robot's trace topic. Events marked before the collector connected are kept and sent to it on connection. """
+    def __init__(self, max_pending=100):
+        from std_msgs.msg import String
+        rospy.SubscribeListener.__init__(self)
+        self.pending = [] # serialized events marked while no subscriber was connected
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pub = rospy.Publisher('/'+get_robot_id()+'/trace', String, queue_size=100, subscriber_listener=self)
+
+    def peer_subscribe(self, topic_name, topic_publish, peer_publish):
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for data in pending:
+            peer_publish(data)
+
+    def __call__(self, span):
+        data = json.dumps(span)
+        with self.lock:
+            if (self.pub.get_num_connections() == 0):
+                if (len(self.pending) < self.max_pending):
+                    self.pending.append(data)
+                return
+        self.pub.publish(data)
+
+class Tracer:
+    def __init__(self):
+        self.sink = None # receives the span events, publishes them on the trace topic by default
+        self.lock = threading.Lock()
+
+    def mark(self, command_id, event, **fields):
+        """ Records an event of a command. """
+        if not command_id:
+            return
+        t = fields.pop('t', None)
+        span = {'command_id': command_id, 'event': event, 't': t if t is not None else now(), 'node': rospy.get_name()}
+        span.update(fields)
+        if (self.sink == None):
+            with self.lock:
+                if (self.sink == None):
+                    self.sink = TracePublisher()
+        self.sink(span)
+
+class TraceCollector:
+    def __init__(self, path, linger=1.0, max_open=1000):
+        self.path = path
+        self.linger = linger # seconds to wait for events of other nodes after the final status was sent
+        self.max_open = max_open # traces of commands that never terminate are dropped beyond this number
+        self.traces = OrderedDict() # command_id --> span events
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def add(self, span):
+        with self.lock:
+            events = self.traces.get(span['command_id'])
+            if (events == None):
+                events = self.traces[span['command_id']] = []
+                if (len(self.traces) > self.max_open):
+                    self.traces.popitem(last=False)
+            events.append(span)
+
+    def complete(self, command_id, status):
+        """ Writes the trace of a command after the linger time, once its final status was sent. """
+        if (status not in TERMINAL_STATES) or (command_id not in self.traces):
+            return
+        timer = threading.Timer(self.linger, self.write, args=(command_id, status))
+        timer.daemon = True
+        timer.start()
+
+    def write(self, command_id, status):
+        with self.lock:
+            events = self.traces.pop(command_id, None)
+        if not events:
+            return
+        events.sort(key=lambda span: span['t'])
+        start = events[0]['t']
+        record = {'command_id': command_id, 'status': status, 'total': events[-1]['t'] - start,
+                  'action': next((span['action'] for span in events if span.get('action')), ''),
+                  'events': [dict(span, t=span['t'] - start) for span in events]} # times relative to the first event
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except (IOError, OSError) as e:
+            rospy.logerr('[ {} ]: Trace record could not be written - {}'.format(rospy.get_name(), e))
+
+trace = Tracer() # one tracer per process
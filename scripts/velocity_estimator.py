@@ -0,0 +1,57 @@
+"""
+Velocity estimation of tracked bodies (ex: the robots of the fleet from their Vicon poses).
+The last timestamped poses (x, y, yaw) of every body are kept in a ring buffer, and the
+linear and angular velocities of all bodies are estimated in one NumPy step as the least
+squares slopes of the buffered poses over time (finite differences smoothed over the
+window). The yaws are taken relative to the latest one of each body, so that angles
+wrapping around pi within the window do not disturb the estimate.
+"""
+
+import numpy as np
+from pose_geometry import wrap_angle
+
+
+'''
+#######################################################################################
+'''
+
+class VelocityEstimator:
+    def __init__(self, bodies, window=5):
+        self.window = window # samples per body
+        self.stamps = np.full((bodies, window), np.nan) # seconds, NaN for empty slots
+        self.poses = np.zeros((bodies, window, 3))
+        self.head = np.zeros(bodies, dtype=int) # next slot of every body
+        self.latest = np.full(bodies, -np.inf) # stamp of the latest sample of every body
+
+    def add(self, stamps, poses):
+        """ Adds the samples of all bodies (stamps: array of n, poses: n x 3), samples not newer than the latest one of a body are skipped. """
+        stamps = np.asarray(stamps, dtype=float)
+        with np.errstate(invalid='ignore'):
+            new = np.flatnonzero(stamps > self.latest) # NaN for bodies without a sample
+        slots = self.head[new]
+        self.stamps[new, slots] = stamps[new]
+        self.poses[new, slots] = np.asarray(poses, dtype=float)[new]
+        self.head[new] = (slots + 1) % self.window
+        self.latest[new] = stamps[new]
+
+    def estimate(self):
+        """ Velocities (vx, vy, yaw rate) of all bodies in the world frame (n x 3), zero for bodies with less than two samples. """
+        valid = ~np.isnan(self.stamps)
+        weights = valid.astype(float)
+        counts = weights.sum(axis=1)
+        last = (self.head - 1) % self.window
+        rows = np.arange(len(self.head))
+        t = np.where(valid, self.stamps - self.latest[:, None], 0.0) # relative to the latest sample
+        values = self.poses.copy()
+        values[..., 2] = wrap_angle(values[..., 2] - values[rows, last, 2][:, None]) # yaw relative to the latest sample
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t_mean = (weights * t).sum(axis=1) / counts
+            t_dev = weights * (t - t_mean[:, None])
+            variance = (t_dev * t_dev).sum(axis=1)
+            slopes = (t_dev[..., None] * values).sum(axis=1) / variance[:, None]
+        slopes[~(variance > 0.0)] = 0.0
+        return slopes
+
+    def reset(self, body):
+        self.stamps[body] = np.nan
+        self.latest[body] = -np.inf
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Compares the fleet velocity estimation of velocity_estimator.py (one NumPy step for all
+robots) with a per-robot Python loop computing the same least squares slopes, for fleets
+of 5, 20 and 50 robots. The robots move at random constant velocities and their poses are
+sampled at the publishing rate with Vicon noise. The error of the estimate is compared
+with the finite difference of the last two poses.
+
+Usage: velocity_estimator_benchmark.py [ticks] [rate] [noise] [window] [fleet sizes...]
+"""
+
+import sys, timeit
+from math import atan2, sin, cos
+import numpy as np
+from velocity_estimator import VelocityEstimator
+
+
+'''
+#######################################################################################
+'''
+
+FLEET_SIZES = [5, 20, 50]
+
+'''
+#######################################################################################
+'''
+
+def loop_estimate(buffers):
+    """ Per-robot least squares slopes over the buffered (t, x, y, yaw) samples. """
+    velocities = []
+    for samples in buffers:
+        if (len(samples) < 2):
+            velocities.append((0.0, 0.0, 0.0))
+            continue
+        t_last, _, _, yaw_last = samples[-1]
+        ts = [t - t_last for t, _, _, _ in samples]
+        t_mean = sum(ts) / len(ts)
+        variance = sum((t - t_mean) ** 2 for t in ts)
+        slopes = []
+        for k in (1, 2, 3):
+            values = [sample[k] for sample in samples]
+            if (k == 3):
+                values = [atan2(sin(value - yaw_last), cos(value - yaw_last)) for value in values]
+            slopes.append(sum((t - t_mean) * value for t, value in zip(ts, values)) / variance)
+        velocities.append(tuple(slopes))
+    return velocities
+
+def run_loop(stamps, poses, window):
+    buffers = [[] for _ in range(poses.shape[1])]
+    for t, tick in zip(stamps, poses):
+        for buffer, (x, y, theta) in zip(buffers, tick):
+            buffer.append((t, x, y, theta))
+            del buffer[:-window]
+        velocities = loop_estimate(buffers)
+    return velocities
+
+def run_vectorized(stamps, poses, window):
+    estimator = VelocityEstimator(poses.shape[1], window)
+    for t, tick in zip(stamps, poses):
+        estimator.add(np.full(len(tick), t), tick)
+        velocities = estimator.estimate()
+    return velocities
+
+if __name__ == '__main__':
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0 # Hz
+    noise = float(sys.argv[3]) if len(sys.argv) > 3 else 0.002 # standard deviation of the Vicon positions [m]
+    window = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+    fleet_sizes = [int(size) for size in sys.argv[5:]] or FLEET_SIZES
+    rng = np.random.RandomState(0)
+    print('{:>7} {:>16} {:>19} {:>9} {:>22} {:>22}'.format('robots', 'loop [ms/tick]', 'vectorized [ms/tick]', 'speedup', 'two poses err [m/s]', 'estimator err [m/s]'))
+    for size in fleet_sizes:
+        stamps = np.arange(ticks) / rate
+        truth = rng.uniform(-0.5, 0.5, size=(size, 3))
+        poses = stamps[:, None, None] * truth[None] + rng.normal(scale=noise, size=(ticks, size, 3)) * [1.0, 1.0, 0.01]
+        loop_velocities = run_loop(stamps, poses, window)
+        velocities = run_vectorized(stamps, poses, window)
+        assert np.allclose(loop_velocities, velocities)
+        loop = min(timeit.repeat(lambda: run_loop(stamps, poses, window), number=1, repeat=3)) / ticks
+        vectorized = min(timeit.repeat(lambda: run_vectorized(stamps, poses, window), number=1, repeat=3)) / ticks
+        two_poses = (poses[-1, :, :2] - poses[-2, :, :2]) * rate
+        errors = (np.sqrt(np.mean((two_poses - truth[:, :2]) ** 2)), np.sqrt(np.mean((velocities[:, :2] - truth[:, :2]) ** 2))) # RMS
+        print('{:>7} {:>16.3f} {:>19.3f} {:>8.1f}x {:>22.4f} {:>22.4f}'.format(size, loop * 1e3, vectorized * 1e3, loop / vectorized, *errors))
+    print('Velocity error at {:.0f} Hz with {:.1f} mm noise >>> two poses: {:.4f} m/s, {} samples: {:.4f} m/s'.format(rate, noise * 1e3, errors[0], window, errors[1]))
@@ -6,13 +6,16 @@ A node to detect disturbances in vicon readings - currently not complete.
 import rospy
 from std_msgs.msg import Bool
 from geometry_msgs.msg import TransformStamped
+from header_subscriber import HeaderSubscriber
+from topic_cache import topics
+from robot_namespace import get_robot_id
 import time, sys
 
 '''
 ###########################################################################
 '''
 
-ROBOT_ID = rospy.get_param('/ROBOT_ID')
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
 
 '''
 ###########################################################################
@@ -22,22 +25,15 @@ class vicon_checker:
 
     def __init__(self):
         rospy.init_node('vicon_check')
-        self.vicon_subscriber = rospy.Subscriber('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, TransformStamped, self.vi_update)
+        self.vicon = HeaderSubscriber('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, msg_class=TransformStamped) # only the header of the poses is decoded
         self.check_pub = rospy.Publisher('/vicon/'+ROBOT_ID+'/'+'check', Bool, queue_size=10)
         self.check_msg = Bool()
         self.time_limit = 2
-        self.vicon_data = TransformStamped()
-        self.pub_flag = False
         rospy.sleep(2)
         self.vi_topic_check()
 
-    def vi_update(self, data):
-        self.vicon_data = data
-        self.pub_flag = True
-
     def vi_topic_check(self):
-        topic = ['/vicon/rb1_base_b/rb1_base_b', 'geometry_msgs/TransformStamped']
-        if(topic not in rospy.get_published_topics('/vicon/')):
+        if(not topics.published('/vicon/'+ROBOT_ID+'/'+ROBOT_ID, 'geometry_msgs/TransformStamped')):
             self.check_msg.data = False
             self.check_pub.publish(self.check_msg)
             print('Vicon Topic Not Registered!') # When vicon bridge on robot died or nexus was started without selecting the topic
@@ -49,34 +45,28 @@ class vicon_checker:
         #rospy.sleep(1)
         #r = rospy.Rate(10)
         while(True):
-            last_seq_vicon = self.vicon_data.header.seq
-            #print(self.vicon_data)
-            if(self.pub_flag == False):
+            last_messages = self.vicon.messages
+            if(not self.vicon.received()):
                 self.check_msg.data = False
                 self.check_pub.publish(self.check_msg)
                 print('Vicon is Offline!') # When topic is registered in master but was not published on yet
                 return
-            elif(self.vicon_data.header.seq == last_seq_vicon):
-                timer = time.time()
-                #last_seq_vicon = self.vicon_data.header.seq
-                while(self.vicon_data.header.seq == last_seq_vicon):
-                    rospy.sleep(0.2)
-                    if((time.time() - timer) >= self.time_limit):
-                        self.check_msg.data = False
-                        self.check_pub.publish(self.check_msg)
-                        print('Vicon Connection Lost!') # When topic was already publishing
-                        return
-            else:
-                self.check_msg.data = True
-                self.check_pub.publish(self.check_msg)
-                print('Vicon is Online')
-                # return  
+            timer = time.time()
+            while(self.vicon.messages == last_messages):
+                rospy.sleep(0.2)
+                if((time.time() - timer) >= self.time_limit):
+                    self.check_msg.data = False
+                    self.check_pub.publish(self.check_msg)
+                    print('Vicon Connection Lost!') # When topic was already publishing
+                    return
+            self.check_msg.data = True
+            self.check_pub.publish(self.check_msg)
+            print('Vicon is Online')
             #r.sleep()
             rospy.sleep(0.2)
 
 if __name__ == '__main__':
     try:
-        #print(rospy.get_published_topics('/vicon/'+ROBOT_ID+'/'+ROBOT_ID))
         x = vicon_checker()
     except KeyboardInterrupt:
         sys.exit()          
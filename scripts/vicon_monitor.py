@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+"""
+A node that analyzes the Vicon streams of all bodies (robots and carts). For every message
+only the header is decoded (see header_subscriber.py): the latency (receive time minus
+the header stamp) and the gap to the previous frame of the body are recorded in fixed
+bucket histograms, and gaps above the dropout threshold are counted. Every record is
+labelled with the body and the dock-undock phase the robot is in (published by the
+dock-undock server), so that the Vicon quality can be correlated with the docking
+precision. The histograms are kept in the metrics registry (served by the command router)
+and a snapshot is written to a local file periodically.
+"""
+
+import rospy
+import sys, os, json, time
+from std_msgs.msg import String
+from header_subscriber import HeaderSubscriber
+from topic_cache import topics
+from metrics import metrics
+from startup_profiler import profile
+from structured_log import log
+from robot_namespace import get_robot_id
+
+
+'''
+#######################################################################################
+'''
+
+ROBOT_ID = get_robot_id() # namespace of the node, set to the robot id in the package's launch file
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0) # seconds
+GAP_BUCKETS = (0.004, 0.006, 0.008, 0.01, 0.015, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0) # seconds, 200 Hz frames are 5 ms apart
+IDLE = 'idle' # phase label outside of the dock-undock phases
+
+'''
+#######################################################################################
+'''
+
+class ViconMonitor:
+    def __init__(self):
+        rospy.init_node('vicon_monitor')
+        self.dropout_gap = rospy.get_param('~dropout_gap', 0.05) # seconds without a frame counted as a dropout
+        log_dir = os.environ.get('ROS_LOG_DIR', os.path.join(os.environ.get('ROS_HOME', os.path.expanduser('~/.ros')), 'log'))
+        self.snapshot_path = rospy.get_param('~snapshot_path', os.path.join(log_dir, 'vicon_stats_{}.json'.format(ROBOT_ID)))
+        self.phase = IDLE
+        self.records = {} # (body, phase) --> (latency histogram, gap histogram, dropout counter)
+        self.last = {} # body --> receive time of the last frame
+        self.subs = {} # body --> header subscriber
+        self.phase_sub = rospy.Subscriber('/'+ROBOT_ID+'/dock_phase', String, self.phase_update)
+        self.bodies = rospy.get_param('~bodies', []) # all bodies published under /vicon if empty
+        self.discover(None)
+        if not self.bodies:
+            self.discovery_timer = rospy.Timer(rospy.Duration(rospy.get_param('~discovery_period', 10.0)), self.discover)
+        metrics.start_publishing()
+        self.snapshot_timer = rospy.Timer(rospy.Duration(rospy.get_param('~snapshot_period', 10.0)), self.write_snapshot)
+        rospy.on_shutdown(self.shutdown_hook)
+        profile.ready()
+        rospy.loginfo('[ {} ]: Ready - monitoring {} bodies'.format(rospy.get_name(), len(self.subs)))
+
+    def discover(self, event):
+        """ Subscribes to the Vicon topics of new bodies. """
+        if self.bodies:
+            bodies = self.bodies
+        else:
+            bodies = [topic.split('/')[2] for topic, msg_type in topics.published_topics('/vicon')
+                      if msg_type == 'geometry_msgs/TransformStamped' and topic.count('/') == 3 and topic.split('/')[2] == topic.split('/')[3]]
+        for body in bodies:
+            if (body not in self.subs):
+                self.subs[body] = HeaderSubscriber('/vicon/'+body+'/'+body, lambda seq, stamp, body=body: self.frame_update(body, stamp))
+                log.info('vicon_body', body=body)
+
+    def phase_update(self, data):
+        self.phase = data.data or IDLE
+
+    def record(self, body, phase):
+        key = (body, phase)
+        record = self.records.get(key)
+        if (record == None):
+            record = self.records[key] = (
+                metrics.histogram('fms_rob_vicon_latency_seconds', 'Vicon frame latency (receive time minus stamp)', buckets=LATENCY_BUCKETS, body=body, phase=phase),
+                metrics.histogram('fms_rob_vicon_gap_seconds', 'Time between consecutive Vicon frames of a body', buckets=GAP_BUCKETS, body=body, phase=phase),
+                metrics.counter('fms_rob_vicon_dropouts_total', 'Vicon gaps above the dropout threshold', body=body, phase=phase))
+        return record
+
+    def frame_update(self, body, stamp):
+        now = rospy.get_time()
+        latency, gap, dropouts = self.record(body, self.phase)
+        if (stamp > 0.0):
+            latency.observe(now - stamp)
+        last = self.last.get(body)
+        self.last[body] = now
+        if (last != None):
+            gap.observe(now - last)
+            if (now - last > self.dropout_gap):
+                dropouts.inc()
+
+    def write_snapshot(self, event):
+        """ Writes the Vicon families of the registry to the snapshot file (replaced as a whole). """
+        families = dict((name, family) for name, family in metrics.snapshot(node=rospy.get_name()).items() if name.startswith('fms_rob_vicon_'))
+        path = self.snapshot_path + '.tmp'
+        try:
+            with open(path, 'w') as f:
+                json.dump({'stamp': time.time(), 'robot_id': ROBOT_ID, 'dropout_gap': self.dropout_gap, 'families': families}, f)
+            os.rename(path, self.snapshot_path)
+        except (IOError, OSError) as e:
+            rospy.logerr('[ {} ]: Vicon Snapshot Failed! - {}'.format(rospy.get_name(), e))
+
+    def shutdown_hook(self):
+        self.write_snapshot(None)
+        rospy.logwarn('[ {} ]: node shutdown by user'.format(rospy.get_name()))
+
+
+if __name__ == '__main__':
+    profile.imports_done()
+    try:
+        vm = ViconMonitor()
+    except KeyboardInterrupt:
+        sys.exit()
+    rospy.spin()
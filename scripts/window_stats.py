@@ -0,0 +1,76 @@
+"""
+Sliding window statistics of the arrival times of a topic's messages: rate, inter-arrival
+jitter (standard deviation of the intervals) and maximum gap over the last intervals, in
+O(1) per message. The intervals are kept in a ring buffer with their running sum and sum
+of squares (recomputed once per window to drop the rounding drift), and the maximum is
+kept by a monotonic queue of the intervals that can still become the window's maximum.
+"""
+
+from collections import deque
+from math import sqrt
+
+
+'''
+#######################################################################################
+'''
+
+class WindowStats:
+    def __init__(self, window=50):
+        self.window = window # intervals
+        self.intervals = [0.0] * window
+        self.head = 0 # next slot of the ring buffer
+        self.count = 0 # intervals in the window
+        self.pushed = 0 # intervals since the start
+        self.total = 0.0
+        self.squares = 0.0
+        self.maxima = deque() # (push index, interval), decreasing intervals
+        self.last = None # arrival time of the last message [s]
+        self.messages = 0
+
+    def add(self, t):
+        """ Records the arrival of a message at time t [s]. """
+        if (self.last != None):
+            self.push(t - self.last)
+        self.last = t
+        self.messages += 1
+
+    def push(self, interval):
+        if (self.count == self.window):
+            old = self.intervals[self.head]
+            self.total -= old
+            self.squares -= old * old
+        else:
+            self.count += 1
+        self.intervals[self.head] = interval
+        self.total += interval
+        self.squares += interval * interval
+        self.head = (self.head + 1) % self.window
+        self.pushed += 1
+        while (self.maxima and self.maxima[-1][1] <= interval):
+            self.maxima.pop()
+        self.maxima.append((self.pushed, interval))
+        if (self.maxima[0][0] <= self.pushed - self.window):
+            self.maxima.popleft()
+        if (self.pushed % self.window == 0):
+            self.total = sum(self.intervals[:self.count])
+            self.squares = sum(interval * interval for interval in self.intervals[:self.count])
+
+    def rate(self):
+        """ Messages per second over the window, 0 before the second message. """
+        return self.count / self.total if self.total > 0.0 else 0.0
+
+    def jitter(self):
+        """ Standard deviation of the intervals over the window [s]. """
+        if (self.count == 0):
+            return 0.0
+        mean = self.total / self.count
+        return sqrt(max(self.squares / self.count - mean * mean, 0.0))
+
+    def age(self, now):
+        """ Time since the last message [s], None before the first message. """
+        return now - self.last if self.last != None else None
+
+    def max_gap(self, now):
+        """ Longest interval over the window, including the one still open since the last message [s]. """
+        longest = self.maxima[0][1] if self.maxima else 0.0
+        return max(longest, now - self.last) if self.last != None else longest